@@ -0,0 +1,249 @@
+import argparse
+import builtins
+import json
+import os
+import sys
+import time
+
+from install import install_dependencies
+
+# Exit codes, for schedulers and scripts
+EXIT_OK = 0
+EXIT_ERROR = 1        # unexpected error while the job ran
+EXIT_USAGE = 2        # bad arguments or job file (same code as argparse)
+EXIT_CONFIG = 3       # missing credentials, CV, AI key or lead set
+EXIT_DEPENDENCY = 4   # a required library is not installed
+EXIT_EMPTY = 5        # the job ran but produced nothing (no companies, no leads to apply to)
+EXIT_INTERRUPTED = 130
+
+DEFAULT_MODEL = "meta/Llama-4-Scout-17B-16E-Instruct"
+
+_input = builtins.input
+
+class JobError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+def configure_ai(app, model=None):
+    """Non-interactive version of main.setup_ai_interactive: --model, then AI_MODEL, then the
+    fastest model of the last benchmark, then Llama."""
+    if not model:
+        model = os.getenv("AI_MODEL")
+    if not model:
+        measured = app.benchmark.load()
+        model = app.benchmark.fastest(measured) if measured else None
+    model = model or DEFAULT_MODEL
+    app.AI_MODEL = model
+    app.AI_CLIENT = app.llm.configure(preferred=model)
+    if not app.AI_CLIENT.available_models():
+        raise JobError(EXIT_CONFIG, "No AI provider configured: set GITHUB_TOKEN or GEMINI_API_KEY in .env")
+    print(f"[CLI] AI model: {model}")
+
+def require_email():
+    if not (os.getenv("EMAIL_ADDRESS") and os.getenv("EMAIL_PASSWORD")):
+        raise JobError(EXIT_CONFIG, "EMAIL_ADDRESS and EMAIL_PASSWORD must be set in .env")
+
+def require_dataset(app, value):
+    dataset = app.lead_store.resolve_dataset(app.lead_store.get_store(), value)
+    if not dataset:
+        raise JobError(EXIT_CONFIG, f"No lead set or file named '{value}'")
+    return dataset
+
+def cmd_scrape(app, options):
+    configure_ai(app, options.get("model"))
+    result = app.menu_scrape(domain=options["domain"], city=options["city"])
+    return result, EXIT_OK if result and result["accepted"] else EXIT_EMPTY
+
+def cmd_validate(app, options):
+    configure_ai(app, options.get("model"))
+    result = app.menu_validate_excel(dataset=require_dataset(app, options["dataset"]))
+    if result is None:
+        raise JobError(EXIT_ERROR, "Validation did not run")
+    return result, EXIT_OK if result["checked"] else EXIT_EMPTY
+
+def cmd_apply(app, options):
+    require_email()
+    configure_ai(app, options.get("model"))
+    result = app.menu_apply(dataset=require_dataset(app, options["dataset"]))
+    if result is None:
+        raise JobError(EXIT_CONFIG, "Could not start applying (is the CV present?)")
+    return result, EXIT_OK if result["processed"] else EXIT_EMPTY
+
+def cmd_smart_apply(app, options):
+    require_email()
+    configure_ai(app, options.get("model"))
+    result = app.smart_applier.run_smart_apply(app.AI_CLIENT, app.AI_MODEL, dataset=require_dataset(app, options["dataset"]))
+    if result is None:
+        raise JobError(EXIT_CONFIG, "Could not start applying (is the CV present?)")
+    return result, EXIT_OK if result["processed"] else EXIT_EMPTY
+
+def cmd_pipeline(app, options):
+    require_email()
+    configure_ai(app, options.get("model"))
+    result = app.menu_pipeline(domain=options["domain"], city=options["city"])
+    if result is None:
+        raise JobError(EXIT_CONFIG, "Could not start the pipeline (is the CV present?)")
+    return result, EXIT_OK if result["scraped"] else EXIT_EMPTY
+
+def cmd_bench(app, options):
+    results = app.smart_applier.test_models(requests_per_model=int(options.get("requests") or 3))
+    if not results:
+        raise JobError(EXIT_CONFIG, "No AI model could be benchmarked (missing keys?)")
+    return {"results": results}, EXIT_OK if any(r.get("ok") for r in results) else EXIT_ERROR
+
+COMMANDS = {
+    "scrape": (cmd_scrape, ("domain", "city")),
+    "validate": (cmd_validate, ("dataset",)),
+    "apply": (cmd_apply, ("dataset",)),
+    "smart-apply": (cmd_smart_apply, ("dataset",)),
+    "pipeline": (cmd_pipeline, ("domain", "city")),
+    "bench": (cmd_bench, ()),
+}
+
+def load_app():
+    """The main.py module. Started as `python main.py <command>`, it is __main__: importing
+    `main` would run its setup a second time, with its own copy of AI_CLIENT/AI_MODEL."""
+    entry = sys.modules.get("__main__")
+    if hasattr(entry, "menu_scrape"):
+        return entry
+    import main
+    return main
+
+def _no_prompt(prompt=""):
+    raise JobError(EXIT_USAGE, f"Unexpected prompt in a non-interactive run: {prompt.strip()!r}")
+
+def run_job(command, options):
+    """Runs one job without prompts. Returns its JSON summary (a dict with 'exit_code')."""
+    started = time.time()
+    summary = {"command": command, "options": options,
+               "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started))}
+    code = EXIT_OK
+    try:
+        if command not in COMMANDS:
+            raise JobError(EXIT_USAGE, f"Unknown command '{command}'")
+        fn, required = COMMANDS[command]
+        missing = [name for name in required if not options.get(name)]
+        if missing:
+            raise JobError(EXIT_USAGE, f"'{command}' needs: {', '.join(missing)}")
+        app = load_app()
+        # A code path that would still ask something fails the job instead of hanging the scheduler
+        builtins.input = _no_prompt
+        try:
+            result, code = fn(app, options)
+        finally:
+            builtins.input = _input
+            # Per-job timings; the spans stay for the --trace file, which covers all jobs
+            summary["timings"] = app.tracing.stats()
+            app.tracing.report()
+            app.tracing.reset(events=False)
+        summary["result"] = result
+    except JobError as e:
+        code = e.code
+        summary["error"] = str(e)
+    except ImportError as e:
+        code = EXIT_DEPENDENCY
+        summary["error"] = f"Missing dependency: {e}. Run 'python install.py'."
+    except KeyboardInterrupt:
+        code = EXIT_INTERRUPTED
+        summary["error"] = "Interrupted"
+    except Exception as e:
+        code = EXIT_ERROR
+        summary["error"] = f"{type(e).__name__}: {e}"
+    summary["exit_code"] = code
+    summary["duration_s"] = round(time.time() - started, 1)
+    if "error" in summary:
+        print(f"[CLI] {command} failed: {summary['error']}", file=sys.stderr)
+    return summary
+
+def load_jobs(path):
+    """Job file: {"model": ..., "stop_on_error": true, "jobs": [{"command": "scrape", "domain": ..., "city": ...}, ...]}."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    except (OSError, ValueError) as e:
+        raise JobError(EXIT_USAGE, f"Could not read job file {path}: {e}")
+    jobs = config.get("jobs") if isinstance(config, dict) else config
+    if not isinstance(jobs, list) or not all(isinstance(job, dict) and job.get("command") for job in jobs):
+        raise JobError(EXIT_USAGE, f"{path}: expected a list of jobs with a 'command' each")
+    defaults = {k: v for k, v in config.items() if k not in ("jobs", "stop_on_error")} if isinstance(config, dict) else {}
+    stop_on_error = config.get("stop_on_error", True) if isinstance(config, dict) else True
+    return [(job["command"], {**defaults, **{k: v for k, v in job.items() if k != "command"}}) for job in jobs], stop_on_error
+
+def run_jobs(path):
+    try:
+        jobs, stop_on_error = load_jobs(path)
+    except JobError as e:
+        print(f"[CLI] {e}", file=sys.stderr)
+        return {"jobs": [], "error": str(e), "exit_code": e.code}
+    summaries = []
+    code = EXIT_OK
+    for command, options in jobs:
+        summary = run_job(command, options)
+        summaries.append(summary)
+        if summary["exit_code"] not in (EXIT_OK, EXIT_EMPTY):
+            code = code or summary["exit_code"]
+            if stop_on_error or summary["exit_code"] == EXIT_INTERRUPTED:
+                break
+    return {"jobs": summaries, "exit_code": code}
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python cli.py",
+                                     description="Runs JobHunterAI jobs without prompts (for cron / Task Scheduler).")
+    parser.add_argument("--summary", metavar="FILE", help="also write the JSON summary to FILE")
+    parser.add_argument("--trace", metavar="FILE", default=os.getenv("JOBHUNTER_TRACE") or None,
+                        help="write a Chrome trace of the run to FILE (open in chrome://tracing or ui.perfetto.dev)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add(name, help_text):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("--model", help="preferred AI model (default: AI_MODEL, then the fastest benchmarked)")
+        return command
+
+    scrape = add("scrape", "scrape Google Maps and filter with AI into a lead set")
+    scrape.add_argument("--domain", required=True)
+    scrape.add_argument("--city", required=True)
+    for name, help_text in (("validate", "validate a lead set with AI"),
+                            ("apply", "send the basic application to a lead set"),
+                            ("smart-apply", "research each company and send a personalised letter")):
+        command = add(name, help_text)
+        command.add_argument("--dataset", required=True, help="lead set name, or an .xlsx/.csv file to import")
+    pipeline = add("pipeline", "scrape, filter and smart-apply in one streaming run")
+    pipeline.add_argument("--domain", required=True)
+    pipeline.add_argument("--city", required=True)
+    bench = commands.add_parser("bench", help="benchmark the configured AI models")
+    bench.add_argument("--requests", type=int, default=3, help="requests per model (default 3)")
+    run = commands.add_parser("run", help="run the jobs of a JSON job file in order")
+    run.add_argument("job_file")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "run":
+        summary = run_jobs(args.job_file)
+    else:
+        options = {k: v for k, v in vars(args).items() if k not in ("command", "summary", "trace") and v is not None}
+        summary = run_job(args.command, options)
+    if args.trace:
+        try:
+            from src import tracing
+            if tracing.export(args.trace):
+                summary["trace"] = args.trace
+        except ImportError as e:
+            print(f"[CLI] Could not write the trace: {e}", file=sys.stderr)
+
+    output = json.dumps(summary, ensure_ascii=False, default=str)
+    if args.summary:
+        try:
+            with open(args.summary, "w", encoding="utf-8") as f:
+                f.write(output + "\n")
+        except OSError as e:
+            print(f"[CLI] Could not write {args.summary}: {e}", file=sys.stderr)
+    # Last line of stdout: the machine-readable summary
+    print(output)
+    return summary["exit_code"]
+
+if __name__ == "__main__":
+    # Never prompt: missing libraries are only reported
+    install_dependencies(interactive=False)
+    sys.exit(main())
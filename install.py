@@ -1,40 +1,100 @@
+import hashlib
+import importlib
+import json
+import os
 import subprocess
 import sys
 
-def install_dependencies():
+from src import lazy, storage
+
+PACKAGES = [
+    "pandas", "selenium", "webdriver-manager", "beautifulsoup4",
+    "requests", "python-dotenv", "pypdf", "openpyxl",
+    "azure-ai-inference", "azure-core", "fpdf",
+    "reportlab", "duckduckgo-search"
+]
+
+# Handle naming differences for import vs pip
+MODULE_NAMES = {
+    "python-dotenv": "dotenv",
+    "azure-ai-inference": "azure.ai.inference",
+    "azure-core": "azure.core",
+    "webdriver-manager": "webdriver_manager",
+    "beautifulsoup4": "bs4",
+    "duckduckgo-search": "duckduckgo_search",
+}
+
+CACHE_FILE = "deps.json"
+
+def environment_key():
+    """Hash of the interpreter, its version, requirements.txt and the package list."""
+    digest = hashlib.sha256()
+    digest.update(sys.executable.encode())
+    digest.update(sys.version.encode())
+    digest.update(json.dumps(PACKAGES).encode())
+    requirements = os.path.join(os.path.dirname(os.path.abspath(__file__)), "requirements.txt")
+    if os.path.exists(requirements):
+        with open(requirements, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def _cached_key():
+    try:
+        with open(storage.state_path(CACHE_FILE), "r") as f:
+            return json.load(f).get("key")
+    except (OSError, ValueError):
+        return None
+
+def _save_key(key):
+    try:
+        with open(storage.state_path(CACHE_FILE), "w") as f:
+            json.dump({"key": key}, f)
+    except OSError:
+        pass
+
+def missing_packages():
+    """Packages whose module can't be found. Uses import specs only, so nothing heavy gets imported."""
+    return [p for p in PACKAGES if not lazy.is_installed(MODULE_NAMES.get(p, p))]
+
+def install_dependencies(force=False, interactive=True):
+    """Installs missing libraries after asking. Skipped while the last successful check still
+    matches this interpreter and requirements.txt. Non-interactive runs only report what is missing."""
+    key = environment_key()
+    if not force and _cached_key() == key:
+        return
+
+    missing = missing_packages()
+    if not missing:
+        _save_key(key)
+        return
+
     print("\n--- DEPENDENCY CHECK ---")
-    print("Do you want to check and install missing libraries? (y/n)")
-    choice = input("Choice: ").strip().lower()
+    print(f"Missing libraries: {', '.join(missing)}")
+    if not interactive:
+        print("Run 'python install.py' to install them.\n")
+        return
+    print("Do you want to install them? (y/n)")
+    try:
+        choice = input("Choice: ").strip().lower()
+    except EOFError:
+        choice = "n"
 
     if choice != 'y':
         print("Skipping dependency check.\n")
         return
 
     print("Checking and installing dependencies...")
-    packages = [
-        "pandas", "selenium", "webdriver-manager", "beautifulsoup4", 
-        "requests", "python-dotenv", "pypdf", "openpyxl", 
-        "azure-ai-inference", "azure-core", "fpdf",
-        "reportlab", "duckduckgo-search"
-    ]
-    
-    for package in packages:
+    for package in missing:
+        print(f"Installing {package}...")
         try:
-            # Handle naming differences for import vs pip
-            module_name = package
-            if package == "python-dotenv": module_name = "dotenv"
-            if package == "azure-ai-inference": module_name = "azure.ai.inference"
-            if package == "azure-core": module_name = "azure.core"
-            
-            __import__(module_name)
-        except ImportError:
-            print(f"Installing {package}...")
-            try:
-                subprocess.check_call([sys.executable, "-m", "pip", "install", package])
-            except:
-                print(f"Failed to install {package}. Please install manually.")
-            
+            subprocess.check_call([sys.executable, "-m", "pip", "install", package])
+        except:
+            print(f"Failed to install {package}. Please install manually.")
+    importlib.invalidate_caches()
+
+    if not missing_packages():
+        _save_key(key)
     print("Dependency check complete.\n")
 
 if __name__ == "__main__":
-    install_dependencies()
+    install_dependencies(force=True)
@@ -1,25 +1,49 @@
 import sys
 import os
-import time
 from install import install_dependencies
 
-# Always ask user about dependencies first
-install_dependencies()
+if __name__ == "__main__":
+    # Dependencies are checked first (skipped while the last check still matches this setup).
+    # With arguments this is a batch run (see cli.py): nothing may prompt.
+    install_dependencies(interactive=len(sys.argv) == 1)
 
 # Now import the rest
 try:
-    import pandas as pd
     from dotenv import load_dotenv
-    from azure.core.credentials import AzureKeyCredential
-    from azure.ai.inference import ChatCompletionsClient
-    import pypdf
-    from src import scraper, filter, generator, mailer, smart_applier, google_scraper
-except ImportError as e:
-    print(f"\n[WARNING] Missing dependency: {e}")
-    print("Some features might not work. Please try installing libraries again later or manually.")
-
-# Load env variables
+except ImportError:
+    def load_dotenv(*args, **kwargs):
+        return False
+# Loaded before the src imports: some modules read their settings at import time
 load_dotenv()
+from src import lazy
+# Each import is guarded on its own: a missing library only breaks the menu actions that need it,
+# which report it (see menu_main). Heavy libraries and the scraping/PDF modules are loaded on first use.
+pd = lazy.optional_import("pandas", lazy=True)
+pypdf = lazy.optional_import("pypdf", lazy=True)
+scraper = lazy.optional_import("src.scraper", lazy=True)
+google_scraper = lazy.optional_import("src.google_scraper", lazy=True)
+browser = lazy.optional_import("src.browser", lazy=True)
+filter = lazy.optional_import("src.filter", lazy=True)
+generator = lazy.optional_import("src.generator", lazy=True)
+pdf_renderer = lazy.optional_import("src.pdf_renderer", lazy=True)
+pipeline = lazy.optional_import("src.pipeline", lazy=True)
+mailer = lazy.optional_import("src.mailer")
+smart_applier = lazy.optional_import("src.smart_applier")
+outbox = lazy.optional_import("src.outbox")
+ledger = lazy.optional_import("src.ledger")
+llm = lazy.optional_import("src.llm")
+llm_router = lazy.optional_import("src.llm_router")
+keyword_cache = lazy.optional_import("src.keyword_cache")
+benchmark = lazy.optional_import("src.benchmark")
+lead_store = lazy.optional_import("src.lead_store")
+dedup = lazy.optional_import("src.dedup")
+prevalidate = lazy.optional_import("src.prevalidate")
+tracing = lazy.optional_import("src.tracing")
+missing = [module._name for module in (mailer, smart_applier, outbox, ledger, llm, lead_store)
+           if isinstance(module, lazy.MissingModule)]
+if missing:
+    print(f"\n[WARNING] Missing dependency for: {', '.join(missing)}")
+    print("Some features might not work. Please try installing libraries again later or manually.")
 
 # Global variables
 AI_CLIENT = None
@@ -142,8 +166,9 @@ def setup_ai_interactive():
         else:
              print("✅ GEMINI_API_KEY found.")
         
+        AI_MODEL = "gemini-flash-latest"
+        AI_CLIENT = llm.configure(preferred=AI_MODEL)
         print(f"Selected: Google Gemini")
-        # We don't set AI_CLIENT here (it's for Azure), smart_applier handles Gemini via google.genai
 
     else:
         # GitHub/Azure Setup (Default)
@@ -165,16 +190,26 @@ def setup_ai_interactive():
         print("2. DeepSeek V3 (deepseek/DeepSeek-V3-0324)")
         print("3. GPT-4o (openai/gpt-4o)")
         
+        # Real numbers from the last benchmark (menu option 6), if any
+        fastest = None
+        measured = benchmark.load()
+        if measured:
+            print("\nLast benchmark:")
+            benchmark.print_table(measured)
+            fastest = benchmark.fastest(measured, ["meta/Llama-4-Scout-17B-16E-Instruct", "deepseek/DeepSeek-V3-0324",
+                                                   "gpt-4o", "openai/gpt-4o"])
+            if fastest:
+                print(f"(Enter = fastest measured: {fastest})")
+        
         m_choice = input("Choice (1-3): ").strip()
         if m_choice == '2': AI_MODEL = "deepseek/DeepSeek-V3-0324"
         elif m_choice == '3': AI_MODEL = "openai/gpt-4o"
+        elif m_choice == '' and fastest: AI_MODEL = fastest
         else: AI_MODEL = "meta/Llama-4-Scout-17B-16E-Instruct"
         
         try:
-            AI_CLIENT = ChatCompletionsClient(
-                endpoint="https://models.github.ai/inference",
-                credential=AzureKeyCredential(token)
-            )
+            # Shared client: the selected model is tried first, then the usual fallback chain
+            AI_CLIENT = llm.configure(preferred=AI_MODEL)
             print(f"✅ Configured Client with {AI_MODEL}")
         except Exception as e:
             print(f"Error initializing client: {e}")
@@ -189,224 +224,235 @@ def extract_text_from_pdf(pdf_path):
     except:
         return ""
 
-def save_data(data, filename):
-    if not data:
-        return
-    df = pd.DataFrame(data)
-    try:
-        df = df.drop_duplicates(subset=['website'], keep='first')
-        df = df.drop_duplicates(subset=['email'], keep='first')
-    except: pass
-    
-    try:
-        df.to_excel(filename, index=False)
-        print(f"Saved to {filename}")
-    except:
-        csv_file = filename.replace(".xlsx", ".csv")
-        df.to_csv(csv_file, index=False)
-        print(f"Saved to {csv_file}")
+def dataset_for(*parts):
+    """Dataset name built from free text (city, domain, keyword), as the old file names were."""
+    name = "_".join(["leads"] + [str(p) for p in parts])
+    return "".join([c for c in name if c.isalpha() or c.isdigit() or c == '_']).rstrip()
+
+def lead_key(company):
+    """(name, website) of a scraped company."""
+    return company.name, company.website
 
-def menu_scrape():
+def menu_scrape(domain=None, city=None):
+    """Scrapes Maps for a domain/city (asked if not given) and filters with AI. Returns a summary dict."""
     print("GATHERING DATA")
-    domain = input("Domain / Activity Field (e.g. Web Development, Civil Engineering): ")
-    city = input("City: ")
+    if domain is None:
+        domain = input("Domain / Activity Field (e.g. Web Development, Civil Engineering): ")
+    if city is None:
+        city = input("City: ")
+    llm.print_quota()
     
     print(f"Generating search keywords for '{domain}' with AI...")
     keywords_list = generator.generate_search_keywords(domain, AI_CLIENT, AI_MODEL)
     print(f"AI suggests searching for: {keywords_list}")
     
     all_companies = []
+    # (name, website) -> keyword that found it first, to measure each keyword's yield
+    found_by = {}
+    # Shared by all keywords: a company found again is skipped before its site is fetched
+    seen = dedup.DedupIndex()
     
     for keyword in keywords_list:
         print(f"\n>>> Scraping Keyword: {keyword} in {city}...")
         # Limiting results per keyword to avoid taking too long, since we have multiple keywords
-        results = scraper.search_companies(city, keyword, max_results=30) 
+        results = scraper.search_companies(city, keyword, max_results=30, seen=seen) 
         if results:
             all_companies.extend(results)
+            for company in results:
+                found_by.setdefault(lead_key(company), keyword)
     
     if not all_companies:
         print("No companies found.")
-        return
+        for keyword in keywords_list:
+            keyword_cache.get_cache().record_yield(domain, keyword, 0, 0)
+        return {"dataset": None, "keywords": keywords_list, "found": 0, "accepted": 0}
 
-    df_raw = pd.DataFrame(all_companies)
-    try:
-        df_raw = df_raw.drop_duplicates(subset=['name', 'website'])
-    except: pass
-    
-    raw_companies = df_raw.to_dict('records')
+    raw_companies = all_companies
 
-    print(f"Found {len(raw_companies)} total unique results.")
-    
-    # Use domain in filename instead of single keyword
-    raw_filename = f"leads_{city}_{domain}_RAW.xlsx"
-    raw_filename = "".join([c for c in raw_filename if c.isalpha() or c.isdigit() or c in ['_','.']]).rstrip()
+    print(f"Found {len(raw_companies)} total unique results ({seen.skipped} duplicates skipped).")
     
-    save_data(raw_companies, raw_filename)
+    # Use domain in the dataset name instead of single keyword
+    dataset = dataset_for(city, domain)
+    store = lead_store.get_store()
+    lead_ids = store.add(dataset, raw_companies, status=lead_store.RAW)
+    print(f"Saved to lead set '{dataset}'")
     
     print("Filtering with AI...")
     
     valid_companies = []
-    seen_websites = set()
+    checked = set()
+    stopped = False
     
-    for company in raw_companies:
-        name = company.get('name')
-        website = company.get('website')
-        email = company.get('email')
-        snippet = company.get('snippet')
+    for lead_id, company in zip(lead_ids, raw_companies):
+        name, website, email, snippet = company.name, company.website, company.email, company.snippet
         
-        if website in seen_websites and website is not None:
+        # Same company already stored in this lead set (e.g. by an earlier scrape)
+        if lead_id in checked:
              continue
-        if website:
-            seen_websites.add(website)
+        checked.add(lead_id)
 
         is_dev_agency, found_email = filter.check_is_valid_company(name, website, snippet, AI_CLIENT, AI_MODEL, domain=domain)
+        if is_dev_agency is None:
+            # Not checked: the lead stays raw for the next run
+            stopped = True
+            print(filter.NOT_CHECKED)
+            break
         
         if not is_dev_agency:
             print(f"[REJECTED] {name} - Not a relevant agency")
+            store.set_status(lead_id, lead_store.REJECTED, "Not a relevant agency")
             continue
             
         if (not email or "@" not in str(email)) and found_email and "@" in str(found_email):
             email = found_email
-            company['email'] = email
+            company.email = email
             print(f"   [AI FOUND EMAIL] {email}")
 
         if not name or not website or not email or "@" not in str(email):
             print(f"[REJECTED] {name} - Missing Name/Email/Website")
+            store.set_status(lead_id, lead_store.REJECTED, "Missing Name/Email/Website")
             continue
             
         print(f"[ACCEPTED] {name}")
+        store.set_status(lead_id, lead_store.ACCEPTED, email=email)
         valid_companies.append(company)
-        
-    final_filename = f"leads_{city}_{domain}.xlsx"
-    final_filename = "".join([c for c in final_filename if c.isalpha() or c.isdigit() or c in ['_','.']]).rstrip()
     
+    # Remember how many unique / accepted leads each keyword brought, to rank them next time
+    keywords = keyword_cache.get_cache()
+    keywords.record_run(domain, keywords_list, found_by, [lead_key(company) for company in valid_companies])
+    keywords.report(domain, keywords_list)
+    browser.print_stats()
+        
     if valid_companies:
-        save_data(valid_companies, final_filename)
+        print(f"{len(valid_companies)} companies accepted in '{dataset}' (menu 9 exports it to Excel/CSV).")
     else:
         print("No valid companies found.")
-
-def menu_validate_excel():
-    print("VALIDATE EXCEL FILE")
-    files = [f for f in os.listdir('.') if (f.endswith('.xlsx') or f.endswith('.csv'))]
-    if not files:
-        print("No files found.")
-        return
-        
-    for i, f in enumerate(files):
-        print(f"{i+1}. {f}")
-        
-    try:
-        choice = int(input("Choice: ")) - 1
-        target_file = files[choice]
-    except:
-        return
-
-    if target_file.endswith('.xlsx'):
-        try:
-            df = pd.read_excel(target_file)
-        except:
-             df = pd.read_csv(target_file.replace('.xlsx', '.csv'))
-    else:
-        df = pd.read_csv(target_file)
-        
-    print(f"Loaded {len(df)} rows. Starting validation...")
-    
-    valid_rows = []
-    
-    for index, row in df.iterrows():
-        name = row.get('name', '')
-        website = row.get('website', '')
-        email = row.get('email', '')
-        snippet = row.get('snippet', '')
+    return {"dataset": dataset, "keywords": keywords_list, "found": len(raw_companies),
+            "duplicates_skipped": seen.skipped, "accepted": len(valid_companies), "budget_reached": stopped}
+
+def menu_validate_excel(dataset=None):
+    """Validates a lead set (asked if not given) with AI. Returns a summary dict, or None."""
+    print("VALIDATE LEADS")
+    store = lead_store.get_store()
+    dataset = dataset or lead_store.pick_dataset(store)
+    if not dataset:
+        return None
+
+    # Leads not validated yet; already validated/invalid ones keep their verdict
+    to_check = (lead_store.RAW, lead_store.ACCEPTED)
+    print(f"{store.count(dataset, to_check)} leads to check. Starting validation...")
+    llm.print_quota()
+    
+    kept = 0
+    checked = 0
+    stopped = False
+    # Leads missing a name/website (or sharing an email) are dropped column-wise before any call
+    summary = prevalidate.Summary()
+    def drop(lead, reason):
+        print(f"[DROPPED] {lead.name or lead.website} - {reason}")
+        store.set_status(lead.id, lead_store.INVALID, reason)
+    
+    for lead in prevalidate.survivors(store.iter_leads(dataset, to_check), summary, on_drop=drop):
+        name, website, email, snippet = lead.name, lead.website, lead.email, lead.snippet
+        checked += 1
         
         is_dev_agency, found_email = filter.check_is_valid_company(name, website, snippet, AI_CLIENT, AI_MODEL)
+        if is_dev_agency is None:
+            # Not checked: the lead keeps its status and is validated on the next run
+            checked -= 1
+            stopped = True
+            print(filter.NOT_CHECKED)
+            break
         
         if is_dev_agency:
-            if (pd.isna(email) or not email or "@" not in str(email)) and found_email and "@" in str(found_email):
-                row['email'] = found_email
+            if (not email or "@" not in str(email)) and found_email and "@" in str(found_email):
+                email = found_email
                 print(f"   [AI FOUND EMAIL] {found_email}")
             
-            current_email = row.get('email')
-            if name and website and current_email and "@" in str(current_email):
+            if name and website and email and "@" in str(email):
                 print(f"[KEPT] {name}")
-                valid_rows.append(row)
+                store.set_status(lead.id, lead_store.VALIDATED, email=email)
+                kept += 1
             else:
                  print(f"[DROPPED] {name} - Missing Info")
+                 store.set_status(lead.id, lead_store.INVALID, "Missing Info")
         else:
              print(f"[DROPPED] {name} - Not a dev agency")
+             store.set_status(lead.id, lead_store.INVALID, "Not a dev agency")
              
-    if valid_rows:
-        new_filename = f"validated_{target_file}"
-        save_data(valid_rows, new_filename)
+    summary.report("Validation calls")
+    if kept:
+        print(f"{kept} leads validated in '{dataset}'.")
     else:
         print("No valid rows remaining.")
+    return {"dataset": dataset, "checked": checked, "validated": kept, "invalid": checked - kept,
+            "dropped_before_ai": summary.dropped, "budget_reached": stopped}
 
-def menu_apply():
+def menu_apply(dataset=None):
+    """Sends the basic application to a lead set (asked if not given). Returns a summary dict, or None."""
     print("APPLICATION (BASIC)")
-    files = [f for f in os.listdir('.') if (f.endswith('.xlsx') or f.endswith('.csv')) and 'validated' in f]
-    if not files:
-        files = [f for f in os.listdir('.') if (f.endswith('.xlsx') or f.endswith('.csv')) and f.startswith('leads') and 'RAW' not in f]
-    
-    if not files:
-        print("No valid leads file found.")
-        return
-        
-    for i, f in enumerate(files):
-        print(f"{i+1}. {f}")
-        
-    try:
-        choice = int(input("Choice: ")) - 1
-        target_file = files[choice]
-    except:
-        return
-    
-    if target_file.endswith('.xlsx'):
-        try:
-            df = pd.read_excel(target_file)
-        except:
-             df = pd.read_csv(target_file.replace('.xlsx', '.csv'))
-    else:
-        df = pd.read_csv(target_file)
-
-    # CV Path Logic
-    resume_file = "CV.pdf"
-    if not os.path.exists(resume_file):
-        resume_file = RESUME_PATH if RESUME_PATH else "resume.pdf"
-    
-    if not os.path.exists(resume_file):
-        print(f"Error: Could not find CV ({resume_file}). Please make sure CV.pdf exists.")
-        return
+    store = lead_store.get_store()
+    target_dataset = dataset or lead_store.pick_dataset(store)
+    if not target_dataset:
+        return None
+    # Validated leads if the set went through validation, else the ones accepted at scrape time
+    statuses = store.apply_statuses(target_dataset)
+    if not store.count(target_dataset, statuses):
+        print("No valid leads in this set.")
+        return {"dataset": target_dataset, "processed": 0}
+
+    resume_file = smart_applier.find_resume()
+    if not resume_file:
+        return None
 
     user_cv_text = extract_text_from_pdf(resume_file)
-    
-    for index, row in df.iterrows():
-        company_name = row['name']
-        email = row['email']
-        website = row['website']
-        snippet = row.get('snippet', '')
-        
-        if pd.isna(email) or not email or "@" not in str(email):
-            continue
+    llm.print_quota()
+    
+    # Already-emailed recipients are skipped; letters generated before a crash are reused
+    sent_ledger = ledger.Ledger(ledger.campaign_name(target_dataset))
+    # Mail goes out from a background outbox at the provider's rate while letters keep being generated
+    sender = outbox.Outbox(EMAIL_ADDRESS, EMAIL_PASSWORD, tag=sent_ledger.campaign)
+    sender.on_sent(sent_ledger.on_outbox_result)
+    sender.start()
+    skipped = 0
+    processed = 0
+    # Missing, malformed, no-reply and duplicate addresses are dropped before any letter is generated
+    summary = prevalidate.Summary()
+    try:
+        for lead in prevalidate.survivors(store.iter_leads(target_dataset, statuses), summary,
+                                          require=(), require_email=True):
+            company_name, email, website, snippet = lead.name, lead.email, lead.website, lead.snippet
+
+            if sent_ledger.is_done(email):
+                skipped += 1
+                continue
             
-        print(f"Processing: {company_name}")
+            print(f"Processing: {company_name}")
+            processed += 1
         
-        letter_text = generator.generate_cover_letter_text(
-            company_name, 
-            f"Site: {website}, Info: {snippet}", 
-            user_cv_text,
-            AI_CLIENT, AI_MODEL,
-            os.getenv("USER_FULL_NAME"),
-            os.getenv("USER_CONTACT_EMAIL")
-        )
+            letter_text = sent_ledger.letter(email)
+            if letter_text:
+                print("   [RESUME] Reusing the letter generated in a previous run.")
+            else:
+                letter_text = generator.generate_cover_letter_text(
+                    company_name, 
+                    f"Site: {website}, Info: {snippet}", 
+                    user_cv_text,
+                    AI_CLIENT, AI_MODEL,
+                    os.getenv("USER_FULL_NAME"),
+                    os.getenv("USER_CONTACT_EMAIL")
+                )
         
-        if not letter_text:
-            print("   [SKIP] Failed to generate cover letter. Email NOT sent.")
-            continue
+                if not letter_text:
+                    print("   [SKIP] Failed to generate cover letter. Email NOT sent.")
+                    continue
+                sent_ledger.record_letter(email, company_name, letter_text)
 
-        pdf_name = f"Lettre_{str(company_name).replace(' ', '_')}.pdf"
-        if generator.create_pdf(letter_text, pdf_name):
-            subject = f"Candidature Stage: Developpeur Full Stack - {os.getenv('USER_FULL_NAME')}"
-            body = f"""Bonjour,
+            pdf_name = f"Lettre_{str(company_name).replace(' ', '_')}.pdf"
+            pdf_bytes = generator.create_pdf(letter_text, pdf_name)
+            if pdf_bytes:
+                subject = f"Candidature Stage: Developpeur Full Stack - {os.getenv('USER_FULL_NAME')}"
+                body = f"""Bonjour,
 
 Je vous adresse ma candidature pour un stage de Développeur Web Full Stack au sein de {company_name}.
 
@@ -417,37 +463,91 @@ Je reste à votre disposition pour un entretien.
 Cordialement,
 
 {os.getenv('USER_FULL_NAME')}"""
-            sent = mailer.send_email_with_attachments(
-                EMAIL_ADDRESS, EMAIL_PASSWORD,
-                email, subject, body,
-                resume_file, pdf_name
-            )
+                sent = mailer.send_email_with_attachments(
+                    EMAIL_ADDRESS, EMAIL_PASSWORD,
+                    email, subject, body,
+                    resume_file, (pdf_name, pdf_bytes),
+                    sender=sender,
+                    on_queued=lambda: sent_ledger.mark(email, "queued")
+                )
             
-            if sent:
-                print("Email Sent")
-                time.sleep(2)
-            else:
-                print("Email Error")
-
-def menu_scrape_google():
+                if sent:
+                    print("Email Queued")
+                else:
+                    sent_ledger.mark(email, "failed")
+                    print("Email Error")
+
+        summary.report("Letter generations")
+        if skipped:
+            print(f"\nSkipped {skipped} recipient(s) already emailed for this file.")
+        sender.drain()
+        result = {"dataset": target_dataset, "processed": processed, "already_emailed": skipped,
+                  "dropped_before_ai": summary.dropped, "campaign": sent_ledger.summary(), "still_queued": sender.pending()}
+    finally:
+        sender.close()
+        sent_ledger.close()
+
+    pdf_renderer.print_stats()
+    llm_router.print_stats()
+    return result
+
+def menu_scrape_google(keyword=None, count=None):
     print("GOOGLE SEARCH SCRAPER")
-    keyword = input("Keyword to search: ")
-    try:
-        count = int(input("Max results (default 10): ") or 10)
-    except:
-        count = 10
+    if keyword is None:
+        keyword = input("Keyword to search: ")
+    if count is None:
+        try:
+            count = int(input("Max results (default 10): ") or 10)
+        except:
+            count = 10
         
     print(f"Scraping Google for '{keyword}' ({count} results)...")
     results = google_scraper.scrape_google_search(keyword, num_results=count)
     
     if not results:
         print("No results found.")
-        return
+        return {"dataset": None, "found": 0}
 
-    filename = f"leads_google_{keyword}.xlsx"
-    filename = "".join([c for c in filename if c.isalpha() or c.isdigit() or c in ['_','.']]).rstrip()
+    dataset = dataset_for("google", keyword)
+    lead_store.get_store().add(dataset, results, status=lead_store.RAW)
+    print(f"Saved {len(results)} results to lead set '{dataset}' (menu 9 exports it to Excel/CSV).")
+    return {"dataset": dataset, "found": len(results)}
+
+def menu_pipeline(domain=None, city=None):
+    """Runs the streaming pipeline for a domain/city (asked if not given). Returns a summary dict, or None."""
+    print("PIPELINE: SCRAPE -> FILTER -> APPLY")
+    if domain is None:
+        domain = input("Domain / Activity Field (e.g. Web Development, Civil Engineering): ")
+    if city is None:
+        city = input("City: ")
     
-    save_data(results, filename)
+    print(f"Generating search keywords for '{domain}' with AI...")
+    keywords_list = generator.generate_search_keywords(domain, AI_CLIENT, AI_MODEL)
+    print(f"AI suggests searching for: {keywords_list}")
+    print("\n[INFO] Each company is filtered and applied to as soon as it is scraped. Press Ctrl+C to stop.")
+    
+    dataset = dataset_for(city, domain)
+    run = pipeline.run_pipeline(city, domain, keywords_list, dataset, AI_CLIENT, AI_MODEL)
+    if run is None:
+        return None
+    print(f"Leads saved in '{dataset}' (menu 9 exports it to Excel/CSV).")
+    browser.print_stats()
+    llm_router.print_stats()
+    return {"dataset": dataset, "keywords": keywords_list, "scraped": run.produced,
+            "stages": {stage.name: {"in": stage.received, "out": stage.passed} for stage in run.stages}}
+
+def menu_export():
+    print("EXPORT LEADS")
+    store = lead_store.get_store()
+    dataset = lead_store.pick_dataset(store)
+    if not dataset:
+        return
+    fmt = input("Format (1. Excel, 2. CSV) [1]: ").strip()
+    only_best = input("Only the leads to apply to? (y/n) [y]: ").strip().lower() != 'n'
+    statuses = store.apply_statuses(dataset) if only_best else None
+    path = f"{dataset}.csv" if fmt == '2' else f"{dataset}.xlsx"
+    path = store.export(dataset, path, statuses)
+    print(f"Saved to {path}")
 
 def menu_main():
     # 1. Setup Email (First, as requested)
@@ -465,32 +565,48 @@ def menu_main():
     while True:
         print("\n=== AUTO-JOB APPLIER ===")
         print("1. [SCRAPE] Recuperer des entreprises depuis Google Maps (et filtrer)")
-        print("2. [FILTER] Nettoyer un fichier Excel/CSV existant (Garder que les agences web)")
+        print("2. [FILTER] Valider un lot de leads ou un fichier Excel/CSV (Garder que les agences web)")
         print("3. [APPLY BASIC] Envoyer emails (Mode Simple)")
         print("4. [APPLY SMART] Envoyer emails (Analayse Site + Lettre Perso + Recherche Auto)")
         print("5. [CHAT] Discuter avec l'IA")
-        print("6. [TEST] Verifier la connexion aux modeles IA")
+        print("6. [TEST] Verifier / benchmarker les modeles IA (latence, disponibilite)")
         print("8. [SCRAPE] Recuperer depuis Google Search (Selenium)")
+        print("9. [EXPORT] Exporter un lot de leads vers Excel/CSV")
+        print("10. [PIPELINE] Scraper, filtrer et postuler en continu (Smart)")
         print("7. Quitter")
         
         c = input("Votre choix: ")
         
-        if c == '1':
-            menu_scrape()
-        elif c == '2':
-            menu_validate_excel()
-        elif c == '3':
-            menu_apply()
-        elif c == '4':
-            smart_applier.run_smart_apply(AI_CLIENT, AI_MODEL)
-        elif c == '5':
-            smart_applier.chat_with_ai()
-        elif c == '7':
+        if c == '7':
             break
-        elif c == '6':
-            smart_applier.test_models()
-        elif c == '8':
-            menu_scrape_google()
+        try:
+            if c == '1':
+                menu_scrape()
+            elif c == '2':
+                menu_validate_excel()
+            elif c == '3':
+                menu_apply()
+            elif c == '4':
+                smart_applier.run_smart_apply(AI_CLIENT, AI_MODEL)
+            elif c == '5':
+                smart_applier.chat_with_ai()
+            elif c == '6':
+                smart_applier.test_models()
+            elif c == '8':
+                menu_scrape_google()
+            elif c == '9':
+                menu_export()
+            elif c == '10':
+                menu_pipeline()
+            # Where the time went: browser, site fetches, AI calls, PDFs, SMTP
+            tracing.finish()
+        except ImportError as e:
+            # Modules are loaded lazily, so a missing library shows up here rather than at startup
+            print(f"\n[WARNING] Missing dependency: {e}")
+            print("Run 'python install.py' to install it.")
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        import cli
+        sys.exit(cli.main(sys.argv[1:]))
     menu_main()
@@ -0,0 +1,102 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src import quota, storage
+from src.llm_router import ROUTER, percentile
+
+BENCH_PROMPT = "In two sentences, explain why a cover letter should be tailored to each company."
+BENCH_FILE = "benchmark.json"
+BENCH_MAX_AGE = 7 * 86400   # older results are not used to seed the router
+
+def probe_once(client, model, timeout=30):
+    """One streamed request. Returns {"ok", "latency", "ttft", "tokens"}."""
+    messages = client.build_messages(BENCH_PROMPT)
+    start = time.perf_counter()
+    ttft = None
+    chunks = []
+    for _, chunk in client.stream(messages=messages, models=[model], timeout=timeout, verbose=False, attempts=1,
+                                  priority=quota.PRIORITY_VALIDATION):
+        if ttft is None:
+            ttft = time.perf_counter() - start
+        chunks.append(chunk)
+    latency = time.perf_counter() - start
+    return {"ok": bool(chunks), "latency": latency, "ttft": ttft,
+            "tokens": quota.estimate_tokens(*chunks) if chunks else 0}
+
+def probe(client, model, requests=3, timeout=30):
+    """`requests` sequential probes of one model (so its own rate limit is respected)."""
+    samples = [probe_once(client, model, timeout) for _ in range(max(1, requests))]
+    good = [s for s in samples if s["ok"]]
+    rates = [s["tokens"] / (s["latency"] - s["ttft"]) for s in good if s["latency"] > s["ttft"]]
+    return {
+        "model": model,
+        "requests": len(samples),
+        "ok": len(good),
+        "p50": percentile([s["latency"] for s in good], 0.5),
+        "p95": percentile([s["latency"] for s in good], 0.95),
+        "ttft": percentile([s["ttft"] for s in good], 0.5),
+        "tokens_per_second": sum(rates) / len(rates) if rates else None,
+        "latencies": [s["latency"] for s in good],
+        "failures": len(samples) - len(good),
+    }
+
+def run(client, models, requests=3, timeout=30):
+    """Benchmarks every model at the same time. Returns the results, feeds the router and saves them."""
+    if not models:
+        return []
+    print(f"Benchmarking {len(models)} model(s), {requests} request(s) each...")
+    with ThreadPoolExecutor(max_workers=len(models)) as pool:
+        results = list(pool.map(lambda m: probe(client, m, requests, timeout), models))
+    for result in results:
+        for latency in result["latencies"]:
+            ROUTER.record(result["model"], latency, True)
+        for _ in range(result["failures"]):
+            ROUTER.record(result["model"], 0.0, False)
+    save(results)
+    return results
+
+def _seconds(value):
+    return f"{value:5.1f}s" if value is not None else "    - "
+
+def print_table(results):
+    print(f"\n   {'Model':<40} {'OK':>5} {'p50':>7} {'p95':>7} {'TTFT':>7} {'tok/s':>7}")
+    for r in results:
+        rate = f"{r['tokens_per_second']:7.1f}" if r.get("tokens_per_second") else "      -"
+        print(f"   {r['model']:<40} {r['ok']:>2}/{r['requests']:<2} {_seconds(r['p50']):>7} {_seconds(r['p95']):>7} "
+              f"{_seconds(r['ttft']):>7} {rate}")
+
+def save(results):
+    with open(storage.state_path(BENCH_FILE), "w", encoding="utf-8") as f:
+        json.dump({"time": time.time(), "results": results}, f, indent=2)
+
+def load(max_age=BENCH_MAX_AGE):
+    """Saved results, or [] if there are none or they are older than `max_age` seconds."""
+    path = storage.state_path(BENCH_FILE)
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return []
+    if time.time() - data.get("time", 0) > max_age:
+        return []
+    return data.get("results", [])
+
+def seed_router():
+    """Primes the router's latency stats from the last saved benchmark."""
+    for result in load():
+        stats = ROUTER.stats_for(result["model"])
+        if stats.calls():
+            continue
+        for latency in result.get("latencies", []):
+            stats.record(latency, True)
+        for _ in range(result.get("failures", 0)):
+            stats.record(0.0, False)
+
+def fastest(results, models=None):
+    """Available model with the lowest p50 among `models` (all if None), or None."""
+    usable = [r for r in results if r["ok"] and r["p50"] is not None and (models is None or r["model"] in models)]
+    return min(usable, key=lambda r: r["p50"])["model"] if usable else None
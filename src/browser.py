@@ -0,0 +1,136 @@
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+
+from src import storage, tracing
+
+DRIVER_CACHE = "chromedriver.json"
+
+# Chrome keeps cookies (Maps consent) and its HTTP cache here between runs. "none" disables it.
+PROFILE_DIR = os.getenv("CHROME_PROFILE_DIR", "")
+
+# Launch timings of this session: (seconds, driver source)
+STATS = []
+
+def _version_from(command):
+    try:
+        output = subprocess.run(command, capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = re.search(r"(\d+\.\d+\.\d+\.\d+)", output)
+    return match.group(1) if match else None
+
+def chrome_version():
+    """Installed Chrome version (e.g. '126.0.6478.126'), or None if it can't be found."""
+    if sys.platform.startswith("win"):
+        try:
+            import winreg
+            with winreg.OpenKey(winreg.HKEY_CURRENT_USER, r"Software\Google\Chrome\BLBeacon") as key:
+                return winreg.QueryValueEx(key, "version")[0]
+        except OSError:
+            return None
+    if sys.platform == "darwin":
+        return _version_from(["/Applications/Google Chrome.app/Contents/MacOS/Google Chrome", "--version"])
+    for binary in ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser"):
+        version = _version_from([binary, "--version"])
+        if version:
+            return version
+    return None
+
+def _load_cache():
+    try:
+        with open(storage.state_path(DRIVER_CACHE), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_cache(data):
+    try:
+        with open(storage.state_path(DRIVER_CACHE), "w") as f:
+            json.dump(data, f)
+    except OSError:
+        pass
+
+def driver_path():
+    """Returns (chromedriver path or None, source).
+
+    The path resolved by webdriver-manager is cached and reused until the
+    installed Chrome version changes, so launches skip its network check.
+    """
+    version = chrome_version()
+    cached = _load_cache()
+    path = cached.get("driver_path")
+    if path and os.path.exists(path) and (version is None or cached.get("chrome_version") == version):
+        return path, "cached driver"
+    try:
+        from webdriver_manager.chrome import ChromeDriverManager
+        path = ChromeDriverManager().install()
+    except Exception as e:
+        print(f"[WARNING] Could not resolve chromedriver ({e}). Trying the system driver...")
+        return None, "system driver"
+    _save_cache({"driver_path": path, "chrome_version": version})
+    return path, "downloaded driver"
+
+def profile_dir():
+    if PROFILE_DIR.lower() == "none":
+        return None
+    path = os.path.abspath(PROFILE_DIR or storage.state_path("chrome-profile"))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def _start(options, path):
+    if path:
+        return webdriver.Chrome(service=Service(path), options=options)
+    # Selenium Manager / PATH lookup
+    return webdriver.Chrome(options=options)
+
+@tracing.traced("browser.new_driver")
+def new_driver(options=None, persistent_profile=True):
+    """Starts Chrome with the cached driver and the persistent profile. Returns the driver or None."""
+    options = options or webdriver.ChromeOptions()
+    profile = profile_dir() if persistent_profile else None
+    if profile:
+        options.add_argument(f"--user-data-dir={profile}")
+
+    start = time.perf_counter()
+    path, source = driver_path()
+    try:
+        driver = _start(options, path)
+    except Exception as e:
+        driver = None
+        error = e
+        if path:
+            # Stale cached driver (e.g. Chrome updated in place): resolve it again once
+            _save_cache({})
+            path, source = driver_path()
+            try:
+                driver = _start(options, path)
+            except Exception as e2:
+                error = e2
+        if driver is None and profile:
+            # Profile locked by another Chrome instance: fall back to a temporary one
+            print("[WARNING] Could not use the saved Chrome profile. Starting with a fresh one...")
+            options.arguments.remove(f"--user-data-dir={profile}")
+            try:
+                driver = _start(options, path)
+            except Exception as e3:
+                error = e3
+        if driver is None:
+            print(f"[ERROR] Could not initialize Chrome Driver: {error}")
+            return None
+
+    elapsed = time.perf_counter() - start
+    STATS.append((elapsed, source))
+    print(f"[INFO] Chrome ready in {elapsed:.1f}s ({source}{', saved profile' if profile else ''}).")
+    return driver
+
+def print_stats():
+    if STATS:
+        total = sum(seconds for seconds, _ in STATS)
+        print(f"Browser: {len(STATS)} launch(es), {total / len(STATS):.1f}s on average")
@@ -0,0 +1,96 @@
+import os
+import socket
+import threading
+import time
+
+# Endpoints the app depends on: name -> (host, port)
+ENDPOINTS = {
+    "github": ("models.github.ai", 443),
+    "gemini": ("generativelanguage.googleapis.com", 443),
+    "search": ("duckduckgo.com", 443),
+}
+
+PROBE_TIMEOUT = float(os.getenv("CONNECTIVITY_TIMEOUT", "3"))
+UP_TTL = 60.0     # a good probe is trusted this long
+DOWN_TTL = 15.0   # an outage is re-checked this often, so runs recover on their own
+
+class Endpoint:
+    """Cached DNS + TCP reachability of one host. Concurrent callers share a single probe."""
+
+    def __init__(self, name, host, port):
+        self.name = name
+        self.host = host
+        self.port = port
+        self.up = None
+        self.reason = None
+        self.checked = 0.0
+        self.address = None
+        self.lock = threading.Lock()
+
+    def _probe(self):
+        try:
+            if self.address is None or not self.up:
+                # Resolve again after an outage: the cached address may be the problem
+                info = socket.getaddrinfo(self.host, self.port, type=socket.SOCK_STREAM)
+                self.address = info[0][4]
+        except socket.gaierror:
+            return False, "DNS"
+        try:
+            with socket.create_connection(self.address[:2], timeout=PROBE_TIMEOUT):
+                pass
+        except OSError:
+            self.address = None
+            return False, "unreachable"
+        return True, None
+
+    def _set(self, up, reason=None):
+        if up != self.up and self.up is not None:
+            if up:
+                print(f"✅ {self.name} reachable again.")
+            else:
+                print(f"⚠️  {self.name} is offline ({reason}). Skipping remote calls until it is back.")
+        self.up = up
+        self.reason = reason
+        self.checked = time.time()
+
+    def reachable(self):
+        with self.lock:
+            ttl = UP_TTL if self.up else DOWN_TTL
+            if self.up is None or time.time() - self.checked >= ttl:
+                self._set(*self._probe())
+            return self.up
+
+    def recheck(self):
+        """Probes now, ignoring the cached result."""
+        with self.lock:
+            self._set(*self._probe())
+            return self.up
+
+    def mark(self, up, reason=None):
+        """Records what a real call just observed, so callers do not wait for the next probe."""
+        with self.lock:
+            self._set(up, reason)
+
+_ENDPOINTS = {name: Endpoint(name, host, port) for name, (host, port) in ENDPOINTS.items()}
+
+def reachable(name):
+    """True if the named endpoint answered its last (cached) probe. Unknown names are assumed reachable."""
+    endpoint = _ENDPOINTS.get(name)
+    return endpoint.reachable() if endpoint else True
+
+def is_online():
+    """False when none of the known endpoints can be reached (no network / no DNS)."""
+    return any(endpoint.reachable() for endpoint in _ENDPOINTS.values())
+
+def recheck(name):
+    """Fresh probe after a failed request: one reset connection is not an outage."""
+    endpoint = _ENDPOINTS.get(name)
+    return endpoint.recheck() if endpoint else True
+
+def mark_down(name, reason="network error"):
+    if name in _ENDPOINTS:
+        _ENDPOINTS[name].mark(False, reason)
+
+def mark_up(name):
+    if name in _ENDPOINTS:
+        _ENDPOINTS[name].mark(True)
@@ -0,0 +1,141 @@
+import difflib
+import re
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit
+
+from src.research_cache import normalize_name
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid", "ref", "source", "hl"}
+
+# Hosts shared by many companies: the path is what identifies the company there
+SHARED_HOSTS = {
+    "facebook.com", "m.facebook.com", "instagram.com", "linkedin.com", "twitter.com", "x.com",
+    "linktr.ee", "sites.google.com", "business.site", "wixsite.com", "wordpress.com", "blogspot.com",
+    "github.io", "google.com", "maps.google.com", "youtube.com", "tiktok.com",
+}
+
+# Names at least this similar (0-1) are the same company, unless their websites or emails differ
+NAME_THRESHOLD = 0.9
+
+def _blank(value):
+    if value is None:
+        return True
+    text = str(value).strip()
+    return not text or text.lower() in ("nan", "none", "n/a")
+
+def canonical_url(url):
+    """Identity of a website: 'http://www.X.ma/?utm_source=maps' and 'https://x.ma' -> 'x.ma'.
+
+    Scheme, 'www.', default ports, trailing slashes, fragments and tracking parameters
+    are dropped. On shared hosts (facebook.com, linktr.ee...) the path is kept.
+    Returns '' for missing values.
+    """
+    if _blank(url):
+        return ""
+    text = str(url).strip()
+    if "://" not in text:
+        text = "http://" + text
+    try:
+        parts = urlsplit(text)
+    except ValueError:
+        return text.lower()
+    host = (parts.hostname or "").lower().rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    # Google redirect links (/url?q=https://x.ma) point to the real site
+    if host.startswith("google.") and parts.path == "/url":
+        target = dict(query).get("q") or dict(query).get("url")
+        if target:
+            return canonical_url(unquote(target))
+    query = [(k, v) for k, v in query if k.lower() not in TRACKING_PARAMS and not k.lower().startswith("utm_")]
+    path = re.sub(r"/+", "/", parts.path).rstrip("/")
+    shared = host in SHARED_HOSTS or any(host.endswith("." + h) for h in SHARED_HOSTS)
+    if not shared:
+        # One website per company: branches and sub-pages of a site are the same company
+        return host
+    key = host + path.lower()
+    if query:
+        key += "?" + urlencode(sorted(query))
+    return key
+
+def canonical_email(email):
+    """'Mailto: Contact+maps@X.MA ' -> 'contact@x.ma'. Returns '' for missing or invalid values."""
+    if _blank(email):
+        return ""
+    text = str(email).strip().lower()
+    if text.startswith("mailto:"):
+        text = text[len("mailto:"):]
+    text = text.split("?")[0].strip()
+    if text.count("@") != 1:
+        return ""
+    local, domain = text.split("@")
+    local = local.split("+")[0]
+    if not local or "." not in domain:
+        return ""
+    return f"{local}@{domain}"
+
+def _block(name):
+    # Candidate pairs are only compared within a block: same first word of the normalized name
+    return name.split(" ", 1)[0] if name else ""
+
+class DedupIndex:
+    """Companies already seen, by canonical website, canonical email and (fuzzily) name.
+
+    Website and email checks are dict lookups. Names are compared only against
+    names of the same block, and only count as a match when the websites and
+    emails of the two companies don't contradict each other.
+    """
+
+    def __init__(self, threshold=NAME_THRESHOLD):
+        self.threshold = threshold
+        self.urls = {}
+        self.emails = {}
+        # block -> names of companies with a website / without one
+        self.blocks = {}
+        self.loose = {}
+        self.skipped = 0
+
+    def _keys(self, lead):
+        name = "" if _blank(lead.name) else normalize_name(lead.name)
+        return canonical_url(lead.website), canonical_email(lead.email), name
+
+    def match(self, lead):
+        """Returns (ref of the known company, reason) if `lead` was already seen, else None."""
+        url, email, name = self._keys(lead)
+        if url and url in self.urls:
+            return self.urls[url], "same website"
+        if email and email in self.emails:
+            return self.emails[email], "same email"
+        if not name:
+            return None
+        block = _block(name)
+        # A new website can't be equal to a known one: only companies without a website are candidates
+        candidates = self.loose.get(block, [])
+        if not url:
+            candidates = self.blocks.get(block, []) + candidates
+        for known_name, known_email, ref in candidates:
+            if email and known_email and email != known_email:
+                continue
+            if known_name == name:
+                return ref, "similar name"
+            matcher = difflib.SequenceMatcher(None, known_name, name)
+            if matcher.real_quick_ratio() >= self.threshold and matcher.quick_ratio() >= self.threshold \
+                    and matcher.ratio() >= self.threshold:
+                return ref, "similar name"
+        return None
+
+    def has_url(self, url):
+        key = canonical_url(url)
+        return bool(key) and key in self.urls
+
+    def add(self, lead, ref=None):
+        """Registers `lead` under `ref` (defaults to the lead itself)."""
+        ref = lead if ref is None else ref
+        url, email, name = self._keys(lead)
+        if url:
+            self.urls.setdefault(url, ref)
+        if email:
+            self.emails.setdefault(email, ref)
+        if name:
+            (self.blocks if url else self.loose).setdefault(_block(name), []).append((name, email, ref))
@@ -2,7 +2,12 @@ import os
 import requests
 from bs4 import BeautifulSoup
 
+from src import connectivity, llm, quota, tracing
+
+@tracing.traced("filter.get_site_content")
 def get_site_content(url):
+    if not connectivity.is_online():
+        return ""
     try:
         if not url.startswith("http"):
             url = f"https://{url}"
@@ -17,7 +22,13 @@ def get_site_content(url):
         pass
     return ""
 
+# Shown when check_is_valid_company could not get an answer (validation budget used up, or no model reachable)
+NOT_CHECKED = "Validation budget reached (or no AI model reachable): the remaining leads stay unchecked."
+
+@tracing.traced("filter.check_is_valid_company")
 def check_is_valid_company(name, website, snippet, client=None, model_name=None, domain="Web Development Agency"):
+    """Returns (is_relevant, email found by the AI). is_relevant is None when no model answered:
+    the quota scheduler refused the call or every model is unreachable."""
     content = ""
     if website:
         content = get_site_content(website)
@@ -40,24 +51,18 @@ def check_is_valid_company(name, website, snippet, client=None, model_name=None,
     }}
     """
 
-    if client and model_name:
+    llm_client = client or llm.get_llm()
+    if llm_client.available_models():
         try:
-            # Azure AI Inference Standard Call
-            from azure.ai.inference.models import SystemMessage, UserMessage
-            
-            # Formulate messages depending on SDK expectation (dicts usually work)
             messages = [
                 {"role": "system", "content": "You are a helpful assistant that analyzes companies."},
                 {"role": "user", "content": prompt}
             ]
             
-            response = client.complete(
-                messages=messages,
-                model=model_name,
-                temperature=0.1
-            )
-            
-            result = response.choices[0].message.content
+            result = llm_client.complete(messages=messages, preferred=model_name, temperature=0.1, verbose=False,
+                                        priority=quota.PRIORITY_VALIDATION)
+            if not result:
+                return None, None
             
             import json
             # clean potential markdown code blocks
@@ -71,6 +76,5 @@ def check_is_valid_company(name, website, snippet, client=None, model_name=None,
                 
         except Exception as e:
             print(f"AI Error: {e}")
-            pass
             
     return True, None
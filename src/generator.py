@@ -6,10 +6,7 @@ except ImportError:
 import os
 import time
 
-try:
-    import google.generativeai as genai
-except ImportError:
-    genai = None
+from src import pdf_renderer, llm, quota, keyword_cache, tracing
 
 def generate_cover_letter_text(company_name, company_info, cv_text, client, model_name, user_name, user_email):
     prompt = f"""
@@ -32,46 +29,10 @@ def generate_cover_letter_text(company_name, company_info, cv_text, client, mode
     6. Return ONLY the body of the letter. No markdown formatting, no preambles.
     """
     
-    # 1. Try Primary Client (GitHub/Azure)
-    if client and model_name:
-        try:
-            messages = [
-                {"role": "user", "content": prompt}
-            ]
-            response = client.complete(
-                messages=messages,
-                model=model_name,
-                temperature=0.7
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            print(f"   [Primary AI Failed: {e}] Switching to fallback...")
-
-    # 2. Try Fallback (Gemini)
-    gemini_key = os.getenv("GEMINI_API_KEY")
-    
-    if not gemini_key:
-         print("   [Fallback Skip] GEMINI_API_KEY not found in .env")
-    if not genai:
-         print("   [Fallback Skip] google.generativeai not installed/imported.")
-
-    if gemini_key and genai:
-        print("   [Fallback] Attempting Gemini...")
-        try:
-            genai.configure(api_key=gemini_key)
-            # Try a robust list of models (Prioritizing Flash as requested)
-            models_to_try = ['gemini-flash-latest']
-            for m in models_to_try:
-                try:
-                    model = genai.GenerativeModel(m)
-                    response = model.generate_content(prompt)
-                    return response.text
-                except Exception as inner_e:
-                    print(f"      - Gemini {m} failed: {inner_e}")
-                    continue
-        except Exception as e:
-            print(f"   [Fallback AI Error: {e}]")
-            
+    # Selected model first, then the shared fallback chain (GitHub Models, then Gemini)
+    letter = (client or llm.get_llm()).complete(prompt, system=None, preferred=model_name)
+    if letter:
+        return letter
     
     # FALLBACK TEMPLATE (If all AI failed)
     print("   ⚠️  AI models failed. Using Fallback Template.")
@@ -95,7 +56,10 @@ Email: {user_email}
 """
     return fallback_text
 
-def create_pdf(text, filename):
+@tracing.traced("generator.create_pdf")
+def create_pdf(text, filename=None):
+    """Renders the letter with fpdf. Writes a copy to `filename` if given.
+    Returns the PDF bytes, or False on error."""
     if not text:
         return False
         
@@ -104,74 +68,43 @@ def create_pdf(text, filename):
         return False
         
     try:
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", size=12)
-        
-        # simple cleanup for utf-8
-        try:
-            text = text.encode('latin-1', 'replace').decode('latin-1')
-        except:
-            pass
-        
-        pdf.multi_cell(0, 10, text)
-        pdf.output(filename)
-        return True
+        data = pdf_renderer.render_simple(text)
+        if filename:
+            with open(filename, "wb") as f:
+                f.write(data)
+        return data
     except Exception as e:
         print(f"PDF Error: {e}")
         return False
 
-def generate_search_keywords(domain, client, model_name):
+def generate_search_keywords(domain, client, model_name, language=None, refresh=False):
     """
     Generates a list of Google Maps search keywords based on a user's professional domain.
+    A plan cached for the same domain/language/model is reused (ranked by past yield) unless `refresh`.
     """
+    language = language or os.getenv("KEYWORD_LANGUAGE", "en")
+    cache = keyword_cache.get_cache()
+    if not refresh:
+        cached = cache.get_plan(domain, language, model_name)
+        if cached:
+            print("   Reusing the saved keyword plan (best performing first).")
+            return cached
+
+    language_hint = f"\n    Write the search terms in this language: {language}.\n" if language != "en" else ""
     prompt = f"""
     I need to find companies and agencies in the directory for Google Maps in the field of: "{domain}".
     
     Please generate a python list of 5 to 10 specific search terms (keywords) that I should type into Google Maps to find these companies.
     Focus on terms that would appear in the business name or category.
-    
+    {language_hint}
     Example input: "Web Development"
     Example output: ["Web Design Agency", "Software Company", "Digital Marketing Agency", "Website Developer", "IT Consultant"]
     
     RETURN ONLY THE PYTHON LIST. NO MARKDOWN. NO EXPLANATION.
     """
     
-    text_response = ""
-    
-    # 1. Try Primary Client (GitHub/Azure)
-    if client and model_name:
-        try:
-            messages = [
-                {"role": "user", "content": prompt}
-            ]
-            response = client.complete(
-                messages=messages,
-                model=model_name,
-                temperature=0.7
-            )
-            text_response = response.choices[0].message.content
-        except Exception as e:
-            print(f"   [Primary AI Failed: {e}] Switching to fallback...")
-
-    # 2. Try Fallback (Gemini)
-    if not text_response:
-        gemini_key = os.getenv("GEMINI_API_KEY")
-        if gemini_key:
-            try:
-                if not genai:
-                    import google.generativeai as genai
-                genai.configure(api_key=gemini_key)
-                # Try a robust list of models (Prioritizing Flash)
-                models_to_try = ['gemini-flash-latest', 'gemini-1.5-flash', 'gemini-1.5-pro']
-                for m in models_to_try:
-                    try:
-                        model = genai.GenerativeModel(m)
-                        response = model.generate_content(prompt)
-                        text_response = response.text
-                        break
-                    except: continue
-            except: pass
+    text_response = (client or llm.get_llm()).complete(prompt, system=None, preferred=model_name, verbose=False,
+                                                      priority=quota.PRIORITY_KEYWORDS)
 
     # Parse the response into a list
     if text_response:
@@ -180,11 +113,15 @@ def generate_search_keywords(domain, client, model_name):
             # Clean up potential markdown formatting like ```python ... ```
             clean_text = text_response.replace("```python", "").replace("```", "").strip()
             keywords = ast.literal_eval(clean_text)
-            if isinstance(keywords, list):
-                return keywords
+            if not isinstance(keywords, list):
+                keywords = None
         except:
             # Fallback parsing: split by newlines if it's not a valid list
-            return [line.strip("- *") for line in text_response.splitlines() if line.strip()]
+            keywords = [line.strip("- *") for line in text_response.splitlines() if line.strip()]
+        if keywords:
+            keywords = [str(k) for k in keywords]
+            cache.save_plan(domain, language, model_name, keywords)
+            return cache.rank(domain, keywords) or keywords
 
     # Default fallback if AI fails completely
     return [f"{domain} agency", f"{domain} company", f"{domain} services"]
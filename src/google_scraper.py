@@ -4,10 +4,11 @@ import pandas as pd
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+
+from src import browser, dedup
+from src.lead import Lead
 
 def setup_driver():
     """Configures and returns a Selenium WebDriver instance."""
@@ -18,13 +19,8 @@ def setup_driver():
     options.add_argument("--window-size=1920,1080")
     options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
     
-    try:
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
-        return driver
-    except Exception as e:
-        print(f"Error setting up driver: {e}")
-        return None
+    # Cached driver path + saved profile; returns None if Chrome can't be started
+    return browser.new_driver(options)
 
 def extract_emails_from_text(text):
     """Finds all distinct emails in a text string."""
@@ -82,6 +78,8 @@ def scrape_google_search(keyword, num_results=10):
 
         # Collect Links
         links = []
+        # Same site under another URL (http/https, www., tracking params) is visited once
+        seen_links = dedup.DedupIndex()
         page_num = 0
         while len(links) < num_results:
             search_results = driver.find_elements(By.CSS_SELECTOR, "div.g")
@@ -92,7 +90,8 @@ def scrape_google_search(keyword, num_results=10):
                     link = anchor.get_attribute("href")
                     title = res.find_element(By.TAG_NAME, "h3").text
                     
-                    if link and "google.com" not in link and link not in [l['link'] for l in links]:
+                    if link and "google.com" not in link and not seen_links.has_url(link):
+                        seen_links.add(Lead(website=link))
                         links.append({'title': title, 'link': link})
                         if len(links) >= num_results:
                             break
@@ -142,21 +141,11 @@ def scrape_google_search(keyword, num_results=10):
                 else:
                     print("   -> No email found.")
                 
-                results_data.append({
-                    'name': name,
-                    'website': url,
-                    'email': found_email,
-                    'snippet': f"Scraped from Google for {keyword}" 
-                })
+                results_data.append(Lead(name, url, found_email, f"Scraped from Google for {keyword}", source="google"))
                 
             except Exception as e:
                 print(f"   -> Failed to visit {url}: {e}")
-                results_data.append({
-                    'name': name,
-                    'website': url,
-                    'email': None,
-                    'snippet': f"Error accessing site: {str(e)}"
-                })
+                results_data.append(Lead(name, url, None, f"Error accessing site: {str(e)}", source="google"))
 
     finally:
         driver.quit()
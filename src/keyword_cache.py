@@ -0,0 +1,125 @@
+import json
+import os
+import threading
+import time
+
+from src import storage
+from src.research_cache import normalize_name
+
+PLAN_TTL = float(os.getenv("KEYWORD_PLAN_TTL_DAYS", "30")) * 86400
+DEAD_AFTER_RUNS = 2   # keywords that found nothing in this many scrapes are dropped from plans
+
+def normalize_domain(domain):
+    return normalize_name(domain)
+
+class KeywordCache:
+    """Generated search keywords per (domain, language, model) and their yield in past scrapes.
+
+    Yield is kept per (domain, keyword): how many scrapes used it, how many
+    new unique leads it brought and how many of those passed validation.
+    """
+
+    def __init__(self, db_name="keywords.db"):
+        self.db = storage.connect(db_name)
+        self.lock = threading.Lock()
+        self.db.execute("""CREATE TABLE IF NOT EXISTS keyword_plans (
+            domain TEXT NOT NULL,
+            language TEXT NOT NULL,
+            model TEXT NOT NULL,
+            keywords TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            PRIMARY KEY (domain, language, model))""")
+        self.db.execute("""CREATE TABLE IF NOT EXISTS keyword_yield (
+            domain TEXT NOT NULL,
+            keyword TEXT NOT NULL,
+            runs INTEGER NOT NULL DEFAULT 0,
+            unique_leads INTEGER NOT NULL DEFAULT 0,
+            accepted INTEGER NOT NULL DEFAULT 0,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (domain, keyword))""")
+        self.db.commit()
+
+    def get_plan(self, domain, language, model):
+        """Cached keywords ranked by past yield, or None if there is no fresh plan."""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT keywords, created_at FROM keyword_plans WHERE domain=? AND language=? AND model=?",
+                (normalize_domain(domain), language, model or "")).fetchone()
+        if not row or time.time() - row[1] > PLAN_TTL:
+            return None
+        return self.rank(domain, json.loads(row[0])) or None
+
+    def save_plan(self, domain, language, model, keywords):
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO keyword_plans (domain, language, model, keywords, created_at) "
+                            "VALUES (?, ?, ?, ?, ?)",
+                            (normalize_domain(domain), language, model or "", json.dumps(keywords), time.time()))
+            self.db.commit()
+
+    def yields(self, domain):
+        """{keyword: (runs, unique_leads, accepted)}"""
+        with self.lock:
+            rows = self.db.execute("SELECT keyword, runs, unique_leads, accepted FROM keyword_yield WHERE domain=?",
+                                   (normalize_domain(domain),)).fetchall()
+        return {keyword.lower(): (runs, unique_leads, accepted) for keyword, runs, unique_leads, accepted in rows}
+
+    def rank(self, domain, keywords):
+        """Best accepted-leads-per-scrape first; untried keywords next; dead keywords dropped."""
+        stats = self.yields(domain)
+
+        def score(item):
+            position, keyword = item
+            runs, unique_leads, accepted = stats.get(keyword.lower(), (0, 0, 0))
+            if not runs:
+                return (1, 0, 0, position)
+            return (0, -accepted / runs, -unique_leads / runs, position)
+
+        ranked = []
+        for _, keyword in sorted(enumerate(keywords), key=score):
+            runs, unique_leads, _ = stats.get(keyword.lower(), (0, 0, 0))
+            if runs >= DEAD_AFTER_RUNS and not unique_leads:
+                continue
+            ranked.append(keyword)
+        return ranked
+
+    def record_yield(self, domain, keyword, unique_leads, accepted):
+        with self.lock:
+            self.db.execute("""INSERT INTO keyword_yield (domain, keyword, runs, unique_leads, accepted, updated_at)
+                VALUES (?, ?, 1, ?, ?, ?)
+                ON CONFLICT(domain, keyword) DO UPDATE SET
+                    runs=runs + 1,
+                    unique_leads=unique_leads + excluded.unique_leads,
+                    accepted=accepted + excluded.accepted,
+                    updated_at=excluded.updated_at""",
+                (normalize_domain(domain), keyword.lower(), unique_leads, accepted, time.time()))
+            self.db.commit()
+
+    def record_run(self, domain, keywords, found_by, accepted):
+        """Records one scrape run: `found_by` maps each unique lead (any key) to the keyword that
+        found it first, `accepted` lists the keys of the leads that passed the filter."""
+        unique_counts = {}
+        for keyword in found_by.values():
+            unique_counts[keyword] = unique_counts.get(keyword, 0) + 1
+        accepted_counts = {}
+        for key in accepted:
+            keyword = found_by.get(key)
+            accepted_counts[keyword] = accepted_counts.get(keyword, 0) + 1
+        for keyword in keywords:
+            self.record_yield(domain, keyword, unique_counts.get(keyword, 0), accepted_counts.get(keyword, 0))
+
+    def report(self, domain, keywords):
+        stats = self.yields(domain)
+        print("\nKeyword yield:")
+        for keyword in keywords:
+            runs, unique_leads, accepted = stats.get(keyword.lower(), (0, 0, 0))
+            print(f"   {keyword:<40} scrapes {runs:>3}  unique {unique_leads:>4}  accepted {accepted:>4}")
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+def get_cache():
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = KeywordCache()
+        return _CACHE
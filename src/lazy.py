@@ -0,0 +1,48 @@
+import importlib
+import importlib.util
+import sys
+
+def lazy_import(name):
+    """Returns module `name`, executed only when one of its attributes is first used.
+
+    Raises ImportError right away if the module is not installed, so
+    optional-dependency checks keep working.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+class MissingModule:
+    """Stands in for a module that could not be imported: using it raises the original ImportError."""
+
+    def __init__(self, name, error):
+        self._name = name
+        self._error = error
+
+    def __getattr__(self, attr):
+        raise ImportError(f"{self._name} is unavailable ({self._error})", name=self._name)
+
+def optional_import(name, lazy=False):
+    """Imports `name` (with lazy_import if `lazy`). A missing dependency gives a MissingModule,
+    so only the features that use it fail, each with its own ImportError."""
+    try:
+        return lazy_import(name) if lazy else importlib.import_module(name)
+    except ImportError as e:
+        return MissingModule(name, e)
+
+def is_installed(name):
+    """True if `name` can be imported, without importing it."""
+    if name in sys.modules:
+        return True
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
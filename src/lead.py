@@ -0,0 +1,43 @@
+def text(value):
+    """Field value as a trimmed string ('' for None/NaN, 212.0 -> '212')."""
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        if value != value:
+            return ""
+        if value.is_integer():
+            value = int(value)
+    return str(value).strip()
+
+class Lead:
+    """One company, from the scrapers, an imported file or the lead store.
+
+    Fields are always strings ('' when missing). `source` says where the lead
+    came from (maps, google, file name); `id` and `status` are set once it is
+    stored. Columns of imported files that are not lead fields go in `extra`.
+    """
+
+    __slots__ = ("name", "website", "email", "snippet", "source", "status", "id", "extra")
+
+    # Columns shared with files and the store
+    FIELDS = ("name", "website", "email", "snippet")
+
+    def __init__(self, name="", website="", email="", snippet="", source="", status=None, id=None, extra=None):
+        self.name = text(name)
+        self.website = text(website)
+        self.email = text(email)
+        self.snippet = text(snippet)
+        self.source = source
+        self.status = status
+        self.id = id
+        self.extra = extra or {}
+
+    def to_record(self):
+        """Lead -> dict of its fields and extra columns, as exported to Excel/CSV."""
+        record = {"id": self.id, "name": self.name, "website": self.website, "email": self.email,
+                  "snippet": self.snippet, "source": self.source, "status": self.status}
+        record.update({k: v for k, v in self.extra.items() if k not in record})
+        return record
+
+    def __repr__(self):
+        return f"Lead({self.name!r}, website={self.website!r}, email={self.email!r}, status={self.status!r})"
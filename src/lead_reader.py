@@ -0,0 +1,82 @@
+import csv
+import os
+
+from src.lead import Lead, text
+
+# Rows read per chunk, from files and from the lead store
+CHUNK_SIZE = int(os.getenv("LEADS_CHUNK_SIZE", "500"))
+
+# Accepted spellings of each field, after lowercasing and trimming the header
+ALIASES = {
+    "name": ("name", "company name", "company", "nom", "entreprise", "societe", "société"),
+    "website": ("website", "site", "site web", "url", "web"),
+    "email": ("email", "e-mail", "mail", "courriel"),
+    "snippet": ("snippet", "description", "info"),
+}
+FIELDS = Lead.FIELDS
+
+def resolve_columns(header):
+    """Column positions of each field for a file header, resolved once per file.
+    Returns ({field: position}, {position: extra column name})."""
+    fields = {}
+    extras = {}
+    for position, column in enumerate(header):
+        key = str(column).strip().lower() if column is not None else ""
+        if key in ("id", "status", "source"):
+            # Set by the store (columns of an exported lead set)
+            continue
+        for field, names in ALIASES.items():
+            if key in names and field not in fields:
+                fields[field] = position
+                break
+        else:
+            if key:
+                extras[position] = str(column).strip()
+    return fields, extras
+
+def _rows(fields, extras, values_iter, source):
+    positions = [fields.get(field) for field in FIELDS]
+    width = max([p for p in positions if p is not None] + list(extras) + [-1]) + 1
+    for values in values_iter:
+        values = tuple(values)
+        if len(values) < width:
+            values += (None,) * (width - len(values))
+        row = [text(values[p]) if p is not None else "" for p in positions]
+        extra = {column: value for p, column in extras.items() if (value := text(values[p]))}
+        if any(row) or extra:
+            yield Lead(*row, source=source, extra=extra)
+
+def _csv_values(path):
+    with open(path, newline="", encoding="utf-8-sig", errors="replace") as f:
+        yield from csv.reader(f)
+
+def _xlsx_values(path):
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+def iter_leads(path, chunk_size=CHUNK_SIZE):
+    """Yields the leads of an .xlsx/.csv file as lists of Lead, `chunk_size` at a time.
+
+    Files are streamed (csv reader, openpyxl read-only mode), so memory stays
+    bounded whatever the file size.
+    """
+    values_iter = _csv_values(path) if path.endswith(".csv") else _xlsx_values(path)
+    try:
+        header = next(values_iter, None)
+        if header is None:
+            return
+        fields, extras = resolve_columns(header)
+        chunk = []
+        for lead in _rows(fields, extras, values_iter, os.path.basename(path)):
+            chunk.append(lead)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        values_iter.close()
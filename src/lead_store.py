@@ -0,0 +1,292 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from src import dedup, lazy, lead_reader, storage
+from src.lead import Lead, text
+
+pd = lazy.optional_import("pandas", lazy=True)
+
+# Lead life cycle: raw (scraped) -> accepted / rejected (scrape filter) -> validated / invalid (validation)
+RAW = "raw"
+ACCEPTED = "accepted"
+REJECTED = "rejected"
+VALIDATED = "validated"
+INVALID = "invalid"
+
+# Best leads first: what the apply modes send to
+APPLY_STATUSES = (VALIDATED, ACCEPTED)
+
+# Statuses a lead can have once it went through a file's stage
+REACHED = {
+    RAW: (RAW, ACCEPTED, REJECTED, VALIDATED, INVALID),
+    ACCEPTED: (ACCEPTED, REJECTED, VALIDATED, INVALID),
+    VALIDATED: (VALIDATED, INVALID),
+}
+
+def dataset_name(path):
+    """Dataset of an imported file: 'validated_leads_X_RAW.xlsx' -> 'leads_X'."""
+    name = os.path.splitext(os.path.basename(str(path)))[0]
+    if name.startswith("validated_"):
+        name = name[len("validated_"):]
+    if name.endswith("_RAW"):
+        name = name[:-len("_RAW")]
+    return name
+
+def file_status(path):
+    """Stage of the leads in an exported file, from its name."""
+    name = os.path.basename(str(path))
+    if name.startswith("validated_"):
+        return VALIDATED
+    if "_RAW" in name:
+        return RAW
+    return ACCEPTED
+
+class LeadStore:
+    """All leads in one SQLite table, grouped by dataset (one per scrape or imported file).
+
+    Writes are appends (a company already in the dataset is not added again,
+    see dedup.DedupIndex); moving through the pipeline is a status update.
+    Excel/CSV are only used to import and export.
+    """
+
+    def __init__(self, db_name="leads.db"):
+        self.db = storage.connect(db_name)
+        self.lock = threading.Lock()
+        self.db.execute("""CREATE TABLE IF NOT EXISTS leads (
+            id INTEGER PRIMARY KEY,
+            dataset TEXT NOT NULL,
+            name TEXT NOT NULL DEFAULT '',
+            website TEXT NOT NULL DEFAULT '',
+            email TEXT NOT NULL DEFAULT '',
+            snippet TEXT NOT NULL DEFAULT '',
+            source TEXT NOT NULL DEFAULT '',
+            extra TEXT,
+            status TEXT NOT NULL,
+            reason TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL)""")
+        # Databases created before the source column existed
+        columns = [r[1] for r in self.db.execute("PRAGMA table_info(leads)")]
+        if "source" not in columns:
+            self.db.execute("ALTER TABLE leads ADD COLUMN source TEXT NOT NULL DEFAULT ''")
+        self.db.execute("CREATE UNIQUE INDEX IF NOT EXISTS leads_identity ON leads (dataset, website, email, name)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS leads_dataset_status ON leads (dataset, status)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS leads_website ON leads (website)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS leads_email ON leads (email)")
+        self.db.commit()
+
+    def index(self, dataset):
+        """Dedup index of the leads already in a dataset, with lead ids as refs."""
+        index = dedup.DedupIndex()
+        with self.lock:
+            rows = self.db.execute("SELECT id, name, website, email FROM leads WHERE dataset=? ORDER BY id",
+                                   (dataset,)).fetchall()
+        for lead_id, name, website, email in rows:
+            index.add(Lead(name, website, email), lead_id)
+        return index
+
+    def add(self, dataset, leads, status=RAW, index=None):
+        """Appends leads to a dataset. Returns their ids, in order (the existing id when the
+        same company, by canonical website/email or name, is already stored).
+
+        Pass the dataset's `index` when adding in several batches, so it is loaded once.
+        """
+        now = time.time()
+        ids = []
+        if index is None:
+            index = self.index(dataset)
+        with self.lock:
+            for lead in leads:
+                found = index.match(lead)
+                if found:
+                    ids.append(found[0])
+                    continue
+                cursor = self.db.execute("""INSERT OR IGNORE INTO leads
+                    (dataset, name, website, email, snippet, source, extra, status, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (dataset, lead.name, lead.website, lead.email, lead.snippet, lead.source,
+                     json.dumps(lead.extra) if lead.extra else None, status, now, now))
+                if cursor.rowcount:
+                    ids.append(cursor.lastrowid)
+                else:
+                    ids.append(self.db.execute(
+                        "SELECT id FROM leads WHERE dataset=? AND website=? AND email=? AND name=?",
+                        (dataset, lead.website, lead.email, lead.name)).fetchone()[0])
+                index.add(lead, ids[-1])
+            self.db.commit()
+        return ids
+
+    def set_status(self, lead_id, status, reason=None, email=None):
+        """Moves a lead to `status`; `email` fills in an address found during validation."""
+        with self.lock:
+            if email:
+                try:
+                    self.db.execute("UPDATE leads SET status=?, reason=?, email=?, updated_at=? WHERE id=?",
+                                    (status, reason, text(email), time.time(), lead_id))
+                    self.db.commit()
+                    return
+                except sqlite3.IntegrityError:
+                    # The same lead with that email is already stored
+                    pass
+            self.db.execute("UPDATE leads SET status=?, reason=?, updated_at=? WHERE id=?",
+                            (status, reason, time.time(), lead_id))
+            self.db.commit()
+
+    def datasets(self):
+        """{dataset: {status: count}}, most recently updated first."""
+        with self.lock:
+            rows = self.db.execute("""SELECT dataset, status, COUNT(*), MAX(updated_at) FROM leads
+                GROUP BY dataset, status ORDER BY MAX(updated_at) DESC""").fetchall()
+        result = {}
+        for dataset, status, count, _ in rows:
+            result.setdefault(dataset, {})[status] = count
+        return result
+
+    def _where(self, dataset, statuses):
+        sql = " WHERE dataset=?"
+        params = [dataset]
+        if statuses:
+            sql += f" AND status IN ({','.join('?' * len(statuses))})"
+            params.extend(statuses)
+        return sql, params
+
+    def count(self, dataset, statuses=None):
+        where, params = self._where(dataset, statuses)
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM leads" + where, params).fetchone()[0]
+
+    def iter_leads(self, dataset, statuses=None, chunk_size=lead_reader.CHUNK_SIZE):
+        """Yields the leads of a dataset as lists of Lead, `chunk_size` at a time, in insertion order.
+
+        Pages are fetched by id, so status updates made while iterating don't shift them.
+        """
+        where, params = self._where(dataset, statuses)
+        sql = ("SELECT id, name, website, email, snippet, source, extra, status FROM leads"
+               + where + " AND id > ? ORDER BY id LIMIT ?")
+        last_id = 0
+        while True:
+            with self.lock:
+                rows = self.db.execute(sql, params + [last_id, chunk_size]).fetchall()
+            if not rows:
+                return
+            yield [Lead(name, website, email, snippet, source, status, lead_id, json.loads(extra) if extra else None)
+                   for lead_id, name, website, email, snippet, source, extra, status in rows]
+            last_id = rows[-1][0]
+
+    def each(self, dataset, statuses=None):
+        """Leads of a dataset one by one, read in chunks."""
+        for chunk in self.iter_leads(dataset, statuses):
+            yield from chunk
+
+    def leads(self, dataset, statuses=None):
+        """Leads of a dataset as dicts (with 'id' and 'status'), in insertion order."""
+        return [lead.to_record() for lead in self.each(dataset, statuses)]
+
+    def frame(self, dataset, statuses=None):
+        """Leads of a dataset as a DataFrame (empty strings become missing values)."""
+        df = pd.DataFrame(self.leads(dataset, statuses))
+        return df.replace({"": None}) if not df.empty else df
+
+    def apply_statuses(self, dataset):
+        """The best statuses present in a dataset for applying: validated leads if any, else accepted ones."""
+        counts = self.datasets().get(dataset, {})
+        for status in APPLY_STATUSES:
+            if counts.get(status):
+                return (status,)
+        return (RAW,)
+
+    def import_file(self, path, dataset=None):
+        """Loads an .xlsx/.csv file into the store, streamed in chunks. Returns (dataset, number of rows)."""
+        status = file_status(path)
+        dataset = dataset or dataset_name(path)
+        count = 0
+        index = self.index(dataset)
+        for chunk in lead_reader.iter_leads(path):
+            ids = self.add(dataset, chunk, status=status, index=index)
+            if status != RAW:
+                # Rows still raw (imported from the RAW file) move up to this file's stage; leads that
+                # were validated or rejected since keep their status
+                with self.lock:
+                    self.db.executemany("UPDATE leads SET status=?, updated_at=? WHERE id=? AND status=?",
+                                        [(status, time.time(), lead_id, RAW) for lead_id in ids])
+                    self.db.commit()
+            count += len(chunk)
+        return dataset, count
+
+    def export(self, dataset, path, statuses=None):
+        """Writes a dataset to .xlsx or .csv (by extension). Returns the path written."""
+        df = self.frame(dataset, statuses)
+        if not df.empty:
+            df = df.drop(columns=["id"])
+        if path.endswith(".csv"):
+            df.to_csv(path, index=False)
+            return path
+        try:
+            df.to_excel(path, index=False)
+        except ImportError:
+            # openpyxl missing
+            path = path[:-len(".xlsx")] + ".csv" if path.endswith(".xlsx") else path + ".csv"
+            df.to_csv(path, index=False)
+        return path
+
+def describe(counts):
+    return ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+
+def resolve_dataset(store, value):
+    """Dataset for a name or an .xlsx/.csv path. A file is imported unless its lead set already
+    went through the file's stage (so validation results are kept). Returns None if there is no such set."""
+    datasets = store.datasets()
+    if value in datasets:
+        return value
+    if (value.endswith(".xlsx") or value.endswith(".csv")) and os.path.exists(value):
+        dataset = dataset_name(value)
+        if any(status in REACHED[file_status(value)] for status in datasets.get(dataset, {})):
+            print(f"{value} was already imported: using lead set '{dataset}'.")
+            return dataset
+        dataset, count = store.import_file(value)
+        print(f"Imported {count} rows from {value} into '{dataset}'.")
+        return dataset
+    return None
+
+def pick_dataset(store, title="Available lead sets:"):
+    """Asks which dataset to use. Excel/CSV files in the current folder can be picked too:
+    they are imported first. Returns the dataset name or None."""
+    datasets = store.datasets()
+    files = [f for f in os.listdir('.') if f.endswith('.xlsx') or f.endswith('.csv')]
+    if not datasets and not files:
+        print("No leads found. Scrape some companies first.")
+        return None
+
+    choices = []
+    print(title)
+    for dataset, counts in datasets.items():
+        choices.append(("dataset", dataset))
+        print(f"{len(choices)}. {dataset} ({describe(counts)})")
+    for f in files:
+        choices.append(("file", f))
+        print(f"{len(choices)}. {f} (import file)")
+
+    try:
+        kind, value = choices[int(input("Choice: ")) - 1]
+    except (ValueError, IndexError):
+        return None
+    if kind == "file":
+        try:
+            return resolve_dataset(store, value)
+        except Exception as e:
+            print(f"Could not import {value}: {e}")
+            return None
+    return value
+
+_STORE = None
+_STORE_LOCK = threading.Lock()
+
+def get_store():
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = LeadStore()
+        return _STORE
@@ -0,0 +1,118 @@
+import hashlib
+import os
+import threading
+import time
+
+from src import storage
+from src.outbox import latest_status
+
+# Statuses that mean "don't email this recipient again in this campaign"
+DONE_STATUSES = ("queued", "sent")
+
+def normalize_email(email):
+    return str(email).strip().lower()
+
+def campaign_name(target_file):
+    """Campaign id for a leads file: both apply modes share it so a company is never emailed twice."""
+    name = os.path.splitext(os.path.basename(str(target_file)))[0]
+    if name.startswith("validated_"):
+        name = name[len("validated_"):]
+    return name
+
+class Ledger:
+    """Persistent record of what was generated and sent per (campaign, recipient).
+
+    The rows of the campaign are loaded into memory once so that lookups in
+    the apply loops are O(1); every change is written through to SQLite.
+    Status goes generated -> queued -> sent (or failed, which is retried on the next run).
+    """
+
+    def __init__(self, campaign, db_name="ledger.db", outbox_db="outbox.db"):
+        self.campaign = campaign
+        self.db = storage.connect(db_name)
+        self.lock = threading.Lock()
+        self.db.execute("""CREATE TABLE IF NOT EXISTS ledger (
+            campaign TEXT NOT NULL,
+            recipient TEXT NOT NULL,
+            company TEXT,
+            letter TEXT,
+            letter_hash TEXT,
+            status TEXT NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (campaign, recipient))""")
+        self.db.commit()
+        self.entries = {}
+        for recipient, status, letter in self.db.execute(
+                "SELECT recipient, status, letter FROM ledger WHERE campaign=?", (campaign,)):
+            self.entries[recipient] = {"status": status, "letter": letter}
+        self.reconcile(outbox_db)
+
+    def reconcile(self, outbox_db="outbox.db"):
+        """Picks up the outcome of mail the shared outbox delivered (or gave up on) while another
+        campaign was running: its callback only reaches the ledger of the running campaign.
+        Entries left queued without an outbox row go back to generated."""
+        outcomes = {normalize_email(recipient): status
+                    for recipient, status in latest_status(self.campaign, outbox_db).items()}
+        for recipient, entry in list(self.entries.items()):
+            if entry["status"] != "queued":
+                continue
+            status = outcomes.get(recipient)
+            if status in ("sent", "failed"):
+                self.mark(recipient, status)
+            elif status is None:
+                # Marked queued but never stored in the outbox (stopped in between): send it again
+                self.mark(recipient, "generated")
+
+    def _upsert(self, recipient, status, company=None, letter=None):
+        recipient = normalize_email(recipient)
+        entry = self.entries.setdefault(recipient, {"status": status, "letter": None})
+        entry["status"] = status
+        if letter is not None:
+            entry["letter"] = letter
+        letter_hash = hashlib.sha256(entry["letter"].encode("utf-8")).hexdigest() if entry["letter"] else None
+        with self.lock:
+            self.db.execute("""INSERT INTO ledger (campaign, recipient, company, letter, letter_hash, status, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(campaign, recipient) DO UPDATE SET
+                    company=COALESCE(excluded.company, company),
+                    letter=COALESCE(excluded.letter, letter),
+                    letter_hash=COALESCE(excluded.letter_hash, letter_hash),
+                    status=excluded.status,
+                    updated_at=excluded.updated_at""",
+                (self.campaign, recipient, company, entry["letter"], letter_hash, status, time.time()))
+            self.db.commit()
+
+    def status(self, recipient):
+        entry = self.entries.get(normalize_email(recipient))
+        return entry["status"] if entry else None
+
+    def is_done(self, recipient):
+        return self.status(recipient) in DONE_STATUSES
+
+    def letter(self, recipient):
+        """Letter text generated for this recipient in an earlier run, if any."""
+        entry = self.entries.get(normalize_email(recipient))
+        return entry["letter"] if entry else None
+
+    def record_letter(self, recipient, company, letter):
+        self._upsert(recipient, "generated", company=company, letter=letter)
+
+    def mark(self, recipient, status):
+        self._upsert(recipient, status)
+
+    def on_outbox_result(self, recipient, ok, error, tag=None):
+        """Outbox callback: records the final outcome of a queued email of this campaign."""
+        if tag is not None and tag != self.campaign:
+            return
+        if normalize_email(recipient) in self.entries:
+            self.mark(recipient, "sent" if ok else "failed")
+
+    def summary(self):
+        counts = {}
+        for entry in self.entries.values():
+            counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        return counts
+
+    def close(self):
+        with self.lock:
+            self.db.close()
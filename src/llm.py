@@ -0,0 +1,321 @@
+import asyncio
+import os
+import threading
+import time
+
+import requests
+
+from src import benchmark, connectivity, lazy, llm_transport, quota, tracing
+from src.llm_router import ROUTER
+
+# Fallback order used by every caller. The model picked in setup (if any) is tried first.
+DEFAULT_CHAIN = ["deepseek/DeepSeek-V3-0324", "gpt-4o", "gemini-flash-latest"]
+
+DEFAULT_SYSTEM = "You are a professional recruiting expert and career coach."
+
+class GitHubProvider:
+    """GitHub Models over REST, with one keep-alive session for all calls."""
+    name = "GitHub Models"
+    endpoint = "github"
+
+    def __init__(self, token):
+        self.token = token
+        self.session = requests.Session()
+
+    def handles(self, model):
+        return not model.startswith("gemini")
+
+    def complete(self, messages, model, temperature=0.7, max_tokens=2000, timeout=60):
+        return llm_transport.github_chat(messages, model, self.token, temperature=temperature,
+                                         max_tokens=max_tokens, timeout=timeout, session=self.session)
+
+    def stream(self, messages, model, temperature=0.7, max_tokens=2000, timeout=60):
+        return llm_transport.github_stream(messages, model, self.token, temperature=temperature,
+                                           max_tokens=max_tokens, timeout=timeout, session=self.session)
+
+class GeminiProvider:
+    """Google Gemini. Configured on first use (the SDK is slow to import); GenerativeModel
+    objects are cached per model/system prompt."""
+    name = "Google Gemini"
+    endpoint = "gemini"
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self.configured = False
+        self.models = {}
+        self.lock = threading.Lock()
+
+    def handles(self, model):
+        return model.startswith("gemini")
+
+    def _model(self, model, system):
+        key = (model, system)
+        with self.lock:
+            if not self.configured:
+                import google.generativeai as genai
+                genai.configure(api_key=self.api_key)
+                self.configured = True
+            if key not in self.models:
+                self.models[key] = llm_transport.gemini_model(model, system)
+            return self.models[key]
+
+    @staticmethod
+    def to_contents(messages):
+        """Splits chat messages into (system prompt, Gemini contents)."""
+        system = "\n".join(m["content"] for m in messages if m["role"] == "system") or None
+        contents = [{"role": "model" if m["role"] == "assistant" else "user", "parts": [m["content"]]}
+                    for m in messages if m["role"] != "system"]
+        return system, contents
+
+    def complete(self, messages, model, temperature=0.7, max_tokens=2000, timeout=60):
+        system, contents = self.to_contents(messages)
+        if len(contents) == 1:
+            contents = contents[0]["parts"][0]
+        return llm_transport.gemini_generate(contents, model, timeout=timeout, model=self._model(model, system))
+
+    def stream(self, messages, model, temperature=0.7, max_tokens=2000, timeout=60):
+        system, contents = self.to_contents(messages)
+        return llm_transport.gemini_stream(contents, model, timeout=timeout, model=self._model(model, system))
+
+class LLM:
+    """One entry point for every model call: warm clients, one fallback chain, sync and async complete()."""
+
+    def __init__(self, providers, chain):
+        self.providers = providers
+        self.chain = chain
+
+    def provider_for(self, model):
+        for provider in self.providers:
+            if provider.handles(model):
+                return provider
+        return None
+
+    def available_models(self):
+        """Models of the chain that have a configured provider."""
+        return [m for m in self.chain if self.provider_for(m)]
+
+    @staticmethod
+    def build_messages(prompt, system=None):
+        messages = []
+        if system:
+            messages.append({"role": "system", "content": system})
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    def _attempt(self, provider, model, messages, priority, run, stream=False):
+        """One guarded request: connectivity check and quota admission, then run().
+
+        Feeds the outcome to the router, the quota scheduler and the connectivity
+        monitor. For streams run() only opens the stream, so token use (and
+        latency, if wanted) is recorded by the caller once the stream is consumed.
+        """
+        scheduler = quota.get_scheduler()
+        prompt_tokens = quota.estimate_tokens(*(m["content"] for m in messages))
+        if not connectivity.reachable(provider.endpoint):
+            raise llm_transport.OfflineError(f"{provider.name} is unreachable", model)
+        if not scheduler.admit(model, priority, prompt_tokens):
+            raise llm_transport.QuotaExceededError(f"Daily budget of {model} is used up", model)
+        start = time.perf_counter()
+        try:
+            result = run()
+        except Exception as e:
+            if not stream:
+                ROUTER.record(model, time.perf_counter() - start, False)
+            scheduler.record(model, prompt_tokens, priority)
+            error = llm_transport.classify(e, model)
+            # Only a failed lookup, or a probe that fails too, takes the endpoint offline;
+            # other network errors are left to the transport's retries
+            if isinstance(error, llm_transport.DNSError):
+                connectivity.mark_down(provider.endpoint, type(error).__name__)
+            elif isinstance(error, llm_transport.NetworkError):
+                connectivity.recheck(provider.endpoint)
+            raise error
+        finally:
+            tracing.record("llm.call", start, time.perf_counter() - start, {"model": model})
+        connectivity.mark_up(provider.endpoint)
+        if not stream:
+            ROUTER.record(model, time.perf_counter() - start, True)
+            scheduler.record(model, prompt_tokens + quota.estimate_tokens(result), priority)
+        return result
+
+    def call_model(self, model, messages, temperature=0.7, max_tokens=2000, timeout=60,
+                   attempts=llm_transport.MAX_ATTEMPTS, cancel=None, priority=quota.PRIORITY_LETTER):
+        """Calls one model through the resilient transport. Returns the text or raises LLMError.
+
+        Every attempt is admitted by the quota scheduler first and its token use
+        recorded; its latency and outcome feed the router's per-model stats.
+        """
+        provider = self.provider_for(model)
+        if provider is None:
+            raise llm_transport.AuthError(f"No API key configured for {model}", model)
+
+        def request():
+            return self._attempt(provider, model, messages, priority, lambda: provider.complete(
+                messages, model, temperature=temperature, max_tokens=max_tokens, timeout=timeout))
+
+        return llm_transport.call(request, model, attempts=attempts, label=f"{provider.name} ({model})",
+                                  cancel=cancel)
+
+    def candidates(self, preferred=None, models=None, priority=quota.PRIORITY_LETTER, verbose=True):
+        """Models to try, in order: `preferred`, then the chain by measured latency, minus offline,
+        cooling-down (circuit breaker open) and over-budget ones."""
+        order = []
+        for model in ROUTER.order(list(models or self.chain)):
+            if model not in order and self.provider_for(model):
+                order.append(model)
+        if preferred and self.provider_for(preferred):
+            # An explicit choice always goes first
+            order = [preferred] + [m for m in order if m != preferred]
+        if not order:
+            if verbose:
+                print("   No AI provider configured (set GITHUB_TOKEN or GEMINI_API_KEY in .env). Skipping AI.")
+            return []
+        order = [m for m in order if connectivity.reachable(self.provider_for(m).endpoint)]
+        if not order:
+            if verbose:
+                print("   AI endpoints are unreachable (offline?). Skipping AI.")
+            return []
+        order = [m for m in order if llm_transport.is_available(m)]
+        if not order:
+            if verbose:
+                print("   Every AI model is cooling down after repeated failures. Skipping AI.")
+            return []
+        scheduler = quota.get_scheduler()
+        order = [m for m in order if scheduler.check(m, priority)[0]]
+        if not order and verbose:
+            print("   No AI model has quota left for this task today.")
+        return order
+
+    def complete(self, prompt=None, messages=None, system=DEFAULT_SYSTEM, preferred=None, models=None,
+                 temperature=0.7, max_tokens=2000, timeout=60, verbose=True, hedge=None,
+                 priority=quota.PRIORITY_LETTER):
+        """Tries `preferred`, then the fallback chain (or `models`) ordered by measured latency.
+        Returns the first answer, or None.
+
+        `timeout` applies to each model call. A model that runs past its usual
+        p95 latency gets a hedged request to the next model; the first answer wins.
+        Models whose daily budget is spent (or reserved for higher `priority` work) or whose
+        endpoint is offline are skipped.
+        """
+        if messages is None:
+            messages = self.build_messages(prompt, system)
+        order = self.candidates(preferred, models, priority, verbose)
+        if not order:
+            return None
+
+        def call(model, cancel):
+            return self.call_model(model, messages, temperature, max_tokens, timeout, cancel=cancel,
+                                   priority=priority)
+
+        options = {} if hedge is None else {"hedge": hedge}
+        _, text = ROUTER.race(order, call, timeout=timeout, verbose=verbose, **options)
+        return text
+
+    def stream(self, prompt=None, messages=None, system=DEFAULT_SYSTEM, preferred=None, models=None,
+               temperature=0.7, max_tokens=2000, timeout=60, verbose=True, priority=quota.PRIORITY_LETTER,
+               attempts=llm_transport.MAX_ATTEMPTS):
+        """Like complete() but yields (model, text chunk) as they arrive.
+
+        Falls back to the next model only until the first chunk is received;
+        an error after that ends the reply early. Yields nothing if every model failed.
+        """
+        if messages is None:
+            messages = self.build_messages(prompt, system)
+        for model in self.candidates(preferred, models, priority, verbose):
+            provider = self.provider_for(model)
+
+            def open_stream():
+                chunks = iter(provider.stream(messages, model, temperature=temperature, max_tokens=max_tokens,
+                                              timeout=timeout))
+                return next(chunks, ""), chunks
+
+            try:
+                first, chunks = llm_transport.call(
+                    lambda: self._attempt(provider, model, messages, priority, open_stream, stream=True),
+                    model, attempts=attempts, label=f"{provider.name} ({model})")
+            except llm_transport.LLMError as e:
+                if verbose:
+                    print(f"   ❌ {model} failed ({type(e).__name__}): {e}")
+                continue
+
+            received = [first]
+            try:
+                if first:
+                    yield model, first
+                for chunk in chunks:
+                    received.append(chunk)
+                    yield model, chunk
+            except Exception as e:
+                error = llm_transport.classify(e, model)
+                if verbose:
+                    print(f"\n   ⚠️  {model} stream interrupted ({type(error).__name__}): {error}")
+            finally:
+                quota.get_scheduler().record(
+                    model, quota.estimate_tokens(*(m["content"] for m in messages), *received), priority)
+            return
+
+    async def acomplete(self, *args, **kwargs):
+        """Async complete(): runs in a worker thread so several calls can be awaited together."""
+        return await asyncio.to_thread(self.complete, *args, **kwargs)
+
+def trim_history(messages, max_tokens):
+    """Keeps the system messages and the most recent turns that fit in `max_tokens` (estimated).
+    The last message is always kept."""
+    system = [m for m in messages if m["role"] == "system"]
+    turns = [m for m in messages if m["role"] != "system"]
+    budget = max_tokens - quota.estimate_tokens(*(m["content"] for m in system))
+    kept = []
+    for message in reversed(turns):
+        cost = quota.estimate_tokens(message["content"])
+        if kept and cost > budget:
+            break
+        kept.append(message)
+        budget -= cost
+    kept.reverse()
+    # A reply without the question it answers is noise
+    while len(kept) > 1 and kept[0]["role"] == "assistant":
+        kept.pop(0)
+    return system + kept
+
+_LLM = None
+_LLM_LOCK = threading.Lock()
+_PREFERRED = None
+
+def configure(preferred=None):
+    """Sets the model tried first and rebuilds the shared providers from the current env keys."""
+    global _LLM, _PREFERRED
+    with _LLM_LOCK:
+        _PREFERRED = preferred
+        _LLM = None
+    return get_llm()
+
+def reset():
+    """Drops the shared instance (e.g. after keys changed); the next get_llm() rebuilds it."""
+    global _LLM
+    with _LLM_LOCK:
+        _LLM = None
+
+def print_quota():
+    """Shows the requests/tokens left today for the models of the chain."""
+    client = get_llm()
+    models = client.available_models()
+    if models:
+        quota.get_scheduler().report(models)
+
+def get_llm():
+    """Returns the process-wide LLM, creating its clients on first use."""
+    global _LLM
+    with _LLM_LOCK:
+        if _LLM is None:
+            providers = []
+            if os.getenv("GITHUB_TOKEN"):
+                providers.append(GitHubProvider(os.getenv("GITHUB_TOKEN")))
+            if os.getenv("GEMINI_API_KEY") and lazy.is_installed("google.generativeai"):
+                providers.append(GeminiProvider(os.getenv("GEMINI_API_KEY")))
+            chain = [m.strip() for m in os.getenv("LLM_CHAIN", ",".join(DEFAULT_CHAIN)).split(",") if m.strip()]
+            if _PREFERRED:
+                chain = [_PREFERRED] + [m for m in chain if m != _PREFERRED]
+            _LLM = LLM(providers, chain)
+            # Latency measured by the last `test_models` benchmark orders the chain until live stats exist
+            benchmark.seed_router()
+        return _LLM
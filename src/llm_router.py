@@ -0,0 +1,155 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+WINDOW = 50                  # calls kept per model for the rolling stats
+MIN_SAMPLES = 3              # below this the model keeps its chain position
+HEDGE_DEFAULT = float(os.getenv("LLM_HEDGE_AFTER", "20"))   # seconds, until a model has a p95
+HEDGE_MIN = 2.0
+HEDGE_ENABLED = os.getenv("LLM_HEDGE", "1") != "0"
+MAX_IN_FLIGHT = 2
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+class ModelStats:
+    """Rolling latency of successful calls and error rate of the last WINDOW calls of one model."""
+
+    def __init__(self, window=WINDOW):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def record(self, latency, ok):
+        with self.lock:
+            self.outcomes.append(ok)
+            if ok:
+                self.latencies.append(latency)
+
+    def p50(self):
+        with self.lock:
+            return percentile(self.latencies, 0.5)
+
+    def p95(self):
+        with self.lock:
+            return percentile(self.latencies, 0.95)
+
+    def error_rate(self):
+        with self.lock:
+            if not self.outcomes:
+                return 0.0
+            return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    def calls(self):
+        return len(self.outcomes)
+
+    def expected_latency(self):
+        """p50 inflated by the error rate (a failed call costs a retry elsewhere), or None without data."""
+        if len(self.latencies) < MIN_SAMPLES:
+            return None
+        return self.p50() / max(0.05, 1 - self.error_rate())
+
+class Router:
+    """Orders models by expected latency and races a hedged request against slow ones."""
+
+    def __init__(self):
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def stats_for(self, model):
+        with self.lock:
+            if model not in self.stats:
+                self.stats[model] = ModelStats()
+            return self.stats[model]
+
+    def record(self, model, latency, ok):
+        self.stats_for(model).record(latency, ok)
+
+    def order(self, models):
+        """Fastest expected first. Models without enough data keep their place relative to each other
+        and go before measured models that are slower than HEDGE_DEFAULT."""
+        def key(item):
+            position, model = item
+            expected = self.stats_for(model).expected_latency()
+            return (expected if expected is not None else HEDGE_DEFAULT, position)
+        return [model for _, model in sorted(enumerate(models), key=key)]
+
+    def hedge_delay(self, model, timeout):
+        """How long to wait for `model` before also asking the next one: its p95, or HEDGE_DEFAULT."""
+        stats = self.stats_for(model)
+        p95 = stats.p95() if len(stats.latencies) >= MIN_SAMPLES else None
+        delay = p95 if p95 is not None else HEDGE_DEFAULT
+        return min(max(HEDGE_MIN, delay), timeout)
+
+    def race(self, models, call, timeout=60, hedge=HEDGE_ENABLED, verbose=True):
+        """Calls models in order with call(model, cancel). Once the running model passes its p95 the
+        next one is started too; the first good answer wins and the others are cancelled.
+
+        Returns (model, text), or (None, None) if every model failed.
+        """
+        results = queue.Queue()
+        cancel = threading.Event()
+        remaining = list(models)
+        running = {}
+
+        def worker(model):
+            try:
+                results.put((model, call(model, cancel), None))
+            except Exception as e:
+                results.put((model, None, e))
+
+        def launch():
+            model = remaining.pop(0)
+            running[model] = time.time()
+            if verbose:
+                print(f"   Attempting generation with {model}...")
+            threading.Thread(target=worker, args=(model,), daemon=True).start()
+
+        try:
+            while remaining or running:
+                if not running:
+                    launch()
+                newest = max(running, key=running.get)
+                wait = None
+                if hedge and remaining and len(running) < MAX_IN_FLIGHT:
+                    wait = max(0.0, running[newest] + self.hedge_delay(newest, timeout) - time.time())
+                try:
+                    model, text, error = results.get(timeout=wait)
+                except queue.Empty:
+                    if verbose:
+                        print(f"   {newest} is slower than usual, also trying {remaining[0]}...")
+                    launch()
+                    continue
+                del running[model]
+                if error is None and text:
+                    if verbose and running:
+                        print(f"   {model} answered first.")
+                    return model, text
+                if verbose:
+                    reason = f"{type(error).__name__}: {error}" if error else "empty answer"
+                    print(f"   ❌ {model} failed ({reason})")
+            return None, None
+        finally:
+            # Losers stop at their next retry/backoff; a request already on the wire finishes in its thread
+            cancel.set()
+
+    def report(self):
+        rows = [(m, s) for m, s in self.stats.items() if s.calls()]
+        if not rows:
+            return
+        print("\nModel latency:")
+        for model, s in sorted(rows, key=lambda r: r[1].expected_latency() or float("inf")):
+            p50, p95 = s.p50(), s.p95()
+            print(f"   {model:<40} calls {s.calls():>3}  p50 {p50 or 0:5.1f}s  p95 {p95 or 0:5.1f}s  "
+                  f"errors {s.error_rate():4.0%}")
+
+ROUTER = Router()
+
+def print_stats():
+    ROUTER.report()
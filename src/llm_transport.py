@@ -0,0 +1,408 @@
+import email.utils
+import json
+import random
+import re
+import socket
+import sys
+import threading
+import time
+
+import requests
+
+from src import lazy
+
+try:
+    from urllib3.exceptions import NameResolutionError
+except ImportError:
+    # urllib3 < 2 reports DNS failures as a plain socket.gaierror
+    NameResolutionError = socket.gaierror
+
+GITHUB_URL = "https://models.github.ai/inference/chat/completions"
+
+MAX_ATTEMPTS = 3
+BACKOFF_BASE = 1.0     # seconds, doubled on each attempt (full jitter)
+BACKOFF_MAX = 30.0
+MAX_WAIT = 60.0        # longer Retry-After values open the breaker instead of sleeping
+
+BREAKER_THRESHOLD = 3  # consecutive failures before a model is skipped
+BREAKER_COOLDOWN = 120.0
+
+class LLMError(Exception):
+    """Base class of transport errors. `retryable` tells call() whether another attempt may help."""
+    retryable = False
+
+    def __init__(self, message, model=None, status=None):
+        super().__init__(message)
+        self.model = model
+        self.status = status
+
+class RateLimitError(LLMError):
+    retryable = True
+
+    def __init__(self, message, model=None, status=429, retry_after=None):
+        super().__init__(message, model, status)
+        self.retry_after = retry_after
+
+class ServerError(LLMError):
+    retryable = True
+
+class NetworkError(LLMError):
+    """Connection refused/reset, or the host could not be reached."""
+    retryable = True
+
+class DNSError(NetworkError):
+    """The endpoint name could not be resolved: usually means we are offline."""
+
+class OfflineError(NetworkError):
+    """The connectivity monitor already knows the endpoint is down: fail fast, don't retry."""
+    retryable = False
+
+class LLMTimeoutError(LLMError):
+    retryable = True
+
+class AuthError(LLMError):
+    pass
+
+class ModelNotFoundError(LLMError):
+    pass
+
+class BadRequestError(LLMError):
+    pass
+
+class BadResponseError(LLMError):
+    """The reply could not be parsed or had no content."""
+    retryable = True
+
+class CircuitOpenError(LLMError):
+    """The model failed repeatedly and is skipped until its cool-down ends."""
+
+    def __init__(self, model, until):
+        super().__init__(f"{model} skipped for {max(0, until - time.time()):.0f}s after repeated failures", model)
+        self.until = until
+
+class QuotaExceededError(LLMError):
+    """The local daily budget of the model is spent (or reserved for higher-priority work)."""
+
+class CancelledError(LLMError):
+    """Another model already answered (hedged request)."""
+
+class CircuitBreaker:
+    """Closed -> open after `threshold` consecutive failures; half-open (one trial call) after the cool-down.
+
+    A trial that never reports back (cancelled, non-retryable error) lets the
+    next trial through after another cool-down.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.open_until = 0.0
+        self.trial_until = 0.0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """True if a call may go through. In the half-open state only the first caller gets True."""
+        with self.lock:
+            now = time.time()
+            if now < self.open_until:
+                return False
+            if self.failures < self.threshold:
+                return True
+            if now < self.trial_until:
+                return False
+            self.trial_until = now + self.cooldown
+            return True
+
+    def is_open(self):
+        """True during the cool-down. Unlike allow(), never takes the half-open trial."""
+        with self.lock:
+            return time.time() < self.open_until
+
+    def success(self):
+        with self.lock:
+            self.failures = 0
+            self.open_until = 0.0
+            self.trial_until = 0.0
+
+    def failure(self, cooldown=None):
+        with self.lock:
+            self.failures += 1
+            if cooldown is not None or self.failures >= self.threshold:
+                self.open_until = time.time() + (cooldown if cooldown is not None else self.cooldown)
+                self.trial_until = 0.0
+
+    def trip(self, cooldown=None):
+        """Opens the breaker right away (e.g. unknown model, long Retry-After)."""
+        with self.lock:
+            self.failures = max(self.failures, self.threshold)
+            self.open_until = time.time() + (cooldown if cooldown is not None else self.cooldown)
+            self.trial_until = 0.0
+
+_BREAKERS = {}
+_BREAKERS_LOCK = threading.Lock()
+
+def breaker_for(model):
+    with _BREAKERS_LOCK:
+        if model not in _BREAKERS:
+            _BREAKERS[model] = CircuitBreaker()
+        return _BREAKERS[model]
+
+def is_available(model):
+    """False while the model's circuit breaker is open (cooling down)."""
+    return not breaker_for(model).is_open()
+
+def _parse_duration(value):
+    """'20', '1.5', '6m0s', '1h2m3.5s', epoch seconds or an HTTP date -> seconds from now."""
+    value = str(value).strip()
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+        # Reset headers sometimes carry an absolute epoch timestamp
+        return seconds - time.time() if seconds > 1e9 else seconds
+    except ValueError:
+        pass
+    parts = re.fullmatch(r"(?:(\d+)h)?(?:(\d+)m(?!s))?(?:([\d.]+)s)?(?:(\d+)ms)?", value)
+    if parts and any(parts.groups()):
+        h, m, s, ms = parts.groups()
+        return int(h or 0) * 3600 + int(m or 0) * 60 + float(s or 0) + int(ms or 0) / 1000
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp() - time.time()
+    except (TypeError, ValueError):
+        return None
+
+RETRY_HEADERS = ("retry-after", "retry-after-ms", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens",
+                 "x-ratelimit-reset", "x-ratelimit-timeremaining")
+
+def retry_after_from_headers(headers):
+    """Seconds to wait according to Retry-After / rate-limit headers, or None."""
+    if not headers:
+        return None
+    lowered = {k.lower(): v for k, v in headers.items()}
+    for name in RETRY_HEADERS:
+        if name in lowered:
+            seconds = _parse_duration(lowered[name])
+            if name == "retry-after-ms" and seconds is not None:
+                seconds /= 1000
+            if seconds is not None:
+                return max(0.0, seconds)
+    return None
+
+def error_for_status(status, message, model=None, retry_after=None):
+    """Maps an HTTP status to the matching LLMError subclass."""
+    if status == 429:
+        return RateLimitError(message, model, status, retry_after)
+    if status in (401, 403):
+        return AuthError(message, model, status)
+    if status == 404:
+        return ModelNotFoundError(message, model, status)
+    if status in (408, 504):
+        return LLMTimeoutError(message, model, status)
+    if status and status >= 500:
+        return ServerError(message, model, status)
+    return BadRequestError(message, model, status)
+
+def _caused_by_dns(exc):
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        if isinstance(exc, (socket.gaierror, NameResolutionError)):
+            return True
+        for arg in getattr(exc, "args", ()):
+            if isinstance(arg, BaseException) and _caused_by_dns(arg):
+                return True
+        exc = exc.__cause__ or exc.__context__ or getattr(exc, "reason", None)
+    return False
+
+def classify(exc, model=None):
+    """Turns any exception raised by requests / Azure SDK / Gemini into an LLMError."""
+    if isinstance(exc, LLMError):
+        return exc
+    if isinstance(exc, requests.exceptions.Timeout):
+        return LLMTimeoutError(str(exc), model)
+    if isinstance(exc, (requests.exceptions.ConnectionError, ConnectionError, socket.error)):
+        if _caused_by_dns(exc):
+            return DNSError(str(exc), model)
+        return NetworkError(str(exc), model)
+
+    # SDK exception modules are only looked up if already loaded: an exception
+    # of theirs can't exist otherwise, and importing them is slow
+    azure_exceptions = sys.modules.get("azure.core.exceptions")
+    google_exceptions = sys.modules.get("google.api_core.exceptions")
+
+    if azure_exceptions is not None:
+        if isinstance(exc, (azure_exceptions.ServiceRequestTimeoutError, azure_exceptions.ServiceResponseTimeoutError)):
+            return LLMTimeoutError(str(exc), model)
+        if isinstance(exc, azure_exceptions.ServiceRequestError):
+            return DNSError(str(exc), model) if _caused_by_dns(exc) else NetworkError(str(exc), model)
+        if isinstance(exc, azure_exceptions.HttpResponseError):
+            response = getattr(exc, "response", None)
+            headers = getattr(response, "headers", None)
+            return error_for_status(exc.status_code, str(exc), model, retry_after_from_headers(headers))
+
+    if google_exceptions is not None:
+        if isinstance(exc, google_exceptions.RetryError):
+            return LLMTimeoutError(str(exc), model)
+        if isinstance(exc, google_exceptions.GoogleAPICallError):
+            retry_after = None
+            for detail in getattr(exc, "details", None) or []:
+                delay = getattr(detail, "retry_delay", None)
+                if delay is not None:
+                    retry_after = delay.seconds + delay.nanos / 1e9
+            return error_for_status(exc.code, str(exc), model, retry_after)
+        if isinstance(exc, google_exceptions.GoogleAPIError):
+            return ServerError(str(exc), model)
+
+    return LLMError(str(exc), model)
+
+def backoff_delay(attempt, retry_after=None):
+    """Delay before retry number `attempt` (0-based): the server's hint if any, else full jitter."""
+    if retry_after is not None:
+        return retry_after + random.uniform(0, 1)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt + 1)))
+
+def call(fn, model, attempts=MAX_ATTEMPTS, max_wait=MAX_WAIT, label=None, cancel=None):
+    """Runs fn() with retries and the model's circuit breaker. Returns fn()'s result or raises LLMError.
+
+    Retries use jittered exponential backoff, or the server's Retry-After /
+    rate-limit reset hint when it gives one. Setting the `cancel` event stops
+    further attempts (CancelledError).
+    """
+    breaker = breaker_for(model)
+    label = label or model
+    last_error = None
+    for attempt in range(attempts):
+        if cancel is not None and cancel.is_set():
+            raise CancelledError("cancelled", model)
+        if not breaker.allow():
+            raise CircuitOpenError(model, max(breaker.open_until, breaker.trial_until))
+        try:
+            result = fn()
+        except Exception as e:
+            error = classify(e, model)
+            last_error = error
+            if isinstance(error, (AuthError, ModelNotFoundError)):
+                # Won't fix itself: skip this model for a while
+                breaker.trip()
+                raise error
+            if not error.retryable:
+                raise error
+            retry_after = getattr(error, "retry_after", None)
+            if retry_after is not None and retry_after > max_wait:
+                breaker.trip(retry_after)
+                print(f"   {label} rate limited for {retry_after:.0f}s. Skipping it until then.")
+                raise error
+            breaker.failure()
+            if attempt == attempts - 1 or breaker.is_open():
+                break
+            delay = backoff_delay(attempt, retry_after)
+            print(f"   {label}: {type(error).__name__}. Retry {attempt + 1}/{attempts - 1} in {delay:.1f}s...")
+            if cancel is not None:
+                cancel.wait(delay)
+            else:
+                time.sleep(delay)
+            continue
+        breaker.success()
+        return result
+    raise last_error
+
+def github_chat(messages, model, token, temperature=0.7, max_tokens=2000, timeout=60, session=None):
+    """One GitHub Models chat completion request. Returns the reply text or raises LLMError."""
+    if not token:
+        raise AuthError("GITHUB_TOKEN is not set", model)
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {token}"
+    }
+    payload = {
+        "messages": messages,
+        "model": model,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "top_p": 1.0
+    }
+    response = (session or requests).post(GITHUB_URL, headers=headers, json=payload, timeout=timeout)
+    if response.status_code != 200:
+        raise error_for_status(response.status_code, f"{response.status_code}: {response.text[:300]}", model,
+                               retry_after_from_headers(response.headers))
+    try:
+        return response.json()['choices'][0]['message']['content']
+    except (ValueError, KeyError, IndexError, TypeError) as e:
+        raise BadResponseError(f"Unexpected response: {e}", model)
+
+def gemini_model(model_name, system=None):
+    """Builds a GenerativeModel, importing google.generativeai on first use."""
+    if not lazy.is_installed("google.generativeai"):
+        raise LLMError("google.generativeai is not installed", model_name)
+    import google.generativeai as genai
+    if system:
+        return genai.GenerativeModel(model_name, system_instruction=system)
+    return genai.GenerativeModel(model_name)
+
+def github_stream(messages, model, token, temperature=0.7, max_tokens=2000, timeout=60, session=None):
+    """Streamed GitHub Models chat completion (server-sent events). Yields text chunks; raises LLMError."""
+    if not token:
+        raise AuthError("GITHUB_TOKEN is not set", model)
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {token}",
+        "Accept": "text/event-stream"
+    }
+    payload = {
+        "messages": messages,
+        "model": model,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "top_p": 1.0,
+        "stream": True
+    }
+    response = (session or requests).post(GITHUB_URL, headers=headers, json=payload, timeout=timeout, stream=True)
+    try:
+        if response.status_code != 200:
+            raise error_for_status(response.status_code, f"{response.status_code}: {response.text[:300]}", model,
+                                   retry_after_from_headers(response.headers))
+        # SSE is UTF-8; requests would otherwise assume ISO-8859-1 for text/* content
+        response.encoding = "utf-8"
+        # chunk_size=None hands over each event as soon as it arrives instead of filling a 512-byte buffer
+        for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            try:
+                choices = json.loads(data).get("choices") or []
+            except ValueError as e:
+                raise BadResponseError(f"Unexpected stream event: {e}", model)
+            if choices:
+                content = (choices[0].get("delta") or {}).get("content")
+                if content:
+                    yield content
+    finally:
+        response.close()
+
+def gemini_generate(contents, model_name, timeout=30, model=None):
+    """One Gemini generate_content call (prompt string or list of contents).
+    Pass a prebuilt GenerativeModel as `model` to reuse it. Returns the reply text or raises LLMError."""
+    if model is None:
+        model = gemini_model(model_name)
+    response = model.generate_content(contents, request_options={'timeout': timeout})
+    try:
+        return response.text
+    except ValueError as e:
+        # Blocked or empty candidates
+        raise BadResponseError(str(e), model_name)
+
+def gemini_stream(contents, model_name, timeout=60, model=None):
+    """Streamed Gemini generate_content call. Yields text chunks; raises LLMError."""
+    if model is None:
+        model = gemini_model(model_name)
+    for chunk in model.generate_content(contents, stream=True, request_options={'timeout': timeout}):
+        try:
+            text = chunk.text
+        except ValueError:
+            # Chunk without text (safety block / finish reason only)
+            continue
+        if text:
+            yield text
@@ -1,28 +1,92 @@
-import smtplib
-from email.message import EmailMessage
+from email.message import EmailMessage, MIMEPart
+import hashlib
 import os
 
-def send_email_with_attachments(sender_email, sender_password, recipient_email, subject, body, resume_path, letter_path):
+from src import tracing
+from src.smtp_pool import SMTPSender
+
+# (path, mtime, size) -> encoded part, and content sha256 -> part so that
+# identical files under different names are encoded only once
+_PART_CACHE = {}
+_PARTS_BY_HASH = {}
+
+def read_attachment(item):
+    """Returns (filename, data) for an attachment given as a path or as an in-memory (filename, bytes) pair."""
+    if not item:
+        return None
+    if isinstance(item, tuple):
+        return os.path.basename(item[0]), bytes(item[1])
+    if os.path.exists(item):
+        with open(item, "rb") as f:
+            return os.path.basename(item), f.read()
+    return None
+
+def _build_part(file_name, file_data):
+    part = MIMEPart()
+    part.set_content(file_data, maintype="application", subtype="pdf", disposition="attachment", filename=file_name)
+    return part
+
+def get_attachment_part(item):
+    """Returns a base64-encoded MIME part for an attachment, or None if the file is missing.
+
+    Files on disk are read and encoded once and then reused for every message
+    until their mtime/size change. In-memory (filename, bytes) pairs are encoded each time.
+    """
+    if not item:
+        return None
+    if isinstance(item, tuple):
+        file_name, file_data = read_attachment(item)
+        return _build_part(file_name, file_data)
+
+    try:
+        st = os.stat(item)
+    except OSError:
+        return None
+    key = (os.path.abspath(item), st.st_mtime_ns, st.st_size)
+    part = _PART_CACHE.get(key)
+    if part is None:
+        file_name, file_data = read_attachment(item)
+        digest = hashlib.sha256(file_data).hexdigest()
+        part = _PARTS_BY_HASH.get((digest, file_name))
+        if part is None:
+            part = _build_part(file_name, file_data)
+            _PARTS_BY_HASH[(digest, file_name)] = part
+        _PART_CACHE[key] = part
+    return part
+
+def attach_files(msg, items):
+    """Attaches paths / (filename, bytes) pairs to msg using cached parts. Returns the number attached."""
+    count = 0
+    for item in items:
+        part = get_attachment_part(item)
+        if part is None:
+            continue
+        if not msg.is_multipart():
+            msg.make_mixed()
+        msg.attach(part)
+        count += 1
+    return count
+
+@tracing.traced("mailer.send_email_with_attachments")
+def send_email_with_attachments(sender_email, sender_password, recipient_email, subject, body, resume_path, letter_path, sender=None, on_queued=None):
+    """Sends one email. Pass an open SMTPSender (or an Outbox to queue it) as `sender` to reuse its connection across a batch.
+    With an Outbox, `on_queued()` is called once the message is stored."""
     msg = EmailMessage()
     msg["Subject"] = subject
     msg["From"] = sender_email
     msg["To"] = recipient_email
     msg.set_content(body)
-    
-    files_to_attach = [resume_path, letter_path]
-    
-    for fpath in files_to_attach:
-        if fpath and os.path.exists(fpath):
-            with open(fpath, "rb") as f:
-                file_data = f.read()
-                file_name = os.path.basename(fpath)
-                msg.add_attachment(file_data, maintype="application", subtype="pdf", filename=file_name)
-    
+
+    attach_files(msg, [resume_path, letter_path])
+
     try:
-        with smtplib.SMTP("smtp.gmail.com", 587) as server:
-            server.starttls()
-            server.login(sender_email, sender_password)
-            server.send_message(msg)
+        if sender and on_queued:
+            sender.send(msg, on_stored=on_queued)
+        elif sender:
+            sender.send(msg)
+        else:
+            with SMTPSender(sender_email, sender_password) as single:
+                single.send(msg)
         return True
     except Exception as e:
         print(f"Error sending email: {e}")
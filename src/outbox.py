@@ -0,0 +1,221 @@
+import email.policy
+import smtplib
+import sqlite3
+import threading
+import time
+
+from src import storage, tracing
+from src.ratelimit import DAY
+from src.sender_pool import SenderPool, load_accounts
+
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 30      # seconds before the first retry, doubled on each attempt
+BACKOFF_MAX = 3600
+CLOSE_TIMEOUT = 60     # seconds to let an in-flight send finish on close()
+
+class Outbox:
+    """Persistent mail queue sent from a background thread.
+
+    Queued messages are stored in SQLite, so anything not sent when the program
+    stops is picked up by the next Outbox. `send(msg)` only enqueues, which lets
+    callers keep generating letters while mail goes out at the allowed rate.
+    Mail is spread over the accounts of a SenderPool (the given account plus
+    SMTP_ACCOUNTS); the From header is set to the account that sends it.
+    """
+
+    def __init__(self, address, password, per_minute=None, per_day=None, db_name="outbox.db", tag=None):
+        self.address = address
+        self.password = password
+        self.tag = tag
+        self.db = storage.connect(db_name)
+        self.db_lock = threading.Lock()
+        self.db.execute("""CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sender TEXT,
+            recipient TEXT NOT NULL,
+            message BLOB NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt REAL NOT NULL DEFAULT 0,
+            last_error TEXT,
+            created_at REAL NOT NULL,
+            sent_at REAL,
+            tag TEXT)""")
+        # Databases created before the tag column existed
+        columns = [r[1] for r in self.db.execute("PRAGMA table_info(outbox)")]
+        if "tag" not in columns:
+            self.db.execute("ALTER TABLE outbox ADD COLUMN tag TEXT")
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_outbox_status ON outbox(status, next_attempt)")
+        self.db.commit()
+
+        # Rebuild each account's rolling 24h count from what was already sent
+        history = {}
+        for sender, sent_at in self.db.execute(
+                "SELECT sender, sent_at FROM outbox WHERE status='sent' AND sent_at > ?", (time.time() - DAY,)):
+            history.setdefault(sender, []).append(sent_at)
+        limits = {}
+        if per_minute is not None:
+            limits["per_minute"] = per_minute
+        if per_day is not None:
+            limits["per_day"] = per_day
+        self.pool = SenderPool(load_accounts(address, password), history=history, **limits)
+        self.callbacks = []
+        self.wakeup = threading.Event()
+        self.stopping = False
+        self.thread = None
+
+    def _query(self, sql, params=()):
+        with self.db_lock:
+            cur = self.db.execute(sql, params)
+            rows = cur.fetchall()
+            self.db.commit()
+            return rows
+
+    def on_sent(self, callback):
+        """Registers callback(recipient, ok, error, tag) called from the worker after each final outcome."""
+        self.callbacks.append(callback)
+
+    def send(self, msg, tag=None, on_stored=None):
+        """Queues an EmailMessage. `tag` (default: the outbox's tag, e.g. the campaign)
+        is handed back to callbacks. `on_stored()` runs once the message is committed, before
+        the worker can pick it up (so before its outcome callback). Returns True once it is safely stored."""
+        tag = tag or self.tag
+        # Stored without From: the account picked at send time fills it in
+        del msg["From"]
+        with self.db_lock:
+            self.db.execute("INSERT INTO outbox (sender, recipient, message, created_at, tag) VALUES (NULL, ?, ?, ?, ?)",
+                            (msg["To"], msg.as_bytes(policy=email.policy.SMTP), time.time(), tag))
+            self.db.commit()
+            if on_stored:
+                on_stored()
+        self.wakeup.set()
+        return True
+
+    def pending(self):
+        return self._query("SELECT COUNT(*) FROM outbox WHERE status='queued'")[0][0]
+
+    def start(self):
+        if self.thread is None:
+            self.stopping = False
+            self.thread = threading.Thread(target=self._run, name="outbox", daemon=True)
+            self.thread.start()
+        return self
+
+    def _next_job(self):
+        rows = self._query("""SELECT id, recipient, message, attempts, next_attempt, tag FROM outbox
+            WHERE status='queued' ORDER BY next_attempt, id LIMIT 1""")
+        return rows[0] if rows else None
+
+    def _run(self):
+        while not self.stopping:
+            job = self._next_job()
+            if job is None:
+                self.wakeup.wait(5)
+                self.wakeup.clear()
+                continue
+
+            delay = job[4] - time.time()
+            account = None
+            if delay <= 0:
+                account, delay = self.pool.acquire()
+            if account is None:
+                self.wakeup.wait(min(max(delay, 0.1), 5))
+                self.wakeup.clear()
+                continue
+
+            self._deliver(account, *job[:4], tag=job[5])
+
+        self.pool.close()
+
+    @tracing.traced("outbox.smtp_send")
+    def _deliver(self, account, job_id, recipient, data, attempts, tag=None):
+        # Messages are stored without From: it is the account that sends them
+        data = f"From: {account.address}\r\n".encode("utf-8") + data
+        try:
+            self.pool.send_raw(account, [recipient], data)
+        except smtplib.SMTPRecipientsRefused as e:
+            # Retrying won't help: bad address
+            self._finish(job_id, recipient, "failed", e, tag)
+            return
+        except (smtplib.SMTPException, OSError) as e:
+            if not account.available():
+                # The account was refused (quota, throttling, login): another one takes the message
+                self._query("UPDATE outbox SET last_error=? WHERE id=?", (str(e), job_id))
+                return
+            attempts += 1
+            if attempts >= MAX_ATTEMPTS:
+                self._finish(job_id, recipient, "failed", e, tag)
+                return
+            backoff = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempts - 1))
+            print(f"   [OUTBOX] {recipient}: {e}. Retry {attempts}/{MAX_ATTEMPTS - 1} in {backoff}s")
+            self._query("UPDATE outbox SET attempts=?, next_attempt=?, last_error=? WHERE id=?",
+                        (attempts, time.time() + backoff, str(e), job_id))
+            return
+        # Which account sent it: rebuilds the per-account daily counts on the next start
+        self._query("UPDATE outbox SET sender=? WHERE id=?", (account.address, job_id))
+        self._finish(job_id, recipient, "sent", None, tag, account.address)
+
+    def _finish(self, job_id, recipient, status, error, tag=None, account=None):
+        self._query("UPDATE outbox SET status=?, sent_at=?, last_error=? WHERE id=?",
+                    (status, time.time() if status == "sent" else None, str(error) if error else None, job_id))
+        if status == "sent":
+            print(f"   [OUTBOX] Email sent to {recipient} (from {account})")
+        else:
+            print(f"   [OUTBOX] Giving up on {recipient}: {error}")
+        for callback in self.callbacks:
+            try:
+                callback(recipient, status == "sent", error, tag)
+            except Exception as e:
+                print(f"   [OUTBOX] Callback error: {e}")
+
+    def drain(self):
+        """Blocks until the queue is empty. Ctrl+C stops waiting; unsent mail stays queued for next run."""
+        self.start()
+        last = None
+        try:
+            while True:
+                left = self.pending()
+                if not left:
+                    break
+                if not self.pool.any_available():
+                    print(f"All sender accounts are paused. {left} email(s) stay queued for the next run.")
+                    break
+                if left != last:
+                    print(f"Outbox: {left} email(s) waiting (quota left today: {self.pool.remaining_today()})...")
+                    last = left
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print(f"\nStopped waiting. {self.pending()} email(s) stay queued for the next run.")
+        self.pool.report()
+
+    def close(self):
+        self.stopping = True
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join(timeout=CLOSE_TIMEOUT)
+            if self.thread.is_alive():
+                # Still inside an SMTP send: it must be able to record the outcome, so the database stays open
+                print("   [OUTBOX] Still sending the last email; it finishes in the background.")
+                return
+            self.thread = None
+        with self.db_lock:
+            self.db.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+def latest_status(tag, db_name="outbox.db"):
+    """{recipient: status of its most recent message} for the mail queued with `tag` (e.g. a campaign)."""
+    db = storage.connect(db_name)
+    try:
+        rows = db.execute("SELECT recipient, status FROM outbox WHERE tag=? ORDER BY id", (tag,)).fetchall()
+    except sqlite3.OperationalError:
+        # No outbox yet
+        rows = []
+    finally:
+        db.close()
+    return dict(rows)
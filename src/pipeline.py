@@ -0,0 +1,265 @@
+import os
+import queue
+import threading
+import time
+
+from src import dedup, filter, keyword_cache, lead_store, llm, prevalidate, scraper, smart_applier, tracing
+from src.ledger import Ledger, campaign_name
+from src.outbox import Outbox
+
+# Leads waiting between two stages. A full queue blocks the stage before it (backpressure),
+# so scraping never runs far ahead of what can be classified and written.
+QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "4"))
+CLASSIFY_WORKERS = int(os.getenv("PIPELINE_CLASSIFY_WORKERS", "2"))
+RESEARCH_WORKERS = int(os.getenv("PIPELINE_RESEARCH_WORKERS", "2"))
+
+DONE = object()
+
+class Stage:
+    """One step of the pipeline: `fn(item)` returns the item for the next stage, or None to drop it."""
+
+    def __init__(self, name, fn, workers=1):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.inbox = queue.Queue(maxsize=QUEUE_SIZE)
+        self.lock = threading.Lock()
+        self.received = 0
+        self.passed = 0
+        self.busy = 0.0
+        self.first_output = None
+
+class Pipeline:
+    """Runs `source` (an iterable) through `stages`, each in its own worker threads.
+
+    Items move on one at a time as soon as a stage is done with them. Ctrl+C
+    stops the source; items already in flight are dropped and the threads end.
+    """
+
+    def __init__(self, source, stages, cancel=None):
+        self.source = source
+        self.stages = stages
+        self.cancel = cancel or threading.Event()
+        self.started = None
+        self.produced = 0
+
+    def _feed(self):
+        first = self.stages[0]
+        try:
+            for item in self.source:
+                if self.cancel.is_set():
+                    break
+                self.produced += 1
+                first.inbox.put(item)
+        except Exception as e:
+            print(f"[PIPELINE] Source stopped: {e}")
+        finally:
+            close = getattr(self.source, "close", None)
+            if close:
+                close()
+
+    def _work(self, stage, next_stage):
+        while True:
+            item = stage.inbox.get()
+            if item is DONE:
+                return
+            if self.cancel.is_set():
+                continue
+            with stage.lock:
+                stage.received += 1
+            start = time.perf_counter()
+            try:
+                # One bar per item and stage in the trace, around the spans of the calls it makes
+                with tracing.span(f"pipeline.{stage.name}"):
+                    result = stage.fn(item)
+            except Exception as e:
+                print(f"[PIPELINE] {stage.name} failed: {e}")
+                result = None
+            with stage.lock:
+                stage.busy += time.perf_counter() - start
+                if result is not None:
+                    stage.passed += 1
+                    if stage.first_output is None:
+                        stage.first_output = time.perf_counter() - self.started
+            if result is not None and next_stage is not None:
+                next_stage.inbox.put(result)
+
+    def _interrupted(self):
+        if not self.cancel.is_set():
+            print("\n>>> STOPPING PIPELINE. Finishing the current items... <<<\n")
+        self.cancel.set()
+
+    def _wait(self, thread):
+        # join() with a timeout so Ctrl+C reaches the main thread
+        while thread.is_alive():
+            try:
+                thread.join(0.5)
+            except KeyboardInterrupt:
+                self._interrupted()
+
+    def _put(self, stage, item):
+        while True:
+            try:
+                stage.inbox.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+            except KeyboardInterrupt:
+                self._interrupted()
+
+    def run(self):
+        self.started = time.perf_counter()
+        workers = []
+        for i, stage in enumerate(self.stages):
+            next_stage = self.stages[i + 1] if i + 1 < len(self.stages) else None
+            threads = [threading.Thread(target=self._work, args=(stage, next_stage), daemon=True,
+                                        name=f"pipeline-{stage.name}-{n}") for n in range(stage.workers)]
+            for thread in threads:
+                thread.start()
+            workers.append(threads)
+
+        feeder = threading.Thread(target=self._feed, daemon=True, name="pipeline-source")
+        feeder.start()
+        self._wait(feeder)
+        # Stages end in order: each one gets its end markers once the one before has finished
+        for stage, threads in zip(self.stages, workers):
+            for _ in threads:
+                self._put(stage, DONE)
+            for thread in threads:
+                self._wait(thread)
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        print(f"\nPipeline: {self.produced} leads in {elapsed:.0f}s")
+        for stage in self.stages:
+            busy = f"{stage.busy / stage.received:.1f}s each" if stage.received else "-"
+            first = f", first after {stage.first_output:.0f}s" if stage.first_output is not None else ""
+            print(f"   {stage.name:<10} {stage.received:>4} in  {stage.passed:>4} out  ({busy}{first})")
+
+def _scrape(city, keywords, dataset, store, found_by, cancel):
+    """Source stage: companies from every keyword, stored as raw leads as soon as they are scraped."""
+    seen = dedup.DedupIndex()
+    index = store.index(dataset)
+    # store.add maps a company already in the lead set to its id: each id goes down the pipeline once
+    yielded = set()
+    for keyword in keywords:
+        if cancel.is_set():
+            return
+        print(f"\n>>> Scraping Keyword: {keyword} in {city}...")
+        for lead in scraper.iter_companies(city, keyword, max_results=30, seen=seen, cancel=cancel):
+            lead.id = store.add(dataset, [lead], status=lead_store.RAW, index=index)[0]
+            if lead.id in yielded:
+                continue
+            yielded.add(lead.id)
+            found_by.setdefault(lead.id, keyword)
+            yield lead
+
+def run_pipeline(city, domain, keywords, dataset, ai_client=None, ai_model=None):
+    """Scrape -> classify (and find emails) -> research -> write -> send, lead by lead.
+    Returns the pipeline (for its counts), or None if it could not start."""
+    smart_applier.configure_keys()
+    resume_file = smart_applier.find_resume()
+    if not resume_file:
+        return None
+    profile = smart_applier.extract_text_from_pdf(resume_file)
+    if not profile:
+        return None
+
+    store = lead_store.get_store()
+    ledger = Ledger(campaign_name(dataset))
+    sender = Outbox(smart_applier.EMAIL_ADDRESS, smart_applier.EMAIL_PASSWORD, tag=ledger.campaign)
+    sender.on_sent(ledger.on_outbox_result)
+    sender.start()
+    # lead id -> keyword that found it, to record keyword yields
+    found_by = {}
+    accepted = []
+    # Pre-checks before the validation call, and on the email before writing
+    summary = prevalidate.Summary()
+    email_summary = prevalidate.Summary()
+    # Emails each pre-check already let through: a second lead with the same address is dropped
+    seen_emails = set()
+    seen_found_emails = set()
+    summary_lock = threading.Lock()
+
+    def reject(lead, reason):
+        print(f"[REJECTED] {lead.name or lead.website} - {reason}")
+        store.set_status(lead.id, lead_store.REJECTED, reason)
+
+    def precheck(lead, summary, seen, **requirements):
+        with summary_lock:
+            return next(prevalidate.survivors([[lead]], summary, on_drop=reject, seen_emails=seen, **requirements), None)
+
+    def classify(lead):
+        if precheck(lead, summary, seen_emails) is None:
+            return None
+        is_relevant, found_email = filter.check_is_valid_company(lead.name, lead.website, lead.snippet,
+                                                                 ai_client, ai_model, domain=domain)
+        if is_relevant is None:
+            # Not checked: the lead stays raw, and scraping more leads would only leave more unchecked
+            if not cancel.is_set():
+                print(filter.NOT_CHECKED)
+                cancel.set()
+            return None
+        if not is_relevant:
+            print(f"[REJECTED] {lead.name} - Not a relevant agency")
+            store.set_status(lead.id, lead_store.REJECTED, "Not a relevant agency")
+            return None
+        if not lead.email and found_email and "@" in str(found_email):
+            lead.email = str(found_email).strip()
+            print(f"   [AI FOUND EMAIL] {lead.email}")
+        if precheck(lead, email_summary, seen_found_emails, require=(), require_email=True) is None:
+            return None
+        print(f"[ACCEPTED] {lead.name}")
+        store.set_status(lead.id, lead_store.ACCEPTED, email=lead.email)
+        accepted.append(lead.id)
+        return lead
+
+    def research(lead):
+        if ledger.is_done(lead.email):
+            return None
+        letter = ledger.letter(lead.email)
+        if letter:
+            return lead, None
+        return lead, smart_applier.research(lead.name, lead.website)
+
+    def write(item):
+        lead, info = item
+        letter = ledger.letter(lead.email)
+        if not letter:
+            letter = smart_applier.generate_cover_letter(lead.name, info, profile, ai_client, ai_model)
+            if not letter:
+                print(f"   Failed to generate letter text for {lead.name}.")
+                return None
+            ledger.record_letter(lead.email, lead.name, letter)
+        return lead, letter
+
+    def send(item):
+        lead, letter = item
+        # Research runs in parallel, so two leads can get past its check; this stage has one worker
+        if ledger.is_done(lead.email):
+            return None
+        print(f"\nApplying: {lead.name} ({lead.email})")
+        return lead if smart_applier.queue_application(lead.email, lead.name, letter, resume_file, ledger, sender) else None
+
+    stages = [
+        Stage("classify", classify, CLASSIFY_WORKERS),
+        Stage("research", research, RESEARCH_WORKERS),
+        Stage("write", write),
+        Stage("send", send),
+    ]
+    cancel = threading.Event()
+    pipeline = Pipeline(_scrape(city, keywords, dataset, store, found_by, cancel), stages, cancel)
+    llm.print_quota()
+    try:
+        pipeline.run()
+        sender.drain()
+    finally:
+        sender.close()
+        ledger.close()
+
+    keyword_cache.get_cache().record_run(domain, keywords, found_by, accepted)
+
+    summary.report("Validation calls")
+    email_summary.report("Letter generations")
+    pipeline.report()
+    return pipeline
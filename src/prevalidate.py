@@ -0,0 +1,98 @@
+from src import lazy
+
+pd = lazy.optional_import("pandas", lazy=True)
+
+EMAIL_PATTERN = r"[a-z0-9._%+-]+@[a-z0-9-]+(?:\.[a-z0-9-]+)*\.[a-z]{2,}"
+
+# Addresses nobody reads, and regex false positives found in page source (logo@2x.png)
+BLACKLIST_LOCAL = r"(?:no-?reply|do-?not-?reply|mailer-daemon|postmaster|bounces?|example|test|user|email|nom|name)"
+BLACKLIST_DOMAINS = ("example.com", "example.org", "domain.com", "email.com", "yourdomain.com", "votredomaine.com",
+                     "sentry.io", "sentry.wixpress.com", "wixpress.com", "sentry-next.wixpress.com")
+FILE_EXTENSIONS = r"\.(?:png|jpe?g|gif|svg|webp|bmp|ico|css|js)$"
+
+# Why a lead is dropped before any network/AI work
+MISSING_NAME = "missing name"
+MISSING_WEBSITE = "missing website"
+MISSING_EMAIL = "missing email"
+INVALID_EMAIL = "invalid email"
+BLACKLISTED_EMAIL = "blacklisted email"
+DUPLICATE_EMAIL = "duplicate email"
+
+def check(frame, require=("name", "website"), require_email=False, seen_emails=None):
+    """Vectorized checks over a frame of leads (columns name, website, email).
+
+    Returns (emails, reasons): the cleaned email column (unusable addresses
+    become '') and the reason each row is dropped ('' for rows to keep).
+    `seen_emails` (a set) carries duplicate detection across chunks.
+    """
+    email = frame["email"].fillna("").astype(str).str.strip().str.lower().str.replace(r"^mailto:", "", regex=True)
+    present = email != ""
+    valid = email.str.fullmatch(EMAIL_PATTERN)
+    local = email.str.split("@").str[0]
+    domain = email.str.split("@").str[-1]
+    blacklisted = valid & (local.str.fullmatch(BLACKLIST_LOCAL) | domain.isin(BLACKLIST_DOMAINS)
+                           | email.str.contains(FILE_EXTENSIONS, regex=True))
+    usable = valid & ~blacklisted
+    emails = email.where(usable, "")
+
+    # Same mailbox as dedup.canonical_email: +tags dropped
+    canonical = emails.str.replace(r"\+[^@]*@", "@", regex=True)
+    duplicate = usable & canonical.duplicated()
+    if seen_emails is not None:
+        duplicate |= usable & canonical.isin(seen_emails)
+        seen_emails.update(canonical[usable & ~duplicate])
+
+    reasons = pd.Series("", index=frame.index)
+    # Later checks take precedence: the most specific reason is kept
+    if require_email:
+        reasons = reasons.mask(~present, MISSING_EMAIL)
+        reasons = reasons.mask(present & ~valid, INVALID_EMAIL)
+        reasons = reasons.mask(blacklisted, BLACKLISTED_EMAIL)
+    reasons = reasons.mask(duplicate, DUPLICATE_EMAIL)
+    for column, reason in (("website", MISSING_WEBSITE), ("name", MISSING_NAME)):
+        if column in require:
+            reasons = reasons.mask(frame[column].fillna("").astype(str).str.strip() == "", reason)
+    return emails, reasons
+
+class Summary:
+    """Counts of leads dropped by the pre-check, per reason."""
+
+    def __init__(self):
+        self.checked = 0
+        self.dropped = {}
+
+    def add(self, reasons):
+        self.checked += len(reasons)
+        for reason, count in reasons[reasons != ""].value_counts().items():
+            self.dropped[reason] = self.dropped.get(reason, 0) + int(count)
+
+    def total(self):
+        return sum(self.dropped.values())
+
+    def report(self, avoided="AI calls"):
+        if not self.checked:
+            return
+        details = ", ".join(f"{reason}: {count}" for reason, count in sorted(self.dropped.items(), key=lambda x: -x[1]))
+        print(f"Pre-check: {self.total()} of {self.checked} leads dropped before any network or AI work"
+              + (f" ({details})" if details else "") + f". {avoided} avoided: {self.total()}.")
+
+def survivors(chunks, summary, require=("name", "website"), require_email=False, on_drop=None, seen_emails=None):
+    """Runs `check` on each chunk of leads and yields the leads that pass, with cleaned emails.
+    `on_drop(lead, reason)` is called for the others. Pass `seen_emails` to detect duplicates
+    across calls."""
+    if seen_emails is None:
+        seen_emails = set()
+    for chunk in chunks:
+        if not chunk:
+            continue
+        frame = pd.DataFrame({"name": [lead.name for lead in chunk], "website": [lead.website for lead in chunk],
+                              "email": [lead.email for lead in chunk]})
+        emails, reasons = check(frame, require, require_email, seen_emails)
+        summary.add(reasons)
+        for lead, email, reason in zip(chunk, emails, reasons):
+            if reason:
+                if on_drop:
+                    on_drop(lead, reason)
+                continue
+            lead.email = email
+            yield lead
@@ -0,0 +1,177 @@
+import os
+import threading
+import time
+from collections import deque
+
+from src import storage
+from src.ratelimit import DAY, TokenBucket
+
+# Work priorities: a lower number may dig deeper into the daily budget
+PRIORITY_LETTER = 0       # cover letters and interactive chat
+PRIORITY_KEYWORDS = 1     # search keyword generation
+PRIORITY_VALIDATION = 2   # company (re-)validation
+
+# Share of each daily budget kept back from lower-priority work
+RESERVE = {PRIORITY_LETTER: 0.0, PRIORITY_KEYWORDS: 0.2, PRIORITY_VALIDATION: 0.4}
+
+# Free-tier limits: (requests/minute, requests/day, tokens/day or 0 for no token cap).
+# GitHub Models "high" tier models (gpt-4o, DeepSeek-V3) allow 10/min and 50/day,
+# "low" tier ones 15/min and 150/day. Override with LLM_BUDGETS.
+DEFAULT_BUDGETS = {
+    "deepseek-v3-0324": (10, 50, 0),
+    "gpt-4o": (10, 50, 0),
+    "llama-4-scout-17b-16e-instruct": (15, 150, 0),
+    "gemini-flash-latest": (10, 250, 0),
+}
+FALLBACK_BUDGET = (10, 50, 0)
+
+# Longest per-minute wait worth sleeping for; beyond it the call moves on to another model
+MAX_WAIT = 20.0
+
+def model_key(model):
+    """'openai/gpt-4o' and 'gpt-4o' share the same quota."""
+    return str(model).split("/")[-1].strip().lower()
+
+def load_budgets():
+    """DEFAULT_BUDGETS updated from LLM_BUDGETS ("gpt-4o=10/50/0;gemini-flash-latest=15/1000/1000000")."""
+    budgets = dict(DEFAULT_BUDGETS)
+    for entry in os.getenv("LLM_BUDGETS", "").split(";"):
+        if "=" not in entry:
+            continue
+        model, limits = entry.split("=", 1)
+        try:
+            values = [int(v) for v in limits.split("/")]
+        except ValueError:
+            print(f"Warning: ignoring invalid LLM_BUDGETS entry '{entry}'")
+            continue
+        values += [0] * (3 - len(values))
+        budgets[model_key(model)] = tuple(values[:3])
+    return budgets
+
+def estimate_tokens(*texts):
+    """Rough token count (~4 characters per token), enough for budgeting."""
+    return sum(len(str(t)) for t in texts if t) // 4 + 1
+
+class ModelQuota:
+    """Request bucket plus a rolling 24h token count for one model."""
+
+    def __init__(self, per_minute, per_day, tokens_per_day, history=()):
+        self.per_day = per_day
+        self.tokens_per_day = tokens_per_day
+        self.bucket = TokenBucket(per_minute, per_day, [ts for ts, _ in history])
+        self.token_log = deque(sorted(history))
+        self.tokens_today = sum(tokens for _, tokens in self.token_log)
+
+    def _expire_tokens(self):
+        cutoff = time.time() - DAY
+        while self.token_log and self.token_log[0][0] < cutoff:
+            self.tokens_today -= self.token_log.popleft()[1]
+
+    def requests_left(self):
+        return self.bucket.remaining_today()
+
+    def tokens_left(self):
+        if not self.tokens_per_day:
+            return None
+        self._expire_tokens()
+        return max(0, self.tokens_per_day - self.tokens_today)
+
+    def add_tokens(self, ts, tokens):
+        self.token_log.append((ts, tokens))
+        self.tokens_today += tokens
+
+class QuotaScheduler:
+    """Admits LLM calls against per-model budgets shared by every feature and persisted across runs.
+
+    Usage is stored in SQLite so that the daily budgets survive restarts.
+    Lower-priority work (validation) stops before the budget is exhausted,
+    leaving the rest for cover letters.
+    """
+
+    def __init__(self, db_name="llm_usage.db", budgets=None):
+        self.budgets = budgets or load_budgets()
+        self.db = storage.connect(db_name)
+        self.lock = threading.Lock()
+        self.db.execute("""CREATE TABLE IF NOT EXISTS usage (
+            model TEXT NOT NULL,
+            ts REAL NOT NULL,
+            tokens INTEGER NOT NULL,
+            priority INTEGER NOT NULL)""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS usage_model_ts ON usage (model, ts)")
+        self.db.execute("DELETE FROM usage WHERE ts < ?", (time.time() - DAY,))
+        self.db.commit()
+        history = {}
+        for model, ts, tokens in self.db.execute("SELECT model, ts, tokens FROM usage"):
+            history.setdefault(model, []).append((ts, tokens))
+        self.quotas = {}
+        for model, entries in history.items():
+            self._quota(model, entries)
+
+    def _quota(self, key, history=()):
+        if key not in self.quotas:
+            per_minute, per_day, tokens_per_day = self.budgets.get(key, FALLBACK_BUDGET)
+            self.quotas[key] = ModelQuota(per_minute, per_day, tokens_per_day, history)
+        return self.quotas[key]
+
+    def _check(self, quota, priority, tokens):
+        reserve = RESERVE.get(priority, 0.0)
+        if quota.requests_left() <= quota.per_day * reserve:
+            return False, 0.0
+        tokens_left = quota.tokens_left()
+        if tokens_left is not None and tokens_left - tokens <= quota.tokens_per_day * reserve:
+            return False, 0.0
+        return True, quota.bucket.wait_time()
+
+    def check(self, model, priority=PRIORITY_LETTER, tokens=0):
+        """Returns (allowed, wait_seconds). Not allowed means the budget left is reserved or spent."""
+        with self.lock:
+            return self._check(self._quota(model_key(model)), priority, tokens)
+
+    def admit(self, model, priority=PRIORITY_LETTER, tokens=0, max_wait=MAX_WAIT):
+        """Waits for a per-minute slot and takes it. Returns False if the call should go to another model."""
+        while True:
+            with self.lock:
+                quota = self._quota(model_key(model))
+                allowed, wait = self._check(quota, priority, tokens)
+                if allowed and wait <= 0:
+                    quota.bucket.take()
+                    return True
+            if not allowed or wait > max_wait:
+                return False
+            time.sleep(wait)
+
+    def record(self, model, tokens, priority=PRIORITY_LETTER):
+        """Stores the tokens used by an admitted call."""
+        key = model_key(model)
+        now = time.time()
+        with self.lock:
+            self._quota(key).add_tokens(now, tokens)
+            self.db.execute("INSERT INTO usage (model, ts, tokens, priority) VALUES (?, ?, ?, ?)",
+                            (key, now, tokens, priority))
+            self.db.commit()
+
+    def remaining(self, models):
+        """{model: (requests left today, tokens left today or None)}"""
+        with self.lock:
+            left = {}
+            for model in models:
+                quota = self._quota(model_key(model))
+                left[model] = (quota.requests_left(), quota.tokens_left())
+            return left
+
+    def report(self, models):
+        print("\nAI quota left today:")
+        for model, (requests_left, tokens_left) in self.remaining(models).items():
+            per_day = self._quota(model_key(model)).per_day
+            tokens = f"  tokens {tokens_left}" if tokens_left is not None else ""
+            print(f"   {model:<40} requests {requests_left:>4}/{per_day}{tokens}")
+
+_SCHEDULER = None
+_SCHEDULER_LOCK = threading.Lock()
+
+def get_scheduler():
+    global _SCHEDULER
+    with _SCHEDULER_LOCK:
+        if _SCHEDULER is None:
+            _SCHEDULER = QuotaScheduler()
+        return _SCHEDULER
@@ -0,0 +1,50 @@
+import threading
+import time
+from collections import deque
+
+DAY = 86400
+
+class TokenBucket:
+    """Token bucket for the per-minute rate plus a rolling 24h cap.
+
+    `history` holds timestamps of sends already made (e.g. loaded from disk)
+    so the daily cap survives restarts.
+    """
+
+    def __init__(self, per_minute, per_day, history=()):
+        self.capacity = max(1, per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = float(self.capacity)
+        self.per_day = per_day
+        self.updated = time.monotonic()
+        self.day_log = deque(sorted(history))
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        cutoff = time.time() - DAY
+        while self.day_log and self.day_log[0] < cutoff:
+            self.day_log.popleft()
+
+    def wait_time(self):
+        """Seconds until a send is allowed (0 when a token is available now)."""
+        with self.lock:
+            self._refill()
+            if self.per_day and len(self.day_log) >= self.per_day:
+                return self.day_log[0] + DAY - time.time()
+            if self.tokens >= 1:
+                return 0.0
+            return (1 - self.tokens) / self.rate if self.rate else 60.0
+
+    def take(self):
+        with self.lock:
+            self._refill()
+            self.tokens -= 1
+            self.day_log.append(time.time())
+
+    def remaining_today(self):
+        with self.lock:
+            self._refill()
+            return max(0, self.per_day - len(self.day_log))
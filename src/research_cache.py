@@ -0,0 +1,96 @@
+import os
+import re
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+from src import storage
+
+RESEARCH_TTL = float(os.getenv("RESEARCH_TTL_DAYS", "14")) * 86400
+EMPTY_TTL = 86400          # "nothing found" is retried sooner
+RESEARCH_WORKERS = int(os.getenv("RESEARCH_WORKERS", "4"))
+
+# Legal forms dropped so "Acme SARL" and "ACME" share one entry
+LEGAL_SUFFIXES = {"sarl", "sarlau", "sa", "sas", "sasu", "eurl", "ltd", "llc", "inc", "gmbh", "co"}
+
+def normalize_name(name):
+    text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode("ascii").lower()
+    words = re.sub(r"[^a-z0-9]+", " ", text.replace(".", "")).split()
+    while len(words) > 1 and words[-1] in LEGAL_SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+class ResearchCache:
+    """Company research results in SQLite, keyed by (normalized company name, query), with a TTL.
+
+    `query` is the query template (e.g. "{name} secteur"), so spelling variants of a name share an entry.
+    """
+
+    def __init__(self, db_name="research.db", ttl=RESEARCH_TTL):
+        self.ttl = ttl
+        self.db = storage.connect(db_name)
+        self.lock = threading.Lock()
+        self.db.execute("""CREATE TABLE IF NOT EXISTS research (
+            name TEXT NOT NULL,
+            query TEXT NOT NULL,
+            result TEXT NOT NULL,
+            fetched_at REAL NOT NULL,
+            PRIMARY KEY (name, query))""")
+        self.db.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name, query):
+        """Cached result (possibly "" for nothing found), or None if missing/expired."""
+        with self.lock:
+            row = self.db.execute("SELECT result, fetched_at FROM research WHERE name=? AND query=?",
+                                  (normalize_name(name), query)).fetchone()
+        if row:
+            result, fetched_at = row
+            if time.time() - fetched_at < (self.ttl if result else min(self.ttl, EMPTY_TTL)):
+                self.hits += 1
+                return result
+        self.misses += 1
+        return None
+
+    def put(self, name, query, result):
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO research (name, query, result, fetched_at) VALUES (?, ?, ?, ?)",
+                            (normalize_name(name), query, result or "", time.time()))
+            self.db.commit()
+
+    def prefetch(self, names, query, fetch, workers=RESEARCH_WORKERS):
+        """Warms the cache for every name not cached yet, at most `workers` searches at a time.
+
+        `fetch(name)` runs the search and returns the text, or None on failure (failures are not cached).
+        """
+        todo = {}
+        for name in names:
+            key = normalize_name(name)
+            if key and key not in todo and self.get(name, query) is None:
+                todo[key] = name
+        if not todo:
+            return 0
+        print(f"Researching {len(todo)} companies ({workers} at a time)...")
+
+        def work(name):
+            result = fetch(name)
+            if result is not None:
+                self.put(name, query, result)
+            return result is not None
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            done = sum(pool.map(work, todo.values()))
+        print(f"Research ready for {done}/{len(todo)} companies.")
+        return done
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+def get_cache():
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = ResearchCache()
+        return _CACHE
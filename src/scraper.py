@@ -5,13 +5,15 @@ import requests
 import os
 from bs4 import BeautifulSoup
 from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+from src import browser, dedup, tracing
+from src.lead import Lead
+
+@tracing.traced("scraper.find_emails_in_site")
 def find_emails_in_site(url):
     try:
         headers = {'User-Agent': 'Mozilla/5.0'}
@@ -21,42 +23,48 @@ def find_emails_in_site(url):
     except:
         return []
 
-def search_companies(city, keyword, max_results=100):
+@tracing.traced("scraper.search_companies")
+def search_companies(city, keyword, max_results=100, seen=None):
+    """Scrapes Google Maps. `seen` (dedup.DedupIndex) is shared across searches so companies
+    found before are skipped before their website is fetched."""
+    return list(iter_companies(city, keyword, max_results, seen))
+
+def iter_companies(city, keyword, max_results=100, seen=None, cancel=None):
+    """Same as search_companies, but yields each company as soon as it is scraped.
+    Stops early once `cancel` (threading.Event) is set."""
     location_query = f"{city}, Morocco"
     search_query = keyword
     
-    results = []
+    if seen is None:
+        seen = dedup.DedupIndex()
     
     options = webdriver.ChromeOptions()
     options.add_argument("--lang=en")
     
     print("\n[INFO] Initializing Chrome Driver...")
-    try:
-        # Try to get the latest driver (requires internet)
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-    except Exception as e:
-        print("[WARNING] Could not download latest driver (likely offline). Trying default system driver...")
-        try:
-            # Fallback to system PATH driver or cached one
-            driver = webdriver.Chrome(options=options)
-        except Exception as e2:
-            print(f"[ERROR] Could not initialize Chrome Driver: {e2}")
-            print("Please ensure you have Google Chrome installed and 'chromedriver' in your PATH (or internet access).")
-            return []
+    # Cached driver path + saved profile (consent cookies, warm Maps cache)
+    driver = browser.new_driver(options)
+    if driver is None:
+        print("Please ensure you have Google Chrome installed and 'chromedriver' in your PATH (or internet access).")
+        return
     
     print("\n[INFO] Press Ctrl+C at any time to STOP scraping and save collected data.\n")
     
     try:
+        # Generator: spans cover the browser work only, not the time spent by the consumer
+        started = time.perf_counter()
         driver.get("https://www.google.com/maps")
         
-        try:
-            consent_button = WebDriverWait(driver, 5).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, "form[action*='consent'] button, button[aria-label='Accept all'], button[aria-label='Tout accepter']"))
-            )
-            consent_button.click()
-            time.sleep(2)
-        except:
-            pass
+        # With the saved profile the consent was already given: don't wait for a dialog that won't come
+        if "consent." in driver.current_url or driver.find_elements(By.CSS_SELECTOR, "form[action*='consent']"):
+            try:
+                consent_button = WebDriverWait(driver, 5).until(
+                    EC.element_to_be_clickable((By.CSS_SELECTOR, "form[action*='consent'] button, button[aria-label='Accept all'], button[aria-label='Tout accepter']"))
+                )
+                consent_button.click()
+                time.sleep(2)
+            except:
+                pass
 
         try:
             search_input = WebDriverWait(driver, 10).until(
@@ -95,7 +103,7 @@ def search_companies(city, keyword, max_results=100):
             scroll_attempts = 0
             max_scroll_attempts = 50 
             
-            while scroll_attempts < max_scroll_attempts:
+            while scroll_attempts < max_scroll_attempts and not (cancel and cancel.is_set()):
                 driver.execute_script("arguments[0].scrollTop = arguments[0].scrollHeight", scrollable_div)
                 time.sleep(2)
                 new_height = driver.execute_script("return arguments[0].scrollHeight", scrollable_div)
@@ -116,9 +124,10 @@ def search_companies(city, keyword, max_results=100):
             pass
 
         total_items_found = len(driver.find_elements(By.CLASS_NAME, "hfpxzc"))
+        tracing.record("scraper.maps_listing", started, time.perf_counter() - started, {"keyword": keyword, "found": total_items_found})
 
         for i in range(total_items_found):
-            if i >= max_results:
+            if i >= max_results or (cancel and cancel.is_set()):
                 break
                 
             try:
@@ -127,6 +136,7 @@ def search_companies(city, keyword, max_results=100):
                     break 
                 
                 item = items[i]
+                started = time.perf_counter()
                 
                 driver.execute_script("arguments[0].scrollIntoView(true);", item)
                 time.sleep(0.5)
@@ -148,6 +158,13 @@ def search_companies(city, keyword, max_results=100):
                     pass
 
                 snippet = ""
+                tracing.record("scraper.maps_place", started, time.perf_counter() - started)
+
+                duplicate = seen.match(Lead(name, website))
+                if duplicate:
+                    print(f"   Skipped: {name} (Duplicate: {duplicate[1]})")
+                    seen.skipped += 1
+                    continue
 
                 found_emails = []
                 if website:
@@ -157,17 +174,14 @@ def search_companies(city, keyword, max_results=100):
 
                 email_str = found_emails[0] if found_emails else None
 
-                record = {
-                    "name": name,
-                    "website": website,
-                    "email": email_str,
-                    "snippet": name 
-                }
+                record = Lead(name, website, email_str, snippet=name, source="maps")
                 
+                seen.add(record)
+
                 # Strict Filtering as requested by user
                 if name != "N/A" and website and email_str:
-                    results.append(record)
                     print(f"   Saved: {name}")
+                    yield record
                 else:
                     missing = []
                     if name == "N/A": missing.append("Name")
@@ -183,5 +197,3 @@ def search_companies(city, keyword, max_results=100):
         
     finally:
         driver.quit()
-        
-    return results
@@ -0,0 +1,156 @@
+import os
+import smtplib
+import threading
+import time
+
+from src.ratelimit import TokenBucket
+from src.smtp_pool import SMTPSender
+
+# Gmail allows ~500 messages per rolling 24h for a personal account; stay below it.
+# These limits apply to each account of the pool.
+SEND_PER_MINUTE = int(os.getenv("SEND_PER_MINUTE", "20"))
+SEND_PER_DAY = int(os.getenv("SEND_PER_DAY", "450"))
+
+# How long an account stays out of rotation after the provider refuses it
+QUOTA_COOLDOWN = 24 * 3600     # daily sending quota reached
+THROTTLE_COOLDOWN = 15 * 60    # temporary "try again later" / too many connections
+
+# Substrings of SMTP replies that mean the account (not the message) is being limited
+QUOTA_MARKERS = ("5.4.5", "quota", "sending limit", "daily user sending")
+THROTTLE_MARKERS = ("4.7.0", "4.7.28", "too many", "rate limit", "try again later")
+
+def load_accounts(address=None, password=None):
+    """Returns the list of (address, password) to send from.
+
+    The main EMAIL_ADDRESS/EMAIL_PASSWORD pair comes first, followed by the
+    extra accounts of SMTP_ACCOUNTS ("a@gmail.com:app password;b@gmail.com:app password").
+    """
+    accounts = []
+    if address:
+        accounts.append((address, password))
+    for entry in os.getenv("SMTP_ACCOUNTS", "").split(";"):
+        if ":" not in entry:
+            continue
+        extra_address, extra_password = entry.split(":", 1)
+        extra_address = extra_address.strip()
+        if extra_address and extra_address not in [a for a, _ in accounts]:
+            accounts.append((extra_address, extra_password.strip()))
+    return accounts
+
+def classify_refusal(error):
+    """Returns 'quota', 'throttle', 'auth' (the account is unusable) or None (the message is at fault)."""
+    text = str(error).lower()
+    if any(marker in text for marker in QUOTA_MARKERS):
+        return "quota"
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        # Gmail also answers logins of locked/over-quota accounts with 454 4.7.0
+        return "throttle" if "4.7.0" in text else "auth"
+    if any(marker in text for marker in THROTTLE_MARKERS):
+        return "throttle"
+    return None
+
+class Account:
+    """One sending account: its SMTP connection, rate limits and counters."""
+
+    def __init__(self, address, password, per_minute=SEND_PER_MINUTE, per_day=SEND_PER_DAY, history=()):
+        self.address = address
+        self.sender = SMTPSender(address, password)
+        self.bucket = TokenBucket(per_minute, per_day, history)
+        self.sent = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.disabled_until = 0.0
+        self.disabled_reason = None
+
+    def available(self):
+        return time.time() >= self.disabled_until
+
+    def throughput(self):
+        """Messages per minute while actually sending."""
+        if not self.busy_seconds:
+            return 0.0
+        return self.sent / self.busy_seconds * 60
+
+class SenderPool:
+    """Spreads outgoing mail over several SMTP accounts.
+
+    Each send goes to the available account with the most quota left today
+    (`strategy="least_loaded"`) or to the next one in turn (`"round_robin"`).
+    An account the provider refuses for quota/throttling is taken out of
+    rotation for a cool-down period.
+    """
+
+    def __init__(self, accounts, per_minute=SEND_PER_MINUTE, per_day=SEND_PER_DAY, history=None, strategy=None):
+        history = history or {}
+        self.accounts = [Account(address, password, per_minute, per_day, history.get(address, ()))
+                         for address, password in accounts]
+        self.strategy = strategy or os.getenv("SEND_STRATEGY", "least_loaded")
+        self.lock = threading.Lock()
+        self._next = 0
+
+    def get(self, address):
+        for account in self.accounts:
+            if account.address == address:
+                return account
+        return None
+
+    def acquire(self):
+        """Returns (account, wait_seconds). wait_seconds > 0 means no account can send yet."""
+        with self.lock:
+            candidates = [a for a in self.accounts if a.available()]
+            if not candidates:
+                if not self.accounts:
+                    return None, 60.0
+                return None, max(1.0, min(a.disabled_until for a in self.accounts) - time.time())
+
+            waits = [(a.bucket.wait_time(), a) for a in candidates]
+            ready = [a for wait, a in waits if wait <= 0]
+            if not ready:
+                return None, min(wait for wait, _ in waits)
+
+            if self.strategy == "round_robin":
+                ordered = self.accounts[self._next:] + self.accounts[:self._next]
+                account = next(a for a in ordered if a in ready)
+                self._next = (self.accounts.index(account) + 1) % len(self.accounts)
+            else:
+                account = max(ready, key=lambda a: (a.bucket.remaining_today(), -a.sent))
+            account.bucket.take()
+            return account, 0.0
+
+    def send_raw(self, account, to_addrs, data):
+        """Sends through `account`, recording timings and disabling it on quota errors."""
+        start = time.perf_counter()
+        try:
+            account.sender.send_raw(account.address, to_addrs, data)
+        except (smtplib.SMTPException, OSError) as e:
+            account.failed += 1
+            reason = classify_refusal(e)
+            if reason:
+                cooldown = THROTTLE_COOLDOWN if reason == "throttle" else QUOTA_COOLDOWN
+                account.disabled_until = time.time() + cooldown
+                account.disabled_reason = reason
+                account.sender.close()
+                print(f"   [POOL] {account.address} out of rotation for {cooldown // 60} min ({reason}).")
+            raise
+        finally:
+            account.busy_seconds += time.perf_counter() - start
+        account.sent += 1
+
+    def any_available(self):
+        return any(a.available() for a in self.accounts)
+
+    def remaining_today(self):
+        return sum(a.bucket.remaining_today() for a in self.accounts if a.available())
+
+    def report(self):
+        if not any(a.sent or a.failed for a in self.accounts):
+            return
+        print("\nSender accounts:")
+        for a in self.accounts:
+            state = "active" if a.available() else f"paused ({a.disabled_reason})"
+            print(f"   {a.address:<35} sent {a.sent:>4}  failed {a.failed:>3}  "
+                  f"{a.throughput():6.1f} msg/min  left today {a.bucket.remaining_today():>4}  {state}")
+
+    def close(self):
+        for account in self.accounts:
+            account.sender.close()
@@ -1,34 +1,31 @@
 import os
 import time
 import sys
-import pandas as pd
-import smtplib
 from email.message import EmailMessage
-# Optional imports to prevent crashes if install failed
-try:
-    import google.generativeai as genai
-except ImportError:
-    genai = None
-    
-try:
-    from duckduckgo_search import DDGS
-except ImportError:
-    DDGS = None
 import warnings
 warnings.filterwarnings("ignore", category=FutureWarning)
 warnings.filterwarnings("ignore", category=RuntimeWarning)
 
 from dotenv import load_dotenv
 import requests
-from bs4 import BeautifulSoup
-import pypdf
 
+from src import lazy, mailer, llm, llm_router, connectivity, research_cache, benchmark, lead_store, prevalidate, tracing
+from src.smtp_pool import SMTPSender
+from src.outbox import Outbox
+from src.ledger import Ledger, campaign_name
+
+# Heavy modules are loaded on first use so that the chat/test menus open instantly
+pd = lazy.optional_import("pandas", lazy=True)
+bs4 = lazy.optional_import("bs4", lazy=True)
+pypdf = lazy.optional_import("pypdf", lazy=True)
+pdf_renderer = lazy.optional_import("src.pdf_renderer", lazy=True)
+# Optional imports to prevent crashes if install failed
 try:
-    from reportlab.lib.pagesizes import A4
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-    from reportlab.lib.enums import TA_JUSTIFY, TA_LEFT
+    duckduckgo_search = lazy.lazy_import("duckduckgo_search")
 except ImportError:
+    duckduckgo_search = None
+
+if not lazy.is_installed("reportlab"):
     print("[WARNING] reportlab not installed. PDF generation in Smart Mode will fail.")
 
 # Load environment variables
@@ -45,115 +42,51 @@ def configure_keys():
     """Reloads keys from env in case they were just updated."""
     global GEMINI_API_KEY, GITHUB_TOKEN, EMAIL_ADDRESS, EMAIL_PASSWORD, RESUME_PATH
     load_dotenv()
+    old_keys = (GEMINI_API_KEY, GITHUB_TOKEN)
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
     GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
     EMAIL_ADDRESS = os.getenv("EMAIL_ADDRESS")
     EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
     
-    if GEMINI_API_KEY and genai:
-        try:
-            genai.configure(api_key=GEMINI_API_KEY)
-        except Exception as e:
-            print(f"Warning: Failed to configure Gemini: {e}")
-
-def call_github_api(prompt, model="gpt-4o"):
-    """Calls GitHub Models API."""
-    if not GITHUB_TOKEN:
-        return None
-        
-    # Standardize model names if needed
-    if "deepseek" in model.lower() and "/" not in model:
-         # Best guess mapping if user just passed "deepseek"
-         model = "deepseek/DeepSeek-V3-0324"
-         
-    url = "https://models.github.ai/inference/chat/completions"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {GITHUB_TOKEN}"
-    }
-    
-    payload = {
-        "messages": [
-             {"role": "system", "content": "You are a professional recruiting expert and career coach."},
-             {"role": "user", "content": prompt}
-        ],
-        "model": model,
-        "temperature": 0.7,
-        "max_tokens": 2000,
-        "top_p": 1.0
-    }
-    
-    for attempt in range(3):
-        try:
-            response = requests.post(url, headers=headers, json=payload, timeout=60)
-            if response.status_code == 200:
-                return response.json()['choices'][0]['message']['content']
-            elif response.status_code == 429:
-                print(f"   GitHub Model {model} rate limited. Retrying in 5s...")
-                time.sleep(5)
-            else:
-                print(f"   GitHub Model {model} error: {response.text}")
-                return None
-        except requests.exceptions.ConnectionError:
-            print(f"   Let's retry... ({attempt+1}/3) Connection Error to {model}.")
-            time.sleep(3)
-        except Exception as e:
-            if "NameResolutionError" in str(e) or "getaddrinfo failed" in str(e):
-                 print(f"   Let's retry... ({attempt+1}/3) DNS Error to {model}.")
-                 time.sleep(3)
-            else:
-                 print(f"Error calling GitHub API: {e}")
-                 return None
-    
-    print(f"❌ GitHub Connection Error: Unable to reach {model} after 3 attempts.")
-    return None
-
-
-def test_models():
-    """Tests connectivity to all configured AI models."""
+    # Shared AI clients are only rebuilt when a key actually changed
+    if (GEMINI_API_KEY, GITHUB_TOKEN) != old_keys:
+        llm.reset()
+
+# Models checked by test_models, per provider
+TEST_MODELS = [
+    ("GitHub Models", ["deepseek/DeepSeek-V3-0324", "gpt-4o", "meta/Llama-4-Scout-17B-16E-Instruct"]),
+    ("Google Gemini", ['gemini-flash-latest']),
+]
+
+def test_models(requests_per_model=None):
+    """Benchmarks all configured AI models at once: availability, latency, time-to-first-token, tokens/s."""
     configure_keys()
     print("\n--- AI CONNECTIVITY TEST ---")
-    
-    # 1. GitHub Models
-    if GITHUB_TOKEN:
-        print("\n[GitHub Models]")
-        models = ["deepseek/DeepSeek-V3-0324", "gpt-4o", "meta/Llama-4-Scout-17B-16E-Instruct"]
-        for m in models:
-            print(f"   Testing {m}...", end=" ", flush=True)
-            try:
-                # Test with a simple ping
-                res = call_github_api("Hello", model=m)
-                if res:
-                    print("✅ OK")
-                else:
-                    print("❌ Failed (No response)")
-            except Exception as e:
-                print(f"❌ Error: {e}")
-    else:
-        print("\n[GitHub Models] Skipped (No Token)")
-
-    # 2. Gemini Models
-    if GEMINI_API_KEY and genai:
-        print("\n[Google Gemini]")
-        models = ['gemini-flash-latest']
-        for m in models:
-            print(f"   Testing {m}...", end=" ", flush=True)
-            try:
-                model = genai.GenerativeModel(m)
-                res = model.generate_content("Hello", request_options={'timeout': 10})
-                if res and res.text:
-                    print("✅ OK")
-                else:
-                    print("❌ Failed (Empty)")
-            except Exception as e:
-                if "404" in str(e) or "not found" in str(e).lower():
-                     print("❌ Not Available")
-                else:
-                     print(f"❌ Error: {e}")
-    else:
-         print("\n[Google Gemini] Skipped (No Key or Library)")
+    client = llm.get_llm()
+    models = []
+    for title, group in TEST_MODELS:
+        if not client.provider_for(group[0]):
+            print(f"[{title}] Skipped (No Key or Library)")
+            continue
+        models.extend(group)
+
+    if requests_per_model is None:
+        answer = input("Requests per model (Enter = 1 quick check, e.g. 5 for a benchmark): ").strip()
+        requests_per_model = int(answer) if answer.isdigit() and int(answer) > 0 else 1
 
+    results = benchmark.run(client, models, requests=requests_per_model, timeout=10 if requests_per_model == 1 else 30)
+    if results:
+        benchmark.print_table(results)
+        best = benchmark.fastest(results)
+        if best:
+            print(f"\n   Fastest available model: {best}")
+
+    llm_router.print_stats()
     print("\n---------------------------")
+    return results
+
+# Estimated tokens of conversation sent with each chat message
+CHAT_CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", "3000"))
 
 def chat_with_ai():
     configure_keys()
@@ -161,7 +94,8 @@ def chat_with_ai():
     print("👉 Tapez 'exit', 'quit' ou 'q' pour revenir au menu principal.")
     print("👉 Ctrl+C pour quitter immediatement.\n")
     
-    history = []
+    client = llm.get_llm()
+    history = [{"role": "system", "content": llm.DEFAULT_SYSTEM}]
     
     while True:
         try:
@@ -174,45 +108,24 @@ def chat_with_ai():
                 print("\nRetour au menu...")
                 break
                 
-            print("...")
-            response_text = None
-            
-            # 1. Try GitHub Models (User Preferred or Default)
-            if GITHUB_TOKEN:
-                # Try DeepSeek first if possible, otherwise gpt-4o
-                response_text = call_github_api(user_input, model="deepseek/DeepSeek-V3-0324")
-                if not response_text:
-                     response_text = call_github_api(user_input, model="gpt-4o")
-                
-            # 2. Key/Network Check (Optimization: if GitHub failed due to network, Gemini likely will too, but let's try)
+            history.append({"role": "user", "content": user_input})
+            # Older turns are dropped so the request stays within CHAT_CONTEXT_TOKENS
+            history = llm.trim_history(history, CHAT_CONTEXT_TOKENS)
             
-            # 3. Try Gemini Models (Fallback Loop)
-            if not response_text and GEMINI_API_KEY and genai:
-                 model_names = ['gemini-flash-latest']
-                 for m_name in model_names:
-                     try:
-                        # Chat history management could be complex with fallbacks, 
-                        # for now we treat each turn as fresh or use simple generation to succeed.
-                        model = genai.GenerativeModel(m_name)
-                        # We use generate_content for simplicity in fallback, 
-                        # or maintain a separate chat session if we want history. 
-                        # Given the crash, let's stick to generate_content for robustness or start_chat per model.
-                        chat = model.start_chat(history=[]) # History is empty for now to avoid complexity in fallbacks
-                        response = chat.send_message(user_input)
-                        response_text = response.text
-                        break # Success
-                     except Exception as e:
-                        if "429" in str(e) or "Quota" in str(e):
-                            continue # Try next
-                        elif "not found" in str(e).lower() or "404" in str(e):
-                            continue # Try next
-                        elif "NameResolutionError" in str(e) or "getaddrinfo failed" in str(e):
-                             print("❌ Gemini Connection Error: Offline.")
-                             break # Stop iterating if offline
+            # Same fallback chain as the rest of the app, streamed as it is generated
+            start = time.perf_counter()
+            reply = []
+            for model, chunk in client.stream(messages=history, verbose=False):
+                if not reply:
+                    print(f"AI ({model}, {time.perf_counter() - start:.1f}s): ", end="", flush=True)
+                reply.append(chunk)
+                print(chunk, end="", flush=True)
             
-            if response_text:
-                print(f"AI: {response_text}\n")
+            if reply:
+                print("\n")
+                history.append({"role": "assistant", "content": "".join(reply)})
             else:
+                history.pop()
                 print("⚠️  Pas de réponse (Problème de connexion ou Clés API invalides).")
                 print("    Vérifiez votre connexion internet ou vos clés dans .env")
 
@@ -222,25 +135,45 @@ def chat_with_ai():
         except Exception as e:
             print(f"\nErreur inattendue: {e}")
             break
-    if DDGS is None:
+    if duckduckgo_search is None:
         return ""
         
-def get_company_info(company_name):
-    """Searches for company information using DuckDuckGo."""
-    if DDGS is None:
-        return ""
-    print(f"Searching information for: {company_name}...")
+RESEARCH_QUERY = "{name} Maroc activité secteur"
+
+def search_company(company_name):
+    """Runs the DuckDuckGo search for a company. Returns the text ("" if nothing found) or None on failure."""
+    if duckduckgo_search is None or not connectivity.reachable("search"):
+        return None
     try:
-        results = DDGS().text(f"{company_name} Maroc activité secteur", max_results=3)
-        if results:
-            info = "\n".join([r['body'] for r in results])
-            return info
+        results = duckduckgo_search.DDGS().text(RESEARCH_QUERY.format(name=company_name), max_results=3)
+        return "\n".join([r['body'] for r in results]) if results else ""
     except Exception as e:
         print(f"Search failed for {company_name}: {e}")
-    return "Information non disponible."
+        return None
+
+def get_company_info(company_name):
+    """Searches for company information using DuckDuckGo (cached across runs)."""
+    if duckduckgo_search is None:
+        return ""
+    cache = research_cache.get_cache()
+    info = cache.get(company_name, RESEARCH_QUERY)
+    if info is None:
+        print(f"Searching information for: {company_name}...")
+        info = search_company(company_name)
+        if info is not None:
+            cache.put(company_name, RESEARCH_QUERY, info)
+    return info or "Information non disponible."
+
+def prefetch_company_info(company_names):
+    """Warms the research cache for a whole file before letters are generated."""
+    if duckduckgo_search is None or not connectivity.reachable("search"):
+        return
+    research_cache.get_cache().prefetch(company_names, RESEARCH_QUERY, search_company)
 
 def scrape_website(url):
     """Scrapes text content from the company's website."""
+    if not connectivity.is_online():
+        return None
     print(f"Scraping website: {url}...")
     headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
     try:
@@ -249,7 +182,7 @@ def scrape_website(url):
             
         response = requests.get(url, headers=headers, timeout=10)
         if response.status_code == 200:
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = bs4.BeautifulSoup(response.content, 'html.parser')
             text_elements = soup.find_all(['p', 'h1', 'h2', 'h3'])
             text = " ".join([t.get_text() for t in text_elements])
             return text[:2000]
@@ -279,38 +212,21 @@ def extract_name_from_url(url):
     except:
         return ""
 
-def create_pdf_letter(text, filename):
+@tracing.traced("smart_applier.create_pdf_letter")
+def create_pdf_letter(text, filename=None):
+    """Renders the letter to PDF bytes (styles are cached per process).
+    A copy is written to `filename` if given. Returns the bytes, or False on error."""
     try:
-    # Single Page Optimization: Reduced margins
-        doc = SimpleDocTemplate(filename, pagesize=A4,
-                                rightMargin=50, leftMargin=50,
-                                topMargin=30, bottomMargin=30)
-        styles = getSampleStyleSheet()
-        styles.add(ParagraphStyle(name='Justify', parent=styles['Normal'], alignment=TA_JUSTIFY, spaceAfter=12))
-        
-        Story = []
-        replacements = {
-            "📞": "Tél : ",
-            "📧": "Email : ",
-            "✉️": "Email : ",
-            "📄": ""
-        }
-        for emoji, text_repl in replacements.items():
-            text = text.replace(emoji, text_repl)
-            
-        paragraphs = text.split('\n')
-        for para in paragraphs:
-            if para.strip():
-                p = Paragraph(para.strip(), styles["Justify"])
-                Story.append(p)
-                Story.append(Spacer(1, 6)) # Reduced spacing from 12 to 6 for compactness
-                
-        doc.build(Story)
-        return True
+        data = pdf_renderer.render_letter(text)
+        if filename:
+            with open(filename, "wb") as f:
+                f.write(data)
+        return data
     except Exception as e:
         print(f"Error creating PDF: {e}")
         return False
 
+@tracing.traced("smart_applier.generate_cover_letter")
 def generate_cover_letter(company_name, company_info, user_cv_text, ai_client=None, ai_model=None):
     print(f"Generating cover letter for {company_name}...")
     
@@ -365,91 +281,13 @@ def generate_cover_letter(company_name, company_info, user_cv_text, ai_client=No
     """
     
     try:
-        # 1. Try Selected AI Client (SDK) 
-        # MODIFICATION: Prefer REST API (call_github_api) if we have the TOKEN, to avoid SDK hangs/timeouts.
-        if (ai_client and ai_model) or (GITHUB_TOKEN and ai_model):
-            msg = f"   Attempting generation with {ai_model}..."
-            print(msg)
-            
-            # Prefer using our own REST wrapper because it has 60s timeout handling
-            if GITHUB_TOKEN:
-                response_text = call_github_api(prompt, model=ai_model)
-                if response_text:
-                     return response_text
-                else:
-                     print(f"   ❌ {ai_model} (REST) failed or timed out.")
-            else:
-                # Fallback to SDK if for some reason we have client but no token var (unlikely)
-                try:
-                    messages = [{"role": "user", "content": prompt}]
-                    response = ai_client.complete(messages=messages, model=ai_model, temperature=0.7)
-                    return response.choices[0].message.content
-                except Exception as e:
-                    print(f"   ❌ Selected Model ({ai_model}) Failed: {e}")
-            
-            print("   Switching to fallback...")
-
-        # 2. Try GitHub Models via REST (Fallback loop)
-        if GITHUB_TOKEN:
-            # List of models to try in order
-            models_to_try = []
-            if ai_model and "deepseek" in ai_model.lower(): # If user wanted deepseek but SDK failed
-                 models_to_try.append("deepseek/DeepSeek-V3-0324")
-            
-            models_to_try.extend(["deepseek/DeepSeek-V3-0324", "gpt-4o"])
-            
-            # Deduplicate
-            seen = set()
-            unique_models = []
-            for m in models_to_try:
-                if m not in seen:
-                    unique_models.append(m)
-                    seen.add(m)
-
-            for model_name in unique_models:
-                print(f"   Attempting generation with GitHub Models ({model_name})...")
-                content = call_github_api(prompt, model=model_name)
-                if content: return content
-
-        # 3. Try Gemini Models (Fallback)
-        if GEMINI_API_KEY and genai:
-            print("   Falling back to Gemini...")
-            # Updated model list with 'latest' and flash
-            model_names = ['gemini-flash-latest']
-            for m_name in model_names:
-                try:
-                    model = genai.GenerativeModel(m_name)
-                    # Set a timeout for the request to avoid hanging
-                    response = model.generate_content(prompt, request_options={'timeout': 30})
-                    return response.text
-                except Exception as e:
-                    if "429" in str(e) or "Quota" in str(e):
-                        print(f"   Gemini Quota exceeded ({m_name}). Waiting 20s...")
-                        time.sleep(20)
-                        # Retry once after waiting
-                        try:
-                            response = model.generate_content(prompt, request_options={'timeout': 30})
-                            return response.text
-                        except:
-                            print("   Gemini Quota still exceeded after waiting. Skipping.")
-                            continue
-                    elif "not found" in str(e).lower() or "404" in str(e):
-                         print(f"   Gemini {m_name} not available. Trying next...")
-                    elif "NameResolutionError" in str(e) or "getaddrinfo failed" in str(e):
-                         print(f"   Gemini Connection Error: Offline.")
-                         break # Offline, no need to try other gemini models
-                    else:
-                        print(f"   Error with Gemini {m_name}: {e}")
-        
-    except requests.exceptions.ConnectionError:
-        print("\n❌ Network Error: Could not reach AI services.")
-        print("   Please check your internet connection and try again.")
-        return None
+        # Selected model first, then the shared fallback chain (GitHub Models, then Gemini)
+        client = ai_client or llm.get_llm()
+        response_text = client.complete(prompt, preferred=ai_model, timeout=60)
+        if response_text:
+            return response_text
     except Exception as e:
-        if "NameResolutionError" in str(e) or "getaddrinfo failed" in str(e):
-             print("\n❌ DNS/Network Error: You seem to be offline.")
-        else:
-         print(f"❌ AI Generation Error: {e}")
+        print(f"❌ AI Generation Error: {e}")
     
     print("⚠️  AI models failed/skipped. Using Fallback Template.")
     # FALLBACK LOGIC
@@ -488,7 +326,10 @@ Email : {os.getenv("USER_CONTACT_EMAIL", "email@example.com")}
 
     return fallback_letter
 
-def send_email(recipient_email, subject, html_content, resume_path, letter_pdf_path=None):
+@tracing.traced("smart_applier.send_email")
+def send_email(recipient_email, subject, html_content, resume_path, letter_pdf_path=None, sender=None, on_queued=None):
+    """Sends the application. Pass an open SMTPSender (or an Outbox to queue it) as `sender`.
+    With an Outbox, `on_queued()` is called once the message is stored."""
     msg = EmailMessage()
     msg["Subject"] = subject
     msg["From"] = EMAIL_ADDRESS
@@ -499,138 +340,189 @@ def send_email(recipient_email, subject, html_content, resume_path, letter_pdf_p
     else:
         msg.set_content("Veuillez trouver ci-joint mon CV et ma lettre de motivation.") 
 
-    if os.path.exists(resume_path):
-        with open(resume_path, "rb") as f:
-            msg.add_attachment(f.read(), maintype="application", subtype="pdf", filename=os.path.basename(resume_path))
-    else:
+    # The CV part is encoded once per batch; letter_pdf_path can also be an in-memory (filename, bytes) pair
+    if not mailer.attach_files(msg, [resume_path]):
         print(f"Warning: Resume file '{resume_path}' not found. Sending without attachment.")
         
-    if letter_pdf_path and os.path.exists(letter_pdf_path):
-        with open(letter_pdf_path, "rb") as f:
-            msg.add_attachment(f.read(), maintype="application", subtype="pdf", filename=os.path.basename(letter_pdf_path))
+    mailer.attach_files(msg, [letter_pdf_path])
 
     try:
-        with smtplib.SMTP("smtp.gmail.com", 587) as server:
-            server.starttls()
-            server.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-            server.send_message(msg)
-        print(f"Email sent to {recipient_email}")
+        if sender and on_queued:
+            sender.send(msg, on_stored=on_queued)
+        elif sender:
+            sender.send(msg)
+        else:
+            with SMTPSender(EMAIL_ADDRESS, EMAIL_PASSWORD) as single:
+                single.send(msg)
+        if isinstance(sender, Outbox):
+            print(f"Email queued for {recipient_email}")
+        else:
+            print(f"Email sent to {recipient_email}")
         return True
     except Exception as e:
         print(f"Failed to send email to {recipient_email}: {e}")
         return False
 
 
-def run_smart_apply(ai_client=None, ai_model=None):
-    configure_keys()
-    
-    # 1. Select File
-    print("\n--- SMART APPLICATION ---")
-    files = [f for f in os.listdir('.') if (f.endswith('.xlsx') or f.endswith('.csv')) and 'validated' in f]
-    if not files:
-        files = [f for f in os.listdir('.') if (f.endswith('.xlsx') or f.endswith('.csv')) and f.startswith('leads')]
-        
-    if not files:
-        print("No leads file found.")
-        return
+SUBJECT = "Objet : Demande de stage – Période mai–juin 2026"
 
-    print("Available Files:")
-    for i, f in enumerate(files):
-        print(f"{i+1}. {f}")
-        
-    try:
-        choice = int(input("Choice: ")) - 1
-        target_file = files[choice]
-    except:
-        return
+def email_body(company_name):
+    return f"""Bonjour Madame, Monsieur,
 
-    # 2. Load Resume
+Je vous contacte afin de soumettre ma candidature pour un poste de Stagiaire Développeur Web Full Stack au sein de votre agence, {company_name}.
+
+Actuellement en formation à YouCode, je recherche activement un stage de fin d'année d'une durée de deux mois. Je suis disponible pour effectuer ce stage de Mai à Juin 2026.
+
+Passionné par les technologies web et désireux d’appliquer mes compétences en environnement professionnel, je suis convaincu que cette expérience serait mutuellement bénéfique.
+
+Vous trouverez mon Curriculum Vitae ainsi que ma Lettre de Motivation ci-joints. Je me tiens à votre disposition pour un entretien afin de vous présenter plus amplement mon profil et mes motivations.
+
+Dans l'attente de votre retour, veuillez agréer, Madame, Monsieur, l'expression de mes salutations distinguées.
+
+Cordialement,
+
+Cordialement,
+
+{os.getenv("USER_FULL_NAME", "Candidat")}"""
+
+def find_resume():
+    """Path of the CV to attach, or None (with an error message) if there is none."""
     resume_file = "CV.pdf"
     if not os.path.exists(resume_file):
         resume_file = RESUME_PATH if RESUME_PATH else "resume.pdf"
     
     if not os.path.exists(resume_file):
         print(f"Error: Could not find CV ({resume_file}). Please make sure CV.pdf exists.")
-        return
+        return None
+    return resume_file
+
+@tracing.traced("smart_applier.research")
+def research(company_name, website):
+    """What the letter can say about the company: its website and a web search."""
+    info = ""
+    if website:
+        scraped_info = scrape_website(website)
+        if scraped_info:
+            info += f"\nInfos du site web ({website}):\n{scraped_info}"
+
+    search_info = get_company_info(company_name)
+    if search_info:
+         info += f"\nInfos de recherche:\n{search_info}"
+    return info
+
+def queue_application(email, company_name, letter_text, resume_file, ledger, sender):
+    """Renders the letter and queues the email on `sender`. Returns True if it was queued."""
+    pdf_filename = f"Lettre_Motivation_{str(company_name).replace(' ', '_')}.pdf"
+    pdf_bytes = create_pdf_letter(letter_text, pdf_filename)
+    if not pdf_bytes:
+        print("   Failed to create PDF.")
+        return False
+    print(f"   PDF Created: {pdf_filename}")
+
+    # Marked once the outbox has stored the message, before its "sent" callback can run
+    if not send_email(email, SUBJECT, email_body(company_name), resume_file, (pdf_filename, pdf_bytes), sender=sender,
+                      on_queued=lambda: ledger.mark(email, "queued")):
+        ledger.mark(email, "failed")
+        return False
+    return True
+
+def read_row(lead):
+    """Returns (email, website, company name) of a lead."""
+    company_name = lead.name
+    # Get Company Name from URL if missing
+    if not company_name:
+        if lead.website:
+            company_name = extract_name_from_url(lead.website)
+        else:
+            company_name = "Entreprise"
+    return lead.email, lead.website, company_name
+
+def run_smart_apply(ai_client=None, ai_model=None, dataset=None):
+    """Smart application to a lead set (asked if not given). Returns a summary dict, or None."""
+    configure_keys()
+    
+    # 1. Select leads
+    print("\n--- SMART APPLICATION ---")
+    store = lead_store.get_store()
+    target_dataset = dataset or lead_store.pick_dataset(store)
+    if not target_dataset:
+        return None
+
+    # 2. Load Resume
+    resume_file = find_resume()
+    if not resume_file:
+        return None
 
     user_profile_text = extract_text_from_pdf(resume_file)
     if not user_profile_text:
-        return
+        return None
     
     print("CV Analyzed.")
 
     # 3. Process
-    if target_file.endswith('.xlsx'):
-        try:
-            df = pd.read_excel(target_file)
-        except:
-             df = pd.read_csv(target_file.replace('.xlsx', '.csv'))
-    else:
-        df = pd.read_csv(target_file)
+    statuses = store.apply_statuses(target_dataset)
+    total = store.count(target_dataset, statuses)
 
-    print(f"Found {len(df)} companies.")
+    print(f"Found {total} companies.")
+    llm.print_quota()
     
-    for index, row in df.iterrows():
-        # Handle case variations
-        row_keys = {k.lower(): k for k in row.keys()}
+    # Recipients already emailed for this file are skipped; letters generated before a crash are reused
+    ledger = Ledger(campaign_name(target_dataset))
+    # Emails are queued and sent in the background within the provider's rate limits
+    sender = Outbox(EMAIL_ADDRESS, EMAIL_PASSWORD, tag=ledger.campaign)
+    sender.on_sent(ledger.on_outbox_result)
+    sender.start()
+    skipped = 0
+    processed = 0
+    try:
+        # Research for every company still to write to runs concurrently before generation starts
+        # Missing, malformed, no-reply and duplicate addresses are dropped before any research or letter
+        summary = prevalidate.Summary()
+        to_research = []
+        for lead in prevalidate.survivors(store.iter_leads(target_dataset, statuses), summary,
+                                          require=(), require_email=True):
+            email, _, company_name = read_row(lead)
+            if not ledger.is_done(email) and not ledger.letter(email):
+                to_research.append(company_name)
+        summary.report("Research and letter generations")
+        prefetch_company_info(to_research)
+        total -= summary.total()
+
+        leads = prevalidate.survivors(store.iter_leads(target_dataset, statuses), prevalidate.Summary(),
+                                      require=(), require_email=True)
+        for index, lead in enumerate(leads):
+            email, website, company_name = read_row(lead)
+
+            if ledger.is_done(email):
+                skipped += 1
+                continue
         
-        email = row.get(row_keys.get('email', 'email'))
-        website = row.get(row_keys.get('website', 'website'))
-        company_name = row.get(row_keys.get('name', 'name')) or row.get(row_keys.get('company name', 'Company Name'))
+            print(f"\nProcessing [{index+1}/{total}]: {company_name} ({email})")
+            processed += 1
         
-        if pd.isna(email) or "@" not in str(email):
-            continue
-            
-        # Get Company Name from URL if missing
-        if pd.isna(company_name) or str(company_name).strip() == "":
-            if website:
-                company_name = extract_name_from_url(str(website))
+            letter_text = ledger.letter(email)
+            if letter_text:
+                print("   [RESUME] Reusing the letter generated in a previous run.")
             else:
-                company_name = "Entreprise"
+                info = research(company_name, website)
+                letter_text = generate_cover_letter(company_name, info, user_profile_text, ai_client, ai_model)
+                if letter_text:
+                    ledger.record_letter(email, company_name, letter_text)
         
-        print(f"\nProcessing [{index+1}/{len(df)}]: {company_name} ({email})")
-        
-        info = ""
-        if pd.notna(website) and str(website).strip() != "":
-            scraped_info = scrape_website(str(website))
-            if scraped_info:
-                info += f"\nInfos du site web ({website}):\n{scraped_info}"
-        
-        search_info = get_company_info(company_name)
-        if search_info:
-             info += f"\nInfos de recherche:\n{search_info}"
-        
-        letter_text = generate_cover_letter(company_name, info, user_profile_text, ai_client, ai_model)
-        
-        if letter_text:
-            pdf_filename = f"Lettre_Motivation_{str(company_name).replace(' ', '_')}.pdf"
-            if create_pdf_letter(letter_text, pdf_filename):
-                print(f"   PDF Created: {pdf_filename}")
-                
-                subject = "Objet : Demande de stage – Période mai–juin 2026"
-                email_body = f"""Bonjour Madame, Monsieur,
-
-Je vous contacte afin de soumettre ma candidature pour un poste de Stagiaire Développeur Web Full Stack au sein de votre agence, {company_name}.
-
-Actuellement en formation à YouCode, je recherche activement un stage de fin d'année d'une durée de deux mois. Je suis disponible pour effectuer ce stage de Mai à Juin 2026.
-
-Passionné par les technologies web et désireux d’appliquer mes compétences en environnement professionnel, je suis convaincu que cette expérience serait mutuellement bénéfique.
-
-Vous trouverez mon Curriculum Vitae ainsi que ma Lettre de Motivation ci-joints. Je me tiens à votre disposition pour un entretien afin de vous présenter plus amplement mon profil et mes motivations.
-
-Dans l'attente de votre retour, veuillez agréer, Madame, Monsieur, l'expression de mes salutations distinguées.
-
-Cordialement,
-
-Cordialement,
-
-{os.getenv("USER_FULL_NAME", "Candidat")}"""
-                
-                success = send_email(email, subject, email_body, resume_file, pdf_filename)
-                
-                if success:
-                    time.sleep(5) 
+            if letter_text:
+                queue_application(email, company_name, letter_text, resume_file, ledger, sender)
             else:
-                print("   Failed to create PDF.")
-        else:
-            print("   Failed to generate letter text.")
+                print("   Failed to generate letter text.")
+
+        if skipped:
+            print(f"\nSkipped {skipped} recipient(s) already emailed for this file.")
+        sender.drain()
+        result = {"dataset": target_dataset, "processed": processed, "already_emailed": skipped,
+                  "dropped_before_ai": summary.dropped, "campaign": ledger.summary(), "still_queued": sender.pending()}
+    finally:
+        sender.close()
+        ledger.close()
+
+    pdf_renderer.print_stats()
+    llm_router.print_stats()
+    return result
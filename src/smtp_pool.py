@@ -0,0 +1,86 @@
+import os
+import smtplib
+
+SMTP_TIMEOUT = 30
+
+class SMTPSender:
+    """Keeps one authenticated SMTP connection open for a whole batch of emails.
+
+    Messages are separated with RSET, and a dropped connection is reopened
+    once before giving up. Use it as a context manager or call close().
+    """
+
+    def __init__(self, address, password, host=None, port=None, starttls=None, timeout=SMTP_TIMEOUT):
+        self.address = address
+        self.password = password
+        # Defaults target Gmail; point them at a local server (e.g. `python -m aiosmtpd -n -l localhost:8025`)
+        # with SMTP_HOST=localhost SMTP_PORT=8025 SMTP_STARTTLS=0 to test without sending real mail.
+        self.host = host or os.getenv("SMTP_HOST", "smtp.gmail.com")
+        self.port = port or int(os.getenv("SMTP_PORT", "587"))
+        self.starttls = os.getenv("SMTP_STARTTLS", "1") != "0" if starttls is None else starttls
+        self.timeout = timeout
+        self.server = None
+        self.sent = 0
+        self.connections = 0
+        self._dirty = False
+
+    def connect(self):
+        self.close()
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.password:
+                server.login(self.address, self.password)
+        except Exception:
+            server.close()
+            raise
+        self.server = server
+        self.connections += 1
+        self._dirty = False
+
+    def _send_once(self, deliver):
+        if self.server is None:
+            self.connect()
+        if self._dirty:
+            # Reset the transaction left over from the previous message
+            self.server.rset()
+        self._dirty = True
+        deliver(self.server)
+
+    def _send(self, deliver):
+        try:
+            self._send_once(deliver)
+        except smtplib.SMTPServerDisconnected:
+            self.server = None
+            self.connect()
+            self._send_once(deliver)
+        self.sent += 1
+        return True
+
+    def send(self, msg):
+        """Sends an EmailMessage. Raises smtplib errors after one reconnect attempt."""
+        return self._send(lambda server: server.send_message(msg))
+
+    def send_raw(self, from_addr, to_addrs, data):
+        """Sends an already serialized message (bytes)."""
+        return self._send(lambda server: server.sendmail(from_addr, to_addrs, data))
+
+    def close(self):
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except Exception:
+            try:
+                self.server.close()
+            except Exception:
+                pass
+        self.server = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
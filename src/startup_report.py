@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+import time
+
+# What is measured: opening the menu, and what the chat needs on top of it
+SCENARIOS = [
+    ("menu", "import main"),
+    ("chat", "import main; main.llm.get_llm()"),
+]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def measure(statement):
+    """Runs `statement` in a fresh interpreter with -X importtime.
+    Returns (wall seconds, [(module, self_us, cumulative_us, depth)])."""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], cwd=ROOT,
+                            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - start
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+        except ValueError:
+            continue
+    return elapsed, entries
+
+def report(top=10):
+    for label, statement in SCENARIOS:
+        elapsed, entries = measure(statement)
+        # Interpreter start-up ends with `site`; what follows is the cost of the statement itself
+        starts = [i for i, e in enumerate(entries) if e[0] == "site" and e[3] == 0]
+        if starts:
+            entries = entries[starts[-1] + 1:]
+        total = sum(e[2] for e in entries if e[3] == 0) / 1e6
+        print(f"\n[{label}] {statement}")
+        print(f"   {elapsed:.2f}s wall, {total:.2f}s in imports ({len(entries)} modules)")
+        # Modules imported directly by the statement and by those modules, heaviest first
+        for name, _, cumulative_us, depth in sorted((e for e in entries if e[3] <= 1), key=lambda e: -e[2])[:top]:
+            print(f"   {cumulative_us / 1000:8.1f} ms  {'  ' * depth}{name}")
+
+if __name__ == "__main__":
+    report()
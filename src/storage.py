@@ -0,0 +1,23 @@
+import os
+import sqlite3
+
+def state_dir():
+    """Local state (outbox, caches, ...) lives here, next to the leads files by default.
+    Read on each use: install.py imports this module before .env is loaded."""
+    return os.getenv("JOBHUNTER_STATE_DIR", ".jobhunter")
+
+def state_path(name):
+    """Returns the path of a file inside the state directory, creating the directory if needed."""
+    directory = state_dir()
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, name)
+
+def connect(name):
+    """Opens (or creates) an SQLite database in the state directory.
+
+    The connection may be shared between threads; callers serialize access with their own lock.
+    """
+    conn = sqlite3.connect(state_path(name), timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
@@ -0,0 +1,98 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from src.llm_router import percentile
+
+# Set to a file path to export a Chrome trace (chrome://tracing, ui.perfetto.dev) after each run
+TRACE_FILE = os.getenv("JOBHUNTER_TRACE", "")
+# Spans kept for the trace file; the per-stage summary counts all of them
+MAX_EVENTS = int(os.getenv("JOBHUNTER_TRACE_EVENTS", "100000"))
+
+_lock = threading.Lock()
+_origin = time.perf_counter()
+# (name, start seconds since _origin, duration seconds, thread id, args)
+_events = []
+# name -> [durations]
+_durations = {}
+
+def record(name, start, duration, args=None):
+    with _lock:
+        _durations.setdefault(name, []).append(duration)
+        if len(_events) < MAX_EVENTS:
+            _events.append((name, start - _origin, duration, threading.get_ident(), args))
+
+@contextmanager
+def span(name, **args):
+    """Times the enclosed block as one `name` span. `args` are shown in the trace viewer."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, start, time.perf_counter() - start, args or None)
+
+def traced(name):
+    """Decorator: every call of the function is a `name` span."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, start, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+def stats():
+    """{name: {"count", "total", "p50", "p95"}} in seconds, slowest total first."""
+    with _lock:
+        items = [(name, list(values)) for name, values in _durations.items()]
+    result = {}
+    for name, values in sorted(items, key=lambda item: -sum(item[1])):
+        result[name] = {"count": len(values), "total": round(sum(values), 3),
+                        "p50": round(percentile(values, 0.5), 3), "p95": round(percentile(values, 0.95), 3)}
+    return result
+
+def report():
+    summary = stats()
+    if not summary:
+        return
+    print("\nTime per stage:")
+    print(f"   {'stage':<36} {'count':>6} {'total':>9} {'p50':>8} {'p95':>8}")
+    for name, s in summary.items():
+        print(f"   {name:<36} {s['count']:>6} {s['total']:>8.1f}s {s['p50']:>7.2f}s {s['p95']:>7.2f}s")
+
+def export(path):
+    """Writes the spans as a Chrome trace (Trace Event Format). Returns the path, or None on error."""
+    pid = os.getpid()
+    with _lock:
+        events = list(_events)
+    trace = [{"name": name, "cat": name.split(".")[0], "ph": "X", "ts": round(start * 1e6), "dur": round(duration * 1e6),
+              "pid": pid, "tid": tid, **({"args": args} if args else {})}
+             for name, start, duration, tid, args in events]
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f, default=str)
+    except OSError as e:
+        print(f"[TRACE] Could not write {path}: {e}")
+        return None
+    return path
+
+def finish(path=None):
+    """End of a run: prints the summary, writes the trace file if one is configured, and starts over."""
+    report()
+    path = path or TRACE_FILE
+    if path and export(path):
+        print(f"Trace written to {path} (open it in chrome://tracing or ui.perfetto.dev)")
+    reset()
+
+def reset(events=True):
+    """Clears the per-stage summary, and the spans kept for the trace file unless `events` is False."""
+    with _lock:
+        _durations.clear()
+        if events:
+            _events.clear()
@@ -0,0 +1,61 @@
+from src.dedup import DedupIndex, canonical_email, canonical_url
+from src.lead import Lead
+
+def test_canonical_url_keeps_only_the_host_of_an_own_site():
+    assert canonical_url("http://www.Acme.ma/") == "acme.ma"
+    assert canonical_url("https://acme.ma/contact?utm_source=maps#team") == "acme.ma"
+    assert canonical_url("acme.ma/fr/agence") == "acme.ma"
+    assert canonical_url("https://www.google.com/url?q=https%3A%2F%2Fwww.acme.ma%2F&sa=U") == "acme.ma"
+
+def test_canonical_url_keeps_the_path_on_shared_hosts():
+    assert canonical_url("https://www.facebook.com/AcmeAgency/?fbclid=abc") == "facebook.com/acmeagency"
+    assert canonical_url("https://facebook.com/acmeagency") != canonical_url("https://facebook.com/otheragency")
+    assert canonical_url("https://acme.wixsite.com/home") == "acme.wixsite.com/home"
+
+def test_canonical_url_of_missing_values_is_empty():
+    assert canonical_url(None) == ""
+    assert canonical_url(float("nan")) == ""
+    assert canonical_url(" N/A ") == ""
+
+def test_canonical_email_drops_tags_case_and_mailto():
+    assert canonical_email("Mailto: Contact+maps@ACME.ma ") == "contact@acme.ma"
+    assert canonical_email("mailto:info@acme.ma?subject=Stage") == "info@acme.ma"
+    assert canonical_email("Info@Acme.MA") == canonical_email("info+jobs@acme.ma") == "info@acme.ma"
+
+def test_canonical_email_rejects_invalid_values():
+    assert canonical_email("") == ""
+    assert canonical_email("acme.ma") == ""
+    assert canonical_email("a@b@acme.ma") == ""
+    assert canonical_email("+tag@acme.ma") == ""
+    assert canonical_email("contact@localhost") == ""
+
+def test_match_by_website_and_email():
+    index = DedupIndex()
+    index.add(Lead("Acme", "https://www.acme.ma/", "contact@acme.ma"), ref=1)
+    assert index.match(Lead("Other name", "http://acme.ma/contact")) == (1, "same website")
+    assert index.match(Lead("Other name", "https://other.ma", "Contact+maps@acme.ma")) == (1, "same email")
+    assert index.match(Lead("Beta", "https://beta.ma", "hello@beta.ma")) is None
+
+def test_match_by_similar_name_without_website():
+    index = DedupIndex()
+    index.add(Lead("Acme Digital SARL"), ref=1)
+    assert index.match(Lead("ACME Digital")) == (1, "similar name")
+    assert index.match(Lead("Acme Digitals")) == (1, "similar name")
+    assert index.match(Lead("Acme Consulting")) is None
+
+def test_similar_names_with_different_websites_or_emails_are_different_companies():
+    index = DedupIndex()
+    index.add(Lead("Acme Digital", "https://acme-digital.ma"), ref=1)
+    # Two known websites that differ can't be the same company
+    assert index.match(Lead("Acme Digital", "https://acmedigital.com")) is None
+    # A lead without a website can still be the known company
+    assert index.match(Lead("Acme Digital")) == (1, "similar name")
+
+    index.add(Lead("Nova Studio", email="hello@nova.ma"), ref=2)
+    assert index.match(Lead("Nova Studio", email="jobs@nova-studio.ma")) is None
+
+def test_names_are_only_compared_within_their_block():
+    index = DedupIndex()
+    index.add(Lead("Digital Acme"), ref=1)
+    # Same words, different first word: never compared
+    assert index.match(Lead("Acme Digital")) is None
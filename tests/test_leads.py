@@ -0,0 +1,65 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from src import prevalidate
+from src.lead import Lead
+
+def frame(*rows):
+    return pd.DataFrame(rows, columns=["name", "website", "email"])
+
+def test_check_cleans_emails_and_gives_drop_reasons():
+    emails, reasons = prevalidate.check(frame(
+        ("Acme", "acme.ma", " Mailto:Contact@ACME.ma "),
+        ("", "beta.ma", "info@beta.ma"),
+        ("Gamma", None, "info@gamma.ma"),
+        ("Delta", "delta.ma", "noreply@delta.ma"),
+        # Image names found in page source look like addresses
+        ("Echo", "echo.ma", "logo@2x.png"),
+        ("Fox", "fox.ma", "contact at fox.ma"),
+        ("Golf", "golf.ma", None),
+    ), require_email=True)
+    assert list(emails) == ["contact@acme.ma", "info@beta.ma", "info@gamma.ma", "", "", "", ""]
+    assert list(reasons) == ["", prevalidate.MISSING_NAME, prevalidate.MISSING_WEBSITE, prevalidate.BLACKLISTED_EMAIL,
+                             prevalidate.BLACKLISTED_EMAIL, prevalidate.INVALID_EMAIL, prevalidate.MISSING_EMAIL]
+
+def test_check_without_required_email_keeps_leads_with_unusable_addresses():
+    emails, reasons = prevalidate.check(frame(("Acme", "acme.ma", "not an email"), ("Beta", "beta.ma", "")))
+    assert list(emails) == ["", ""]
+    assert list(reasons) == ["", ""]
+
+def test_check_flags_duplicate_emails_within_and_across_chunks():
+    seen = set()
+    _, reasons = prevalidate.check(frame(("Acme", "acme.ma", "contact@acme.ma"),
+                                         ("Acme Maroc", "acme-maroc.ma", "Contact+maps@acme.ma")), seen_emails=seen)
+    assert list(reasons) == ["", prevalidate.DUPLICATE_EMAIL]
+    assert seen == {"contact@acme.ma"}
+    _, reasons = prevalidate.check(frame(("Acme Rabat", "acme-rabat.ma", "contact@acme.ma")), seen_emails=seen)
+    assert list(reasons) == [prevalidate.DUPLICATE_EMAIL]
+
+def test_survivors_rewrites_email_in_place_and_counts_drops():
+    keep = Lead("Acme", "acme.ma", "MAILTO:Contact@Acme.ma")
+    duplicate = Lead("Acme Maroc", "acme-maroc.ma", "contact@acme.ma")
+    no_site = Lead("Beta", "", "info@beta.ma")
+    later = Lead("Acme Rabat", "acme-rabat.ma", "contact+rabat@acme.ma")
+    summary = prevalidate.Summary()
+    dropped = []
+    kept = list(prevalidate.survivors([[keep, duplicate, no_site], [later]], summary,
+                                      on_drop=lambda lead, reason: dropped.append((lead.name, reason))))
+    assert kept == [keep]
+    assert keep.email == "contact@acme.ma"
+    assert dropped == [("Acme Maroc", prevalidate.DUPLICATE_EMAIL), ("Beta", prevalidate.MISSING_WEBSITE),
+                       ("Acme Rabat", prevalidate.DUPLICATE_EMAIL)]
+    assert summary.checked == 4
+    assert summary.total() == 3
+    assert summary.dropped == {prevalidate.DUPLICATE_EMAIL: 2, prevalidate.MISSING_WEBSITE: 1}
+
+def test_survivors_shares_seen_emails_between_calls():
+    seen = set()
+    summary = prevalidate.Summary()
+    first = list(prevalidate.survivors([[Lead("Acme", "acme.ma", "contact@acme.ma")]], summary, seen_emails=seen))
+    second = list(prevalidate.survivors([[Lead("Acme Maroc", "acme-maroc.ma", "contact@acme.ma")]], summary,
+                                        seen_emails=seen))
+    assert len(first) == 1
+    assert second == []
+    assert summary.dropped == {prevalidate.DUPLICATE_EMAIL: 1}
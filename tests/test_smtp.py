@@ -0,0 +1,135 @@
+import socket
+from email.message import EmailMessage
+
+import pytest
+
+pytest.importorskip("aiosmtpd")
+from aiosmtpd.controller import Controller
+
+from src.ledger import Ledger
+from src.outbox import Outbox, latest_status
+from src.smtp_pool import SMTPSender
+
+class Recorder:
+    """aiosmtpd handler that keeps the delivered messages and counts RSET commands."""
+
+    def __init__(self):
+        self.messages = []
+        self.resets = 0
+
+    async def handle_RSET(self, server, session, envelope):
+        self.resets += 1
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((envelope.mail_from, list(envelope.rcpt_tos), envelope.content))
+        return "250 Message accepted for delivery"
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+@pytest.fixture
+def smtpd(monkeypatch, tmp_path):
+    handler = Recorder()
+    port = free_port()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    monkeypatch.setenv("SMTP_HOST", "127.0.0.1")
+    monkeypatch.setenv("SMTP_PORT", str(port))
+    monkeypatch.setenv("SMTP_STARTTLS", "0")
+    monkeypatch.setenv("SMTP_ACCOUNTS", "")
+    monkeypatch.setenv("JOBHUNTER_STATE_DIR", str(tmp_path))
+    servers = [controller]
+    yield handler, port, servers
+    servers[-1].stop()
+
+def message(recipient, subject="Candidature"):
+    msg = EmailMessage()
+    msg["From"] = "me@example.ma"
+    msg["To"] = recipient
+    msg["Subject"] = subject
+    msg.set_content("Bonjour")
+    return msg
+
+def test_sender_reuses_connection_with_rset(smtpd):
+    handler, _, _ = smtpd
+    with SMTPSender("me@example.ma", None) as sender:
+        for i in range(3):
+            sender.send(message(f"hr{i}@acme.ma"))
+    assert sender.connections == 1
+    assert sender.sent == 3
+    assert handler.resets == 2
+    assert [rcpt for _, rcpt, _ in handler.messages] == [["hr0@acme.ma"], ["hr1@acme.ma"], ["hr2@acme.ma"]]
+
+def test_sender_reconnects_after_drop(smtpd):
+    handler, port, servers = smtpd
+    with SMTPSender("me@example.ma", None) as sender:
+        sender.send(message("hr0@acme.ma"))
+        # Server restart: the open connection is gone
+        servers[-1].stop()
+        restarted = Controller(handler, hostname="127.0.0.1", port=port)
+        restarted.start()
+        servers.append(restarted)
+        sender.send(message("hr1@acme.ma"))
+    assert sender.connections == 2
+    assert len(handler.messages) == 2
+
+def test_outbox_delivery_is_recorded_in_ledger(smtpd):
+    handler, _, _ = smtpd
+    ledger = Ledger("leads_test")
+    sender = Outbox("me@example.ma", None, tag=ledger.campaign)
+    sender.on_sent(ledger.on_outbox_result)
+    ledger.mark("hr@acme.ma", "queued")
+    sender.send(message("hr@acme.ma"))
+    sender.drain()
+    sender.close()
+    assert ledger.status("hr@acme.ma") == "sent"
+    assert [rcpt for _, rcpt, _ in handler.messages] == [["hr@acme.ma"]]
+    # The From header is filled in by the account that sent it
+    assert b"From: me@example.ma" in handler.messages[0][2]
+    ledger.close()
+    assert Ledger("leads_test").is_done("hr@acme.ma")
+
+def test_ledger_picks_up_delivery_from_another_campaign_run(smtpd):
+    handler, _, _ = smtpd
+    first = Ledger("leads_a")
+    first.mark("hr@acme.ma", "queued")
+    first.close()
+    # Queued by campaign A, delivered while campaign B is running
+    other = Ledger("leads_b")
+    sender = Outbox("me@example.ma", None, tag="leads_a")
+    sender.on_sent(other.on_outbox_result)
+    sender.send(message("hr@acme.ma"))
+    sender.drain()
+    sender.close()
+    other.close()
+    assert len(handler.messages) == 1
+    assert Ledger("leads_a").status("hr@acme.ma") == "sent"
+
+def test_queued_entry_without_outbox_row_is_sent_again(smtpd):
+    ledger = Ledger("leads_test")
+    ledger.record_letter("hr@acme.ma", "Acme", "Madame, Monsieur")
+    # Stopped after the ledger write, before the outbox stored the message
+    ledger.mark("hr@acme.ma", "queued")
+    ledger.close()
+    reloaded = Ledger("leads_test")
+    assert reloaded.status("hr@acme.ma") == "generated"
+    assert not reloaded.is_done("hr@acme.ma")
+    assert reloaded.letter("hr@acme.ma") == "Madame, Monsieur"
+
+def test_ledger_is_marked_queued_once_the_outbox_stored_the_message(smtpd):
+    handler, _, _ = smtpd
+    ledger = Ledger("leads_test")
+    sender = Outbox("me@example.ma", None, tag=ledger.campaign)
+    sender.on_sent(ledger.on_outbox_result)
+    stored = []
+    # Read through another connection: the row is committed by the time on_stored runs
+    sender.send(message("hr@acme.ma"), on_stored=lambda: (ledger.mark("hr@acme.ma", "queued"),
+                                                          stored.append(latest_status(ledger.campaign))))
+    sender.drain()
+    sender.close()
+    assert stored == [{"hr@acme.ma": "queued"}]
+    assert ledger.status("hr@acme.ma") == "sent"
+    assert len(handler.messages) == 1